@@ -1,6 +1,14 @@
 from django.contrib import admin
-from .models import Recipe
+from .models import DietTag, Ingredient, Job, Recipe
 
 # Register your models here.
 
-admin.site.register(Recipe)
\ No newline at end of file
+admin.site.register(Recipe)
+admin.site.register(Ingredient)
+admin.site.register(DietTag)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['key', 'status', 'attempts', 'run_at', 'last_error']
+    list_filter = ['status', 'kind']
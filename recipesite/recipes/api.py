@@ -0,0 +1,138 @@
+import functools
+
+from django.db.models import F
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from .caching import add_cache_headers, cache_page, conditional_response, get_cache, request_cache_key
+from .facets import facet_stats
+from .models import Recipe, visibility_partitions
+from .pagination import CursorPaginator
+from .search import search_recipes
+
+# Read-only JSON API over recipes for the mobile clients.
+#
+#   GET api/recipes/?fields=name,cost&limit=20&cursor=...   newest first, cursor paginated
+#   GET api/recipes/<id>/?fields=...
+#   GET api/recipes/search/?q=...&fields=...                ranked like the search page
+#   GET api/recipes/stats/                                  public recipe counts by diet, cost, time and author
+#
+# Visibility is the same as on the HTML pages: public recipes plus the viewer's own. ?fields= selects the returned
+# fields and only those columns are loaded, so the large description/ingredients texts are read only when asked for.
+# Responses carry an ETag derived from the page cache versions (see caching.py), are cached, and answer
+# If-None-Match / If-Modified-Since with a 304 without touching the database.
+
+FIELDS = ['id', 'name', 'description', 'cost', 'time', 'ingredients', 'diet', 'is_public', 'created_at', 'author']
+# Lists leave out the long text columns unless asked for
+LIST_FIELDS = ['id', 'name', 'cost', 'time', 'diet', 'is_public', 'created_at', 'author']
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class ApiError(Exception):
+    pass
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def selected_fields(request, default):
+    if 'fields' not in request.GET:
+        return default
+    fields = [name.strip() for name in request.GET['fields'].split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise ApiError(f"Unknown fields: {', '.join(unknown) or '(none)'}. Available: {', '.join(FIELDS)}.")
+    return fields
+
+
+def select(queryset, fields, always=('id',)):
+    # .only() the requested columns (plus any the caller needs, e.g. the ordering for cursors); author is the
+    # username, annotated instead of select_related so it also works inside the paginator's UNION
+    columns = {name for name in [*fields, *always] if name != 'author'}
+    queryset = queryset.only(*columns)
+    if 'author' in fields:
+        queryset = queryset.annotate(author=F('user__username'))
+    return queryset
+
+
+def serialize(recipe, fields):
+    data = {}
+    for name in fields:
+        value = getattr(recipe, name)
+        data[name] = value.isoformat() if name == 'created_at' else value
+    return data
+
+
+def cached_json(name):
+    # Conditional GET plus response caching for a view returning a JSON-ready dict
+    def decorator(view):
+        @functools.wraps(view)
+        @require_GET
+        def wrapper(request, *args, **kwargs):
+            key, etag, last_modified = request_cache_key(
+                request, f'{name}:{":".join(map(str, kwargs.values()))}', html=False
+            )
+            not_modified = conditional_response(request, etag, last_modified, html=False)
+            if not_modified is not None:
+                return not_modified
+
+            content = get_cache().get(key)
+            if content is None:
+                try:
+                    data = view(request, *args, **kwargs)
+                except ApiError as e:
+                    return error(str(e))
+                except Http404 as e:
+                    return error(str(e), status=404)
+                content = JsonResponse(data).content
+                cache_page(key, content, last_modified)
+            response = HttpResponse(content, content_type='application/json')
+            return add_cache_headers(request, response, etag, last_modified, html=False)
+        return wrapper
+    return decorator
+
+
+@cached_json('api-list')
+def recipe_list(request):
+    fields = selected_fields(request, LIST_FIELDS)
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise ApiError('limit must be an integer.')
+
+    queryset = Recipe.objects.visible_to(request.user).order_by('-created_at', '-id')
+    paginator = CursorPaginator(
+        select(queryset, fields, always=('id', 'created_at')), limit,
+        partitions=visibility_partitions(request.user),
+    )
+    page = paginator.page(request.GET.get('cursor') or None)
+    return {
+        'results': [serialize(recipe, fields) for recipe in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+@cached_json('api-detail')
+def recipe_detail(request, pk):
+    fields = selected_fields(request, FIELDS)
+    # Same rule as RecipeDetailView.get_object: private recipes exist only for their owner
+    recipe = select(Recipe.objects.visible_to(request.user), fields).filter(pk=pk).first()
+    if recipe is None:
+        raise Http404('Recipe not found.')
+    return serialize(recipe, fields)
+
+
+@cached_json('api-search')
+def recipe_search(request):
+    fields = selected_fields(request, LIST_FIELDS)
+    recipes = select(search_recipes(request.GET.get('q', ''), request.user), fields)
+    return {'results': [serialize(recipe, fields) for recipe in recipes]}
+
+
+@cached_json('api-stats')
+def recipe_stats(request):
+    return facet_stats()
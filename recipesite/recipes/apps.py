@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import ensure_fts_index
+
+    ensure_fts_index(connections[using])
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        # SQLite table rebuilds during migrate drop the full-text search triggers; put them back afterwards
+        post_migrate.connect(restore_search_index, sender=self)
+        from . import signals  # noqa: F401
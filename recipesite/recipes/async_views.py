@@ -0,0 +1,87 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.response import TemplateResponse
+
+from . import autofill_index, spoonacular
+from .caching import acache_page, add_cache_headers, arequest_cache_key, conditional_response, get_cache
+from .models import Recipe, visibility_partitions
+from .pagination import CursorPaginator, cursor_query
+from .views import RecipeDetailView, RecipeListView, recipe_list_queryset
+
+# async def versions of the autofill endpoint and the list/detail pages, for ASGI deployments (see recipesite/asgi.py).
+# They use the async ORM and the httpx Spoonacular client, so an autofill waiting seconds on the network holds no
+# thread and page views keep being served next to hundreds of them. Otherwise they behave like their sync
+# counterparts in views.py: same templates, visibility, pagination, page cache and ETags. Pages are returned as
+# TemplateResponses, rendered by the handler like those of the class-based views. The page cache is only used through
+# its async API (aget, aset, ...), so a network cache backend never blocks the event loop.
+
+
+async def resolve_user(request):
+    # request.user is a lazy object that would query the session synchronously the first time a template touches it,
+    # which isn't allowed in async code; load it up front instead
+    request.user = await request.auser()
+    return request.user
+
+
+async def autofill_recipe(request):
+    name = request.GET.get('name', '').strip()
+    if not name:
+        return JsonResponse({'success': False})
+
+    # The index lookup may check the recipes an entry came from (a query)
+    suggestion = await sync_to_async(autofill_index.lookup)(name) or await spoonacular.aautofill(name)
+    if suggestion is None:
+        return JsonResponse({'success': False})
+
+    return JsonResponse({'success': True, **suggestion})
+
+
+async def recipe_list(request):
+    user = await resolve_user(request)
+    key, etag, last_modified = await arequest_cache_key(request, RecipeListView.cache_name)
+    not_modified = conditional_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    # Same cache entries as RecipeListView: rendered pages for anonymous visitors, the page of recipes for everyone
+    anonymous = not user.is_authenticated
+    if anonymous:
+        content = await get_cache().aget(f'{key}:html')
+        if content is not None:
+            return add_cache_headers(request, HttpResponse(content), etag, last_modified)
+
+    cached = await get_cache().aget(f'{key}:page')
+    if cached is None:
+        paginator = CursorPaginator(
+            recipe_list_queryset(user), RecipeListView.paginate_by, partitions=visibility_partitions(user)
+        )
+        page = await paginator.apage(request.GET.get('cursor') or None)
+        cached = (page, page.has_other_pages())
+        await acache_page(f'{key}:page', cached, last_modified)
+    page, is_paginated = cached
+
+    response = TemplateResponse(request, RecipeListView.template_name, {
+        'recipes': page.object_list,
+        'object_list': page.object_list,
+        'page_obj': page,
+        'is_paginated': is_paginated,
+        'next_page_query': cursor_query(request.GET, page.next_cursor),
+        'previous_page_query': cursor_query(request.GET, page.previous_cursor),
+    })
+    if anonymous:
+        # Rendered here, as the handler would (in a thread), so the page can be stored through the async cache API
+        await sync_to_async(response.render)()
+        await acache_page(f'{key}:html', response.content, last_modified)
+    return add_cache_headers(request, response, etag, last_modified)
+
+
+async def recipe_detail(request, pk):
+    user = await resolve_user(request)
+    # Same rule as RecipeDetailView.get_object: private recipes exist only for their owner
+    recipe = await Recipe.objects.visible_to(user).select_related('user').filter(pk=pk).afirst()
+    if recipe is None:
+        raise Http404("Recipe not found.")
+    return TemplateResponse(request, RecipeDetailView.template_name, {
+        'object': recipe,
+        RecipeDetailView.context_object_name: recipe,
+    })
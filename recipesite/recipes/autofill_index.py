@@ -0,0 +1,313 @@
+import bisect
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+
+from django.conf import settings
+
+from . import spoonacular
+from .ingredients import extract_known_ingredient
+from .models import Recipe, SpoonacularCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Local autofill index: answers most autofill lookups from disk instead of Spoonacular.
+#
+# Built by `manage.py rebuild_autofill_index` from the cached Spoonacular recipe payloads plus our own public
+# recipes, one entry per dish name. Names are indexed by trigram; a lookup scores candidates by trigram similarity
+# (Jaccard) to the query, boosted when the name starts with the query or the entry's ingredients contain the query's
+# known ingredient (extract_known_ingredient). The best entry above RECIPES_AUTOFILL_INDEX_MIN_SCORE is the answer;
+# anything else falls through to the API. An entry taken from one of our recipes is skipped once that recipe was
+# deleted or made private, until the next rebuild leaves it out.
+#
+# Trigrams of common words (" ch", "ken") list a good part of the index, and counting every query trigram's postings
+# took tens of milliseconds. A query naming an indexed dish is answered from a hash of the names instead. Otherwise a
+# lookup counts the shortest lists only, up to POSTINGS_BUDGET postings, and compares the SHORTLIST entries sharing
+# most of them with the query trigram by trigram.
+#
+# The file is memory-mapped, so every worker process shares one copy through the page cache and opening it costs
+# nothing. Layout (native uint32 arrays after the header):
+#
+#   header                 magic, byte order, entry / trigram / posting counts
+#   trigram hashes         sorted crc32 of each trigram, searched with bisect
+#   posting starts, sizes  per trigram: its slice of the postings
+#   postings               entry numbers, per trigram
+#   entry offsets          entry_count + 1 offsets into the data, so entry i is data[offsets[i]:offsets[i + 1]]
+#   entry trigram counts   per entry, for the similarity
+#   entry trigram starts   entry_count + 1 offsets into the entry trigrams
+#   entry trigrams         trigram hashes, per entry
+#   name hashes, entries   sorted crc32 of each entry's name, and the entry with that name
+#   data                   one JSON object per entry: name, autofill suggestion and recipe pk (None for Spoonacular's)
+#
+# Rebuilds write a new file and rename it over the old one; lookups notice the new file within a second.
+
+MAGIC = b'RAIDX2'
+HEADER = struct.Struct('<6s2sIII')
+
+# Score added for a name starting with the query, and for ingredients containing the query's known ingredient
+PREFIX_BOOST = 0.1
+KEYWORD_BOOST = 0.1
+# Candidates whose entries are decoded for the boosts
+CANDIDATES = 10
+# Postings counted per lookup (at least the MIN_COUNTED shortest lists are), and entries then compared trigram by
+# trigram when some lists went uncounted
+POSTINGS_BUDGET = 10000
+MIN_COUNTED = 3
+SHORTLIST = 200
+RELOAD_INTERVAL = 1.0
+
+
+def normalize_name(name):
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in name.lower()).split())
+
+
+def trigrams(normalized):
+    padded = f'  {normalized} '
+    return {zlib.crc32(padded[i:i + 3].encode()) for i in range(len(padded) - 2)}
+
+
+# ----------------------------------------------------------------------
+# Building
+# ----------------------------------------------------------------------
+
+def index_entries():
+    # (name, suggestion, recipe pk) triples: cached Spoonacular recipes first (no pk), then public recipes with a name
+    # not seen yet
+    cached = SpoonacularCacheEntry.objects.filter(key__startswith='information:', payload__isnull=False)
+    for entry in cached.iterator(chunk_size=1000):
+        if entry.payload.get('extendedIngredients') and entry.payload.get('title'):
+            yield entry.payload['title'], spoonacular.to_suggestion(entry.payload), None
+
+    recipes = Recipe.objects.filter(is_public=True).exclude(ingredients='').only(
+        'name', 'description', 'ingredients', 'time', 'cost'
+    )
+    for recipe in recipes.iterator(chunk_size=1000):
+        yield recipe.name, {
+            'description': recipe.description, 'ingredients': recipe.ingredients,
+            'time': recipe.time, 'cost': recipe.cost,
+        }, recipe.pk
+
+
+def build_index(path, entries=None):
+    # Writes the index for `entries` (default: index_entries()) to `path`; returns the number of entries
+    unique = {}
+    for name, suggestion, recipe in index_entries() if entries is None else entries:
+        normalized = normalize_name(name)
+        if normalized and normalized not in unique:
+            encoded = json.dumps({'name': normalized, 'suggestion': suggestion, 'recipe': recipe}).encode()
+            unique[normalized] = (trigrams(normalized), encoded)
+
+    # Entries with fewer trigrams first: of two entries sharing as many of a query's trigrams the shorter is the more
+    # similar, and that is the one the lookup shortlists on a tie (see shortlist())
+    names, data, offsets, counts = {}, bytearray(), array('I', [0]), array('I')
+    entry_starts, entry_grams = array('I', [0]), array('I')
+    postings_by_trigram = {}
+    for number, (normalized, (grams, encoded)) in enumerate(sorted(unique.items(), key=lambda item: len(item[1][0]))):
+        names[normalized] = number
+        for gram in grams:
+            postings_by_trigram.setdefault(gram, array('I')).append(number)
+        counts.append(len(grams))
+        entry_grams.extend(sorted(grams))
+        entry_starts.append(len(entry_grams))
+        data += encoded
+        offsets.append(len(data))
+    named = sorted((zlib.crc32(name.encode()), number) for name, number in names.items())
+
+    hashes, starts, sizes, postings = array('I'), array('I'), array('I'), array('I')
+    for gram in sorted(postings_by_trigram):
+        hashes.append(gram)
+        starts.append(len(postings))
+        sizes.append(len(postings_by_trigram[gram]))
+        postings.extend(postings_by_trigram[gram])
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        byteorder = b'le' if sys.byteorder == 'little' else b'be'
+        f.write(HEADER.pack(MAGIC, byteorder, len(counts), len(hashes), len(postings)))
+        name_hashes, named_entries = array('I', (h for h, _ in named)), array('I', (n for _, n in named))
+        for part in (hashes, starts, sizes, postings, offsets, counts, entry_starts, entry_grams, name_hashes,
+                     named_entries):
+            part.tofile(f)
+        f.write(data)
+    os.replace(f.name, path)
+    return len(counts)
+
+
+# ----------------------------------------------------------------------
+# Lookups
+# ----------------------------------------------------------------------
+
+def shortlist(shared, size):
+    # Up to `size` of the entries with the highest counts in `shared`, ties taken in entry order; entries more than one
+    # below the highest count are left out
+    top = max(shared.values(), default=0)
+    numbers = [number for number, count in shared.items() if count >= top - 1]
+    if len(numbers) > size:
+        numbers = sorted(numbers, key=shared.__getitem__, reverse=True)[:size]
+    return numbers
+
+
+def visible(entries):
+    # The first of `entries` not taken from a recipe since deleted or made private (one query when any is a recipe's)
+    pks = [entry['recipe'] for entry in entries if entry['recipe'] is not None]
+    public = set(Recipe.objects.filter(pk__in=pks, is_public=True).values_list('pk', flat=True)) if pks else set()
+    return next((entry for entry in entries if entry['recipe'] is None or entry['recipe'] in public), None)
+
+
+class AutofillIndex:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byteorder, entries, grams, postings = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or byteorder != (b'le' if sys.byteorder == 'little' else b'be'):
+            raise ValueError(f'{path} is not an autofill index built on this platform.')
+
+        view = memoryview(self.mmap)
+        position = HEADER.size
+
+        def take(count):
+            nonlocal position
+            part = view[position:position + 4 * count].cast('I')
+            position += 4 * count
+            return part
+
+        self.hashes, self.starts, self.sizes = take(grams), take(grams), take(grams)
+        self.postings = take(postings)
+        self.offsets, self.counts = take(entries + 1), take(entries)
+        # Every posting is one trigram of one entry
+        self.entry_starts, self.entry_grams = take(entries + 1), take(postings)
+        self.name_hashes, self.named_entries = take(entries), take(entries)
+        self.data = view[position:]
+
+    def __len__(self):
+        return len(self.counts)
+
+    def entry(self, number):
+        return json.loads(self.data[self.offsets[number]:self.offsets[number + 1]].tobytes())
+
+    def postings_of(self, grams):
+        # The (ascending) entry numbers of every indexed trigram among `grams`
+        for gram in grams:
+            i = bisect.bisect_left(self.hashes, gram)
+            if i < len(self.hashes) and self.hashes[i] == gram:
+                start = self.starts[i]
+                yield self.postings[start:start + self.sizes[i]]
+
+    def grams_of(self, number):
+        return self.entry_grams[self.entry_starts[number]:self.entry_starts[number + 1]]
+
+    def exact(self, query):
+        # The entry named like the query, as a list of at most one
+        normalized = normalize_name(query)
+        name_hash = zlib.crc32(normalized.encode())
+        start = bisect.bisect_left(self.name_hashes, name_hash)
+        end = bisect.bisect_right(self.name_hashes, name_hash, start)
+        entries = (self.entry(number) for number in self.named_entries[start:end])
+        return [entry for entry in entries if normalized and entry['name'] == normalized]
+
+    def matches(self, query, min_score):
+        # The entries scoring at least `min_score`, best first
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        grams = trigrams(normalized)
+        keyword = extract_known_ingredient(normalized)
+
+        lists = sorted(self.postings_of(grams), key=len)
+        shared, counted, total = Counter(), 0, 0
+        for postings in lists:
+            if counted >= MIN_COUNTED and total + len(postings) > POSTINGS_BUDGET:
+                break
+            shared.update(postings)
+            counted, total = counted + 1, total + len(postings)
+        if counted < len(lists):
+            # Some lists went uncounted: compare the shortlisted entries' own trigrams instead
+            numbers = shortlist(shared, SHORTLIST)
+            shared = {number: len(grams.intersection(self.grams_of(number))) for number in numbers}
+
+        # Jaccard similarity of the trigram sets; entries that can't reach min_score even with the boosts are skipped
+        needed = (min_score - PREFIX_BOOST - (KEYWORD_BOOST if keyword else 0)) * len(grams)
+        similarity = {
+            number: count / (len(grams) + self.counts[number] - count)
+            for number, count in shared.items() if count >= needed
+        }
+        scored = []
+        for number in heapq.nlargest(CANDIDATES, similarity, key=similarity.get):
+            entry = self.entry(number)
+            score = similarity[number]
+            if entry['name'].startswith(normalized):
+                score += PREFIX_BOOST
+            if keyword and keyword in entry['suggestion']['ingredients'].lower():
+                score += KEYWORD_BOOST
+            if score >= min_score:
+                scored.append((score, entry))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [entry for _, entry in scored]
+
+    def lookup(self, query, min_score):
+        # The suggestion of the best matching entry scoring at least `min_score`, or None. A dish named like the query
+        # scores at least 1 + PREFIX_BOOST, which only a nearly identical name could beat, so it is the answer
+        # without scoring the others.
+        entry = visible(self.exact(query)) or visible(self.matches(query, min_score))
+        return entry['suggestion'] if entry else None
+
+    def close(self):
+        self.hashes = self.starts = self.sizes = self.postings = self.offsets = self.counts = None
+        self.entry_starts = self.entry_grams = self.name_hashes = self.named_entries = self.data = None
+        self.mmap.close()
+
+
+class IndexFile:
+    # The index at RECIPES_AUTOFILL_INDEX_PATH, opened on first use and reopened after a rebuild replaced the file
+
+    def __init__(self):
+        self.index = None
+        self.identity = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        if time.monotonic() - self.checked < RELOAD_INTERVAL:
+            return self.index
+        with self.lock:
+            self.checked = time.monotonic()
+            path = settings.RECIPES_AUTOFILL_INDEX_PATH
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.index, self.identity = None, None
+                return None
+            identity = (str(path), stat.st_ino, stat.st_mtime_ns)
+            if identity != self.identity:
+                try:
+                    self.index = AutofillIndex(path)
+                except (OSError, ValueError) as e:
+                    logger.warning('Autofill index %s unusable: %s', path, e)
+                    self.index = None
+                self.identity = identity
+            return self.index
+
+    def reset(self):
+        with self.lock:
+            self.index, self.identity, self.checked = None, None, 0.0
+
+
+index_file = IndexFile()
+
+
+def lookup(name):
+    # Autofill suggestion for a dish name from the local index, or None (no index, or no good enough match)
+    index = index_file.get()
+    if index is None:
+        return None
+    return index.lookup(name, settings.RECIPES_AUTOFILL_INDEX_MIN_SCORE)
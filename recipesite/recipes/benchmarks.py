@@ -0,0 +1,366 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+from datetime import timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import facets, spoonacular, suggest
+from .caching import bump_versions, get_cache
+from .ingredients import COMMON_INGREDIENTS
+from .models import DietTag, Recipe, RecipeIngredient, visibility_partitions
+from .pagination import CursorPaginator
+from .spoonacular_stub import SpoonacularStub
+from .table import SORT_FIELDS, table_queryset
+from .views import RecipeListView, RecipeTableView, recipe_list_queryset
+
+# Benchmark harness: a synthetic data generator and timed scenarios over the main views, reported as JSON so runs can
+# be compared between commits. Driven by the generate_recipes and benchmark management commands.
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+
+EXTRA_INGREDIENTS = [
+    'olive oil', 'butter', 'flour', 'sugar', 'salt', 'milk', 'lemon', 'basil', 'cumin', 'paprika', 'ginger',
+    'soy sauce', 'honey', 'vinegar', 'cream', 'parsley', 'cilantro', 'lime', 'oregano', 'thyme', 'noodles', 'pasta',
+]
+AMOUNTS = ['1', '2', '3', '1/2', '1 1/2', '200 g', '1 cup', '2 tbsp', '1 tsp', '1 lb', '2 cloves', '1 can']
+DIETS = ['', '', 'vegan', 'vegetarian', 'gluten-free', 'dairy-free', 'keto', 'paleo', 'vegetarian, gluten-free']
+DISHES = ['Stew', 'Curry', 'Salad', 'Soup', 'Bowl', 'Pie', 'Stir Fry', 'Tacos', 'Bake', 'Risotto', 'Pasta', 'Skillet']
+WORDS = (
+    'simple quick hearty fresh family favourite weeknight slow cooked crispy creamy smoky spicy tangy golden '
+    'roasted classic rustic light bright comforting seasonal easy rich savoury sweet zesty tender'
+).split()
+
+
+def synthetic_recipe(rng, user, created_at, public_ratio):
+    main = rng.choice(COMMON_INGREDIENTS)
+    items = rng.sample(COMMON_INGREDIENTS + EXTRA_INGREDIENTS, rng.randint(3, 12))
+    return Recipe(
+        name=f"{rng.choice(WORDS).title()} {main.title()} {rng.choice(DISHES)}",
+        # Mostly short, with a long tail of essays
+        description=' '.join(rng.choices(WORDS, k=int(rng.paretovariate(1.5) * 25))).capitalize() + '.',
+        ingredients=', '.join(f'{rng.choice(AMOUNTS)} {item}' for item in [main, *items]),
+        cost=rng.randint(1, 60),
+        time=rng.choice([10, 15, 20, 30, 45, 60, 90, 120, 240]),
+        diet=rng.choice(DIETS),
+        user=user,
+        is_public=rng.random() < public_ratio,
+        created_at=created_at,
+    )
+
+
+def generate_recipes(count, users=None, public_ratio=0.7, seed=0, batch_size=5000, progress=None):
+    # Creates `count` recipes spread over `users` new users (default one per 20 recipes, with a skewed number of
+    # recipes each) and the last three years, with parsed ingredients. Same seed, same data.
+    rng = random.Random(seed)
+    users = users or max(1, count // 20)
+    prefix = f'bench{seed}_'
+    existing = User.objects.filter(username__startswith=prefix).count()
+    authors = User.objects.bulk_create([
+        User(username=f'{prefix}{n}', password='!') for n in range(existing, existing + users)
+    ])
+    weights = [1 / (n + 1) for n in range(len(authors))]
+
+    now = timezone.now()
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        recipes = [
+            synthetic_recipe(
+                rng, rng.choices(authors, weights)[0], now - timedelta(seconds=rng.randint(0, 3 * 365 * 86400)),
+                public_ratio,
+            )
+            for _ in range(size)
+        ]
+        recipes = Recipe.objects.bulk_create(recipes)
+        RecipeIngredient.objects.sync(recipes)
+        DietTag.objects.sync(recipes)
+        facets.record_created(recipes)
+        created += size
+        if progress:
+            progress(created)
+
+    # bulk_create sends no signals; drop every cached page at once (facets were counted per batch)
+    bump_versions(['public', *(f'user:{author.pk}' for author in authors)])
+    suggest.record_bulk_change()
+    return created
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+
+def summarize(samples, elapsed):
+    ordered = sorted(samples)
+    percentile = lambda p: ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))] * 1000
+    return {
+        'requests': len(samples),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'p50_ms': round(percentile(50), 3),
+        'p95_ms': round(percentile(95), 3),
+        'p99_ms': round(percentile(99), 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+    }
+
+
+def form_data(name):
+    return {
+        'name': name, 'description': 'Benchmark recipe', 'cost': 5, 'time': 20,
+        'ingredients': '2 cups rice, 1 onion, 2 cloves garlic', 'diet': 'Vegan', 'is_public': True,
+    }
+
+
+class Benchmark:
+    # Runs each scenario `iterations` times (after `warmup` untimed runs) through Django's test client, so timings
+    # cover middleware, views, ORM and templates but not the network or a server. The page cache is cleared before
+    # every request unless `warm_cache` is set.
+
+    def __init__(self, iterations=200, warmup=10, warm_cache=False, depth=50, seed=0, autofill_delay=0.05):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.warm_cache = warm_cache
+        self.depth = depth
+        self.autofill_delay = autofill_delay
+        self.rng = random.Random(seed)
+        self.client = Client()
+        self.user = (
+            User.objects.filter(recipe__isnull=False).order_by('id').first()
+            or User.objects.create(username='bench_owner')
+        )
+        self.client.force_login(self.user)
+        self.own_recipe = None
+        self.recipe_ids = list(Recipe.objects.filter(is_public=True).values_list('id', flat=True)[:5000])
+
+    def measure(self, request):
+        for _ in range(self.warmup):
+            self._prepare()
+            request()
+        samples = []
+        start = time.perf_counter()
+        for _ in range(self.iterations):
+            self._prepare()
+            began = time.perf_counter()
+            response = request()
+            samples.append(time.perf_counter() - began)
+            if response.status_code >= 400:
+                raise RuntimeError(f'Benchmark request failed with {response.status_code}')
+        return summarize(samples, time.perf_counter() - start)
+
+    def _prepare(self):
+        if not self.warm_cache:
+            get_cache().clear()
+
+    def scenarios(self):
+        list_url = reverse('recipesns:recipe_list')
+        table_url = reverse('recipesns:recipe_table')
+
+        yield 'list_first_page', lambda: self.client.get(list_url)
+        list_cursor = self._deep_cursor(recipe_list_queryset(self.user), RecipeListView.paginate_by)
+        yield f'list_page_{self.depth}', lambda: self.client.get(list_url, {'cursor': list_cursor})
+
+        for field in SORT_FIELDS:
+            for direction in ('asc', 'desc'):
+                params = {'sort': field, 'dir': direction}
+                yield f'table_{field}_{direction}', lambda params=params: self.client.get(table_url, params)
+        table_cursor = self._deep_cursor(table_queryset(self.user, {'sort': 'cost'}), RecipeTableView.paginate_by)
+        deep_params = {'sort': 'cost', 'dir': 'asc', 'cursor': table_cursor}
+        yield f'table_cost_asc_page_{self.depth}', lambda: self.client.get(table_url, deep_params)
+
+        if self.recipe_ids:
+            yield 'detail', lambda: self.client.get(
+                reverse('recipesns:recipe_detail', args=[self.rng.choice(self.recipe_ids)])
+            )
+            yield 'update', self._update
+        yield 'create', self._create
+
+    def _deep_cursor(self, queryset, per_page):
+        # Cursor of page `depth` (or the last page) of the listing, as the next links would lead there
+        paginator = CursorPaginator(queryset, per_page, partitions=visibility_partitions(self.user))
+        cursor = None
+        for _ in range(self.depth - 1):
+            page = paginator.page(cursor)
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+        return cursor or ''
+
+    def _create(self):
+        return self.client.post(
+            reverse('recipesns:recipe_create'), {**form_data('Benchmark Bowl'), 'diet_tags': ['vegan']}
+        )
+
+    def _update(self):
+        if self.own_recipe is None:
+            self.own_recipe = Recipe.objects.create(user=self.user, **form_data('Benchmark Update'))
+        return self.client.post(
+            reverse('recipesns:recipe_update', args=[self.own_recipe.pk]),
+            {**form_data(f'Benchmark Update {self.rng.random()}'), 'diet_tags': ['vegan']},
+        )
+
+    def autofill(self):
+        # Cold lookups (unique dish names) against a local stub with `autofill_delay` seconds of upstream latency
+        stub = SpoonacularStub().start()
+        stub.delay = self.autofill_delay
+        names = iter(range(10 ** 9))
+        url = reverse('recipesns:autofill_recipe')
+
+        def request():
+            n = next(names)
+            stub.searches[f'bench dish {n}'] = [n]
+            stub.recipes[n] = {
+                'id': n, 'title': f'Dish {n}', 'summary': 'Tasty', 'readyInMinutes': 30, 'pricePerServing': 250,
+                'extendedIngredients': [{'original': '1 cup rice', 'name': 'rice'}],
+            }
+            return self.client.get(url, {'name': f'Bench dish {n}'})
+
+        try:
+            with override_settings(SPOONACULAR_BASE_URL=stub.url, SPOONACULAR_API_KEY='benchmark'):
+                return self.measure(request)
+        finally:
+            spoonacular.local_cache.clear()
+            stub.stop()
+
+    def run(self, only=None, progress=None):
+        # Results by scenario name; `only` limits the run to scenarios starting with one of the given prefixes
+        results = {}
+        scenarios = [*self.scenarios(), ('autofill', None)]
+        for name, request in scenarios:
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = self.autofill() if request is None else self.measure(request)
+            if progress:
+                progress(name, results[name])
+        return results
+
+
+class WriteLoad:
+    # `threads` logged-in clients post create and update forms (alternately) at the same time, `writes` each, to
+    # measure write throughput and count the writes lost to lock errors under contention. Each thread has its own
+    # database connection, like a worker thread of a server.
+
+    def __init__(self, threads=8, writes=50):
+        self.threads = threads
+        self.writes = writes
+
+    def run(self):
+        users = [
+            User.objects.get_or_create(username=f'bench_writer_{n}', defaults={'password': '!'})[0]
+            for n in range(self.threads)
+        ]
+        samples, errors = [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.threads + 1)
+
+        # Sessions and the recipes to update are set up before the clock starts
+        writers = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            writers.append((client, Recipe.objects.create(user=user, **form_data('Write Load'))))
+
+        def worker(client, recipe):
+            barrier.wait()
+            try:
+                for n in range(self.writes):
+                    url = (
+                        reverse('recipesns:recipe_update', args=[recipe.pk]) if n % 2
+                        else reverse('recipesns:recipe_create')
+                    )
+                    data = {**form_data(f'Write Load {n}'), 'diet_tags': ['vegan']}
+                    began = time.perf_counter()
+                    try:
+                        response = client.post(url, data)
+                    except OperationalError as e:
+                        with lock:
+                            errors.append(str(e))
+                        continue
+                    with lock:
+                        if response.status_code == 302:
+                            samples.append(time.perf_counter() - began)
+                        else:
+                            errors.append(f'HTTP {response.status_code}')
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=writer) for writer in writers]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        result = summarize(samples, elapsed) if samples else {'requests': 0}
+        return {
+            **result,
+            'threads': self.threads,
+            'attempted': self.threads * self.writes,
+            'errors': len(errors),
+            'locked_errors': sum('locked' in error for error in errors),
+            'writes_per_s': round(len(samples) / elapsed, 1),
+        }
+
+
+def database_profile():
+    options = connection.settings_dict.get('OPTIONS', {})
+    profile = {
+        'engine': connection.vendor,
+        'options': {key: value for key, value in options.items() if key != 'password'},
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+    }
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            profile['journal_mode'] = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+    return profile
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'recipes': Recipe.objects.count(),
+        'public_recipes': Recipe.objects.filter(is_public=True).count(),
+        'users': User.objects.count(),
+    }
+
+
+def compare(previous, current):
+    # Lines of p50/p95 changes per scenario, slower (positive) or faster (negative) in percent
+    lines = []
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        changes = [
+            f"{key} {result[key]:.1f}ms ({(result[key] - before[key]) / before[key] * 100:+.0f}%)"
+            for key in ('p50_ms', 'p95_ms') if before[key]
+        ]
+        lines.append(f"{name}: {', '.join(changes)}")
+    return lines
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
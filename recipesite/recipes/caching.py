@@ -0,0 +1,189 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
+
+from .replicas import reading_from_replica
+
+# Versioned page caching for the list and table views.
+#
+# Every cached page depends on a few version counters: "public" for public recipes, plus "user:<id>" for a logged-in
+# viewer's own private recipes. A Recipe save/delete bumps only the counters it affects (see signals.py). The
+# versions are part of every cache key, so a bump makes the old entries unreachable and they simply expire. A version
+# is the time of the bump in microseconds, which doubles as the page's Last-Modified.
+#
+# Anonymous pages are cached fully rendered. Pages for logged-in users embed a per-session CSRF token in the navbar,
+# so for them only the page of recipes (the queryset result) is cached and the template is rendered per request. For
+# the same reason their ETag covers the CSRF secret, which changes at every login, and they get no Last-Modified: a
+# 304 across a re-login would keep a page whose forms (logout included) are rejected. JSON responses embed no token.
+#
+# With read replicas a page rendered just after a bump may come from a replica that hasn't caught up yet. Such pages
+# are neither cached nor sent with validators (see replica_may_lag), so no stale copy outlives the lag window, here or
+# in a browser or CDN holding the new version's ETag.
+
+
+def get_cache():
+    return caches[settings.RECIPES_CACHE_ALIAS]
+
+
+def version_key(scope):
+    return f'recipes:version:{scope}'
+
+
+def viewer_scopes(user):
+    if user.is_authenticated:
+        return ['public', f'user:{user.pk}']
+    return ['public']
+
+
+def get_versions(scopes):
+    cache = get_cache()
+    keys = {scope: version_key(scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for scope, key in keys.items():
+        if key not in found:
+            # Never bumped, or evicted: start a fresh version so nothing cached earlier can be served
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+            found[key] = cache.get(key)
+        versions[scope] = found[key]
+    return versions
+
+
+async def aget_versions(scopes):
+    cache = get_cache()
+    keys = {scope: version_key(scope) for scope in scopes}
+    found = await cache.aget_many(keys.values())
+    versions = {}
+    for scope, key in keys.items():
+        if key not in found:
+            await cache.aadd(key, time.time_ns() // 1000, timeout=None)
+            found[key] = await cache.aget(key)
+        versions[scope] = found[key]
+    return versions
+
+
+def bump_versions(scopes):
+    # Returns the new version
+    now = time.time_ns() // 1000
+    get_cache().set_many({version_key(scope): now for scope in scopes}, timeout=None)
+    return now
+
+
+def replica_may_lag(last_modified):
+    # Whether this request reads from a replica that may not have caught up with the versions bumped at
+    # `last_modified` (whole seconds, hence the extra second)
+    return reading_from_replica() and time.time() < last_modified + 1 + settings.RECIPES_REPLICA_PIN_SECONDS
+
+
+def cache_page(key, value, last_modified):
+    if not replica_may_lag(last_modified):
+        get_cache().set(key, value, settings.RECIPES_PAGE_CACHE_TIMEOUT)
+
+
+async def acache_page(key, value, last_modified):
+    if not replica_may_lag(last_modified):
+        await get_cache().aset(key, value, settings.RECIPES_PAGE_CACHE_TIMEOUT)
+
+
+def recipe_scopes(recipe, was_public=False):
+    # Cache scopes whose pages can show this recipe, before or after the change
+    scopes = [f'user:{recipe.user_id}'] if recipe.user_id else []
+    if recipe.is_public or was_public:
+        scopes.append('public')
+    return scopes
+
+
+def session_bound(request, html):
+    # Whether the response embeds the session's CSRF token
+    return html and request.user.is_authenticated
+
+
+def request_cache_key(request, name, html=True):
+    # Cache key of one response: the viewer, the full query string (page cursor, sort, dir, ...) and the viewer's
+    # cache versions. Returns (key, ETag, Last-Modified timestamp); none of it needs a database query.
+    return versioned_cache_key(request, name, html, get_versions(viewer_scopes(request.user)))
+
+
+async def arequest_cache_key(request, name, html=True):
+    # request_cache_key() for async views, which must have resolved request.user already
+    return versioned_cache_key(request, name, html, await aget_versions(viewer_scopes(request.user)))
+
+
+def versioned_cache_key(request, name, html, versions):
+    user = request.user
+    viewer = f'user{user.pk}' if user.is_authenticated else 'anon'
+    version = '.'.join(str(versions[scope]) for scope in sorted(versions))
+    # Sorted so ?sort=cost&dir=asc and ?dir=asc&sort=cost share an entry
+    params = sorted((key, value) for key, values in request.GET.lists() for value in values)
+    query = hashlib.md5(urlencode(params).encode()).hexdigest()
+    key = f'recipes:page:{name}:{viewer}:{version}:{query}'
+    validator = f"{key}:{request.META.get('CSRF_COOKIE', '')}" if session_bound(request, html) else key
+    return key, '"%s"' % hashlib.md5(validator.encode()).hexdigest(), max(versions.values()) // 1_000_000
+
+
+def conditional_response(request, etag, last_modified, html=True):
+    # A 304 if the client's copy is current, else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=None if session_bound(request, html) else last_modified
+    )
+    if response is not None:
+        return add_cache_headers(request, response, etag, last_modified, html)
+    return None
+
+
+def add_cache_headers(request, response, etag, last_modified, html=True):
+    if response.status_code != 304 and replica_may_lag(last_modified):
+        # Possibly stale: a 304 against these validators would keep it in the client until the next bump
+        patch_cache_control(response, no_store=True)
+        return response
+    response.headers['ETag'] = etag
+    if not session_bound(request, html):
+        response.headers['Last-Modified'] = http_date(last_modified)
+    # Browsers and CDNs may keep the response but must revalidate it (cheaply, via a 304) on every use
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    else:
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
+
+
+class VersionedPageCacheMixin:
+    # For ListViews: conditional GET (ETag / Last-Modified) and page caching, see request_cache_key()
+    cache_name = None
+
+    def get(self, request, *args, **kwargs):
+        self.page_cache_key, etag, last_modified = request_cache_key(request, self.cache_name)
+        self.page_last_modified = last_modified
+
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        anonymous = not request.user.is_authenticated
+        if anonymous:
+            content = get_cache().get(f'{self.page_cache_key}:html')
+            if content is not None:
+                return add_cache_headers(request, HttpResponse(content), etag, last_modified)
+
+        response = super().get(request, *args, **kwargs)
+        if anonymous:
+            response.add_post_render_callback(
+                lambda r: cache_page(f'{self.page_cache_key}:html', r.content, last_modified)
+            )
+        return add_cache_headers(request, response, etag, last_modified)
+
+    def paginate_queryset(self, queryset, page_size):
+        # The page object holds an evaluated list, so it pickles without re-running or dragging along the queryset
+        key = f'{self.page_cache_key}:page'
+        cached = get_cache().get(key)
+        if cached is None:
+            _, page, _, is_paginated = super().paginate_queryset(queryset, page_size)
+            cached = (page, is_paginated)
+            cache_page(key, cached, self.page_last_modified)
+        page, is_paginated = cached
+        return None, page, page.object_list, is_paginated
@@ -0,0 +1,67 @@
+import re
+
+# Canonical diet tags parsed from the free-form Recipe.diet text ("Vegan, gluten free" -> vegan, gluten-free). Each
+# tag owns one bit of Recipe.diet_mask, so "vegan AND gluten-free" is a single integer test instead of text matching.
+# Bits are stored in the database: only ever append to this list, never reorder or reuse an entry.
+
+# (name, label, other spellings)
+DIET_TAGS = [
+    ('vegan', 'Vegan', ['plant based', 'plant-based']),
+    ('vegetarian', 'Vegetarian', ['veggie', 'vegeterian', 'lacto ovo vegetarian', 'lacto-ovo vegetarian']),
+    ('gluten-free', 'Gluten-Free', ['gluten free', 'glutenfree', 'gf', 'no gluten']),
+    ('dairy-free', 'Dairy-Free', ['dairy free', 'df', 'no dairy', 'lactose free', 'lactose-free']),
+    ('keto', 'Keto', ['ketogenic']),
+    ('paleo', 'Paleo', ['paleolithic', 'primal']),
+    ('pescatarian', 'Pescatarian', ['pescetarian']),
+    ('low-carb', 'Low-Carb', ['low carb']),
+    ('nut-free', 'Nut-Free', ['nut free', 'no nuts']),
+    ('whole30', 'Whole30', ['whole 30']),
+]
+
+DIET_BITS = {name: 1 << bit for bit, (name, _, _) in enumerate(DIET_TAGS)}
+DIET_LABELS = {name: label for name, label, _ in DIET_TAGS}
+
+
+def normalize_fragment(text):
+    # Lower-case words without punctuation: "Gluten-Free!" -> "gluten free"
+    return ' '.join(re.sub(r'[^\w\s-]', ' ', text.lower()).replace('-', ' ').split())
+
+
+ALIASES = {
+    normalize_fragment(spelling): name
+    for name, label, spellings in DIET_TAGS
+    for spelling in [name, label, *spellings]
+}
+
+
+def split_diet_text(text):
+    return [part.strip() for part in re.split(r'[,;/\n]+', text or '') if part.strip()]
+
+
+def parse_diets(text):
+    # Canonical tag names in the text, in order of first appearance; unrecognized fragments are skipped
+    names = []
+    for part in split_diet_text(text):
+        name = ALIASES.get(normalize_fragment(part))
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def diet_mask(names):
+    mask = 0
+    for name in names:
+        mask |= DIET_BITS.get(name, 0)
+    return mask
+
+
+def mask_names(mask):
+    return [name for name, bit in DIET_BITS.items() if mask & bit]
+
+
+def diet_text(names, text=''):
+    # The diet text for the chosen tags: their labels, plus whatever fragments of `text` are not diet tags (free-form
+    # notes like "low sodium" survive)
+    notes = [part for part in split_diet_text(text) if normalize_fragment(part) not in ALIASES]
+    ordered = [name for name, _, _ in DIET_TAGS if name in names]
+    return ', '.join([DIET_LABELS[name] for name in ordered] + notes)
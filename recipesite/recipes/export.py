@@ -0,0 +1,89 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Streaming exports of the recipe table. Rows come from QuerySet.iterator(), are encoded one at a time and handed out
+# in buffered chunks, so memory use stays flat however many recipes are exported.
+
+EXPORT_CHUNK_SIZE = 2000
+# Bytes collected before a chunk is handed to the response or file
+BUFFER_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('name', 'name'),
+    ('description', 'description'),
+    ('cost', 'cost'),
+    ('time', 'time'),
+    ('ingredients', 'ingredients'),
+    ('diet', 'diet'),
+    ('is_public', 'is_public'),
+    ('created_at', 'created_at'),
+    ('author', 'user__username'),
+]
+
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+FORMATS = ['csv', 'jsonl', 'csv.gz', 'jsonl.gz']
+
+
+class _Echo:
+    # File-like object for csv.writer that hands back each formatted line instead of storing it
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    return queryset.values_list(*(lookup for _, lookup in EXPORT_COLUMNS)).iterator(chunk_size=chunk_size)
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parse_format(name):
+    # 'csv', 'jsonl', 'csv.gz' or 'jsonl.gz' -> (base format, gzip?); ValueError for anything else
+    if name not in FORMATS:
+        raise ValueError(f"Unknown export format {name!r}; choose one of {', '.join(FORMATS)}.")
+    base, _, compression = name.partition('.')
+    return base, compression == 'gz'
+
+
+def export_stream(queryset, name, chunk_size=EXPORT_CHUNK_SIZE):
+    # Iterator of bytes with the whole export of `queryset` in format `name`
+    base, compressed = parse_format(name)
+    lines = (csv_lines if base == 'csv' else jsonl_lines)(export_rows(queryset, chunk_size))
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if compressed else chunks
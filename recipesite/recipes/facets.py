@@ -0,0 +1,154 @@
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.db import models, transaction
+
+from .caching import cache_page, get_cache, get_versions
+from .diets import DIET_LABELS, parse_diets
+from .models import Recipe, RecipeFacetCount
+
+# Facet counts and aggregate stats of the public recipes: how many per diet, cost bucket, time bucket and author, plus
+# the total. They live precomputed in RecipeFacetCount, one row per (facet, value), so reading them never scans the
+# Recipe table. The Recipe signals apply the difference every save/delete makes (see signals.py), the bulk paths
+# (importer, benchmark data) call record_created(), and the reconcile_recipe_facets command repairs any drift from
+# queryset.update(), raw SQL or a crash between the two writes.
+
+FACET_FIELDS = ('is_public', 'user_id', 'diet', 'cost', 'time')
+
+# (lower bound, label); a value falls in the last bucket whose bound it reaches
+COST_BUCKETS = [(0, 'Under $5'), (5, '$5 to $9'), (10, '$10 to $19'), (20, '$20 to $49'), (50, '$50 and up')]
+TIME_BUCKETS = [(0, 'Under 15 min'), (15, '15 to 29 min'), (30, '30 to 59 min'), (60, '1 to 2 hours'),
+                (120, '2 hours and up')]
+
+TOP_USERS = 10
+
+
+def bucket(value, buckets):
+    found = buckets[0][0]
+    for bound, _ in buckets:
+        if value is not None and value >= bound:
+            found = bound
+    return str(found)
+
+
+def diet_values(diet):
+    # "Vegetarian, gluten free" counts once for "vegetarian" and once for "gluten-free"; no known diet counts as ""
+    return parse_diets(diet) or ['']
+
+
+def facet_values(values):
+    # The (facet, value) rows one recipe counts towards, from a dict of its FACET_FIELDS; none unless public
+    if not values.get('is_public'):
+        return []
+    keys = [('total', ''), ('cost', bucket(values['cost'], COST_BUCKETS)), ('time', bucket(values['time'], TIME_BUCKETS))]
+    keys += [('diet', value) for value in diet_values(values['diet'])]
+    if values.get('user_id'):
+        keys.append(('user', str(values['user_id'])))
+    return keys
+
+
+def recipe_values(recipe):
+    return {name: getattr(recipe, name) for name in FACET_FIELDS}
+
+
+def record_change(old, new):
+    # Apply the move of one recipe from `old` to `new` (dicts of FACET_FIELDS; {} for "did not exist")
+    deltas = Counter(facet_values(new))
+    deltas.subtract(facet_values(old))
+    apply(deltas)
+
+
+def record_created(recipes):
+    apply(Counter(key for recipe in recipes for key in facet_values(recipe_values(recipe))))
+
+
+def apply(deltas):
+    # One INSERT for rows not seen before, then one UPDATE per distinct delta (usually just +1 and -1)
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    by_delta = defaultdict(list)
+    for (facet, value), delta in deltas.items():
+        by_delta[delta].append(models.Q(facet=facet, value=value))
+    with transaction.atomic(savepoint=False):
+        new = [RecipeFacetCount(facet=facet, value=value) for (facet, value), delta in deltas.items() if delta > 0]
+        if new:
+            RecipeFacetCount.objects.bulk_create(new, ignore_conflicts=True)
+        for delta, keys in by_delta.items():
+            RecipeFacetCount.objects.filter(reduce(or_, keys)).update(count=models.F('count') + delta)
+
+
+def compute_counts(recipes):
+    # The counts from scratch, with one GROUP BY per facet column over the given (public) recipes
+    counts = Counter()
+    counts['total', ''] = recipes.count()
+    for diet, total in recipes.values_list('diet').annotate(total=models.Count('id')).order_by():
+        for value in diet_values(diet):
+            counts['diet', value] += total
+    for field, buckets in (('cost', COST_BUCKETS), ('time', TIME_BUCKETS)):
+        for value, total in recipes.values_list(field).annotate(total=models.Count('id')).order_by():
+            counts[field, bucket(value, buckets)] += total
+    for user_id, total in recipes.values_list('user_id').annotate(total=models.Count('id')).order_by():
+        if user_id:
+            counts['user', str(user_id)] += total
+    return counts
+
+
+def reconcile(dry_run=False):
+    # Make RecipeFacetCount match compute_counts(); returns the [(facet, value, stored, actual)] that differed
+    with transaction.atomic():
+        actual = compute_counts(Recipe.objects.filter(is_public=True))
+        stored = {
+            (facet, value): count
+            for facet, value, count in RecipeFacetCount.objects.select_for_update().values_list('facet', 'value', 'count')
+        }
+        drift = [
+            (facet, value, stored.get((facet, value), 0), actual[facet, value])
+            for facet, value in sorted(set(actual) | set(stored))
+            if stored.get((facet, value), 0) != actual[facet, value]
+        ]
+        if dry_run:
+            return drift
+        for facet, value, _, count in drift:
+            RecipeFacetCount.objects.update_or_create(facet=facet, value=value, defaults={'count': count})
+        RecipeFacetCount.objects.filter(count=0).delete()
+    return drift
+
+
+def facet_stats():
+    # The stats as the API and the table page show them, cached until the next public recipe change
+    version = get_versions(['public'])['public']
+    key = f'recipes:facets:{version}'
+    stats = get_cache().get(key)
+    if stats is None:
+        stats = _build_stats()
+        cache_page(key, stats, version // 1_000_000)
+    return stats
+
+
+def _build_stats():
+    rows = defaultdict(dict)
+    for facet, value, count in RecipeFacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count'):
+        rows[facet][value] = count
+
+    top_users = sorted(rows['user'].items(), key=lambda item: (-item[1], int(item[0])))[:TOP_USERS]
+    usernames = dict(User.objects.filter(pk__in=[int(pk) for pk, _ in top_users]).values_list('pk', 'username'))
+    return {
+        'total': rows['total'].get('', 0),
+        'authors': len(rows['user']),
+        'diet': [
+            {'value': value, 'label': DIET_LABELS.get(value, value.title()) or 'Not specified', 'count': count}
+            for value, count in sorted(rows['diet'].items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'cost': [
+            {'value': str(bound), 'label': label, 'count': rows['cost'].get(str(bound), 0)}
+            for bound, label in COST_BUCKETS
+        ],
+        'time': [
+            {'value': str(bound), 'label': label, 'count': rows['time'].get(str(bound), 0)}
+            for bound, label in TIME_BUCKETS
+        ],
+        'users': [{'value': pk, 'label': usernames.get(int(pk), ''), 'count': count} for pk, count in top_users],
+    }
@@ -1,10 +1,63 @@
 from django import forms
+from .diets import DIET_TAGS, diet_text, parse_diets
+from .jobs import ENRICHED_FIELDS, enrichment_enabled
 from .models import Recipe
 
 # Custom class for creating and editing Recipe objects
 class RecipeForm(forms.ModelForm):
+    # Canonical diets as checkboxes, merged with the free-form diet text in clean()
+    diet_tags = forms.MultipleChoiceField(
+        choices=[(name, label) for name, label, _ in DIET_TAGS],
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+        label='Diet tags',
+    )
+    # Rendered next to the checkboxes, so the form knows an unticked box means "remove". Posts without it (scripts,
+    # tests) can only add tags through the boxes; the diet text still sets them in full.
+    diet_tags_shown = forms.BooleanField(required=False, initial=True, widget=forms.HiddenInput)
+
     class Meta:
         # The model to build the form for
         model = Recipe
-        # Which form fields will be included in the form
-        exclude = ['user', 'created_at']
\ No newline at end of file
+        # Which form fields will be included in the form; the diet_tags rows follow from the diet text on save
+        exclude = ['user', 'created_at', 'parsed_ingredients', 'diet_tags']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Ticking tags is enough; the text is then written from them
+        self.fields['diet'].required = False
+        self.fields['diet'].help_text = 'Tags and any other notes, e.g. "Vegan, low sodium".'
+        # Left empty on a new recipe, these are filled in from Spoonacular in the background (see jobs.enrich_recipe),
+        # if that is enabled and configured
+        if not self.instance.pk and enrichment_enabled():
+            for name in ENRICHED_FIELDS:
+                self.fields[name].required = False
+                self.fields[name].help_text = 'Leave empty to look it up from the name.'
+        self.initial_diets = parse_diets(self.instance.diet) if self.instance.pk else []
+        self.initial.setdefault('diet_tags', self.initial_diets)
+
+    def clean(self):
+        # The tags are those named in the text plus newly ticked boxes, minus unticked ones. The text is then rewritten
+        # as the tag labels followed by its free-form notes, so both always agree.
+        cleaned_data = super().clean()
+        text = cleaned_data.get('diet') or ''
+        chosen = set(cleaned_data.get('diet_tags') or [])
+        unticked = set(self.initial_diets) - chosen if cleaned_data.get('diet_tags_shown') else set()
+        tags = (set(parse_diets(text)) | (chosen - set(self.initial_diets))) - unticked
+        cleaned_data['diet'] = diet_text(tags, text)
+        # 0 marks an unknown cost or time
+        for name in ('cost', 'time'):
+            if cleaned_data.get(name) is None and name not in self.errors:
+                cleaned_data[name] = 0
+        if not cleaned_data['diet']:
+            self.add_error('diet', 'Tick a diet tag or describe the diet.')
+        return cleaned_data
+
+
+# Free-form pantry list, parsed the same way as recipe ingredients
+class PantryForm(forms.Form):
+    items = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 4}),
+        help_text='Comma-separated, e.g. "eggs, rice, garlic".',
+    )
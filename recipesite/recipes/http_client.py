@@ -0,0 +1,322 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from .instrumentation import record_http
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Shared clients for external recipe APIs: a keep-alive connection pool, bounded retries with jittered exponential
+# backoff on 429/5xx (honouring a Retry-After of up to `max_retry_after` seconds; a longer one ends the retries, as
+# waiting that long would outlast any caller), a circuit breaker that fails fast while the upstream is down, and
+# latency/outcome metrics in recipes.metrics. HttpClient (requests) serves the sync views, AsyncHttpClient (httpx) the
+# async ones.
+#
+# Retries and Retry-After waits add up across the calls one request makes, so interactive callers wrap them all in
+# `with time_budget(seconds):`. Inside it, each call's timeouts are cut to the time left, a retry only starts if its
+# wait plus a whole attempt still fit, and once the budget is spent calls fail at once with BudgetExhausted.
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+request_duration = registry.histogram(
+    'recipes_http_client_request_duration_seconds', 'Latency of outbound API calls, retries included.'
+)
+request_outcomes = registry.counter(
+    'recipes_http_client_requests_total', 'Outbound API calls by client and outcome.'
+)
+request_retries = registry.counter(
+    'recipes_http_client_retries_total', 'Retries performed by the outbound API clients.'
+)
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class BudgetExhausted(requests.Timeout):
+    pass
+
+
+class Budget:
+    def __init__(self, deadline):
+        self.deadline = deadline
+        # Longest a single attempt of the call in progress may take (its timeouts), for the retries to check against
+        self.attempt = 0.0
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+
+current_budget = contextvars.ContextVar('http_client_budget', default=None)
+
+
+@contextmanager
+def time_budget(seconds):
+    # A nested budget never extends the one around it
+    outer = current_budget.get()
+    deadline = time.monotonic() + seconds
+    token = current_budget.set(Budget(deadline if outer is None else min(deadline, outer.deadline)))
+    try:
+        yield
+    finally:
+        current_budget.reset(token)
+
+
+def budget_timeout(timeout):
+    # `timeout` (seconds or (connect, read)) cut to the current budget, which then expects attempts of that length;
+    # raises BudgetExhausted when nothing is left
+    budget = current_budget.get()
+    if budget is None:
+        return timeout
+    remaining = budget.remaining()
+    if remaining <= 0:
+        raise BudgetExhausted('Time budget for upstream calls spent.')
+    if timeout is None:
+        timeout = remaining
+    elif isinstance(timeout, tuple):
+        timeout = tuple(min(part, remaining) for part in timeout)
+    else:
+        timeout = min(timeout, remaining)
+    budget.attempt = sum(timeout) if isinstance(timeout, tuple) else timeout
+    return timeout
+
+
+def budget_allows(wait):
+    # Whether a retry after `wait` seconds, and a whole attempt, fit in what is left of the current budget
+    budget = current_budget.get()
+    return budget is None or wait + budget.attempt <= budget.remaining()
+
+
+class CircuitBreaker:
+    # closed: calls go through. After `failure_threshold` consecutive failures the breaker opens and calls fail
+    # immediately. Once `reset_timeout` seconds have passed, one trial call is let through (half-open): success closes
+    # the breaker again, failure re-opens it for another `reset_timeout`.
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        # Returns True if this call is the half-open trial; the caller must then end_trial() however the call ends
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial_in_flight):
+                raise CircuitOpenError('Circuit open; upstream marked as down.')
+            if state == 'half-open':
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def end_trial(self):
+        # Lets the next trial through if this one ended without an outcome (cancelled, or a non-upstream error)
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.reset()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+
+
+class CappedRetry(Retry):
+    # urllib3 Retry that gives up (returning the response, as raise_on_status=False, or raising the error) instead of
+    # sleeping when Retry-After asks for more than `max_retry_after` seconds, or the retry wouldn't fit in the budget
+
+    def __init__(self, *args, max_retry_after=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry_after = self.get_retry_after(response) if response is not None else None
+        if retry_after is not None and self.max_retry_after is not None and retry_after > self.max_retry_after:
+            raise MaxRetryError(_pool, url, ResponseError(f'Retry-After of {retry_after:g}s is too long'))
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if not budget_allows(retry_after if retry_after is not None else retry.get_backoff_time()):
+            raise MaxRetryError(_pool, url, error or ResponseError('No time left in the budget to retry'))
+        return retry
+
+
+class HttpClient:
+    def __init__(self, name, pool_size=10, retries=2, backoff_factor=0.2, backoff_jitter=0.2,
+                 failure_threshold=5, reset_timeout=30.0, max_retry_after=5.0):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        retry = CappedRetry(
+            max_retry_after=max_retry_after,
+            total=retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, params=None, timeout=None):
+        # Returns the response; raises CircuitOpenError (or BudgetExhausted) without any I/O while the breaker is open
+        # (or the time budget spent). Connection errors, timeouts and 429/5xx responses that survive the retries
+        # count as upstream failures.
+        timeout = budget_timeout(timeout)
+        trial = self.breaker.before_call()
+        try:
+            return self._get(url, params, timeout)
+        finally:
+            if trial:
+                self.breaker.end_trial()
+
+    def _get(self, url, params, timeout):
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=timeout)
+        except requests.RequestException as e:
+            self._finish(start, 'error')
+            self.breaker.record_failure()
+            logger.warning('%s GET %s failed: %s', self.name, url, e)
+            raise
+
+        retries = response.raw.retries
+        if retries is not None and retries.history:
+            request_retries.inc(len(retries.history), client=self.name)
+
+        if response.status_code in RETRY_STATUSES:
+            self._finish(start, str(response.status_code))
+            self.breaker.record_failure()
+        else:
+            self._finish(start, 'ok' if response.ok else str(response.status_code))
+            self.breaker.record_success()
+        return response
+
+    def _finish(self, start, outcome):
+        duration = time.perf_counter() - start
+        request_duration.observe(duration, client=self.name)
+        request_outcomes.inc(client=self.name, outcome=outcome)
+        record_http(duration)
+
+
+class AsyncHttpClient:
+    # httpx counterpart of HttpClient with the same retry policy, outcomes and metrics. Pass the sync client's breaker
+    # to share one view of the upstream's health. httpx clients are tied to the event loop they were created on, so
+    # there is one pool per running loop (normally just the ASGI server's).
+
+    def __init__(self, name, max_connections=100, retries=2, backoff_factor=0.2, backoff_jitter=0.2, breaker=None,
+                 failure_threshold=5, reset_timeout=30.0, max_retry_after=5.0):
+        self.name = name
+        self.max_connections = max_connections
+        self.retries = retries
+        self.max_retry_after = max_retry_after
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.breaker = breaker or CircuitBreaker(failure_threshold, reset_timeout)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            client = self._clients[loop] = httpx.AsyncClient(limits=limits)
+        return client
+
+    def _backoff(self, attempt, response=None):
+        # Seconds to wait before retry `attempt`, or None to stop retrying
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.isdigit():
+            return int(retry_after) if int(retry_after) <= self.max_retry_after else None
+        return self.backoff_factor * 2 ** (attempt - 1) + random.uniform(0, self.backoff_jitter)
+
+    async def get(self, url, params=None, timeout=None):
+        # Same contract as HttpClient.get; a (connect, read) tuple timeout is accepted as well
+        budget_timeout(timeout)
+        trial = self.breaker.before_call()
+        try:
+            return await self._get(url, params, timeout)
+        finally:
+            if trial:
+                self.breaker.end_trial()
+
+    async def _get(self, url, params, timeout):
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                attempt_timeout = budget_timeout(timeout)
+                if isinstance(attempt_timeout, tuple):
+                    attempt_timeout = httpx.Timeout(attempt_timeout[1], connect=attempt_timeout[0])
+                response = await self._client().get(url, params=params, timeout=attempt_timeout)
+            except httpx.TransportError as e:
+                delay = self._backoff(attempt + 1)
+                if attempt < self.retries and budget_allows(delay):
+                    attempt += 1
+                    request_retries.inc(client=self.name)
+                    await asyncio.sleep(delay)
+                    continue
+                self._finish(start, 'error')
+                self.breaker.record_failure()
+                logger.warning('%s GET %s failed: %s', self.name, url, e)
+                raise
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                delay = self._backoff(attempt + 1, response)
+                if delay is not None and budget_allows(delay):
+                    attempt += 1
+                    request_retries.inc(client=self.name)
+                    await asyncio.sleep(delay)
+                    continue
+            break
+
+        if response.status_code in RETRY_STATUSES:
+            self._finish(start, str(response.status_code))
+            self.breaker.record_failure()
+        else:
+            self._finish(start, 'ok' if response.is_success else str(response.status_code))
+            self.breaker.record_success()
+        return response
+
+    def _finish(self, start, outcome):
+        duration = time.perf_counter() - start
+        request_duration.observe(duration, client=self.name)
+        request_outcomes.inc(client=self.name, outcome=outcome)
+        record_http(duration)
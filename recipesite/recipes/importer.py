@@ -0,0 +1,151 @@
+import csv
+import json
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms import DateTimeField
+from django.utils import timezone
+
+from . import facets, suggest
+from .caching import bump_versions, recipe_scopes
+from .forms import RecipeForm
+from .models import DietTag, Recipe, RecipeIngredient
+from .spoonacular import to_suggestion, trim_information
+
+# Bulk import of recipes from CSV, JSON Lines or Spoonacular JSON. Rows are validated with RecipeForm's own field
+# validators (built once, not a form per row) and inserted with bulk_create in batches, one transaction per batch.
+
+FORMATS = ['csv', 'jsonl', 'spoonacular']
+IMPORT_BATCH_SIZE = 1000
+
+# The diet tags follow from the diet text
+FORM_FIELDS = {
+    name: field for name, field in RecipeForm.base_fields.items() if name not in ('diet_tags', 'diet_tags_shown')
+}
+created_at_field = DateTimeField(required=False)
+
+
+def read_csv(stream):
+    # (line number, row) pairs; the header is line 1
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = {'__error__': f'Invalid JSON: {e}'}
+            yield number, row if isinstance(row, dict) else {'__error__': 'Expected a JSON object.'}
+
+
+def from_spoonacular(data):
+    return {
+        'name': data.get('title', ''),
+        **to_suggestion(trim_information(data)),
+        'diet': ', '.join(data.get('diets', [])),
+    }
+
+
+def read_spoonacular(stream):
+    # A complexSearch response ({"results": [...]}, with addRecipeInformation) or a list of /information payloads.
+    # Unlike the line formats this is one JSON document, so it is loaded in full.
+    data = json.load(stream)
+    results = data.get('results', []) if isinstance(data, dict) else data
+    for number, item in enumerate(results, 1):
+        yield number, from_spoonacular(item)
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl, 'spoonacular': read_spoonacular}
+
+
+def guess_format(path):
+    name = (path or '').removesuffix('.gz')
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.json'):
+        return 'spoonacular'
+    return 'jsonl'
+
+
+def clean_row(row):
+    # Returns (field values, errors) using RecipeForm's fields. Unknown columns (e.g. the export's id and author) are
+    # ignored; a missing is_public falls back to the model default instead of an unticked checkbox.
+    if '__error__' in row:
+        return None, {'__all__': [row['__error__']]}
+
+    values, errors = {}, {}
+    for name, field in FORM_FIELDS.items():
+        if name == 'is_public' and row.get(name) in (None, ''):
+            values[name] = Recipe._meta.get_field(name).default
+            continue
+        try:
+            values[name] = field.clean(row.get(name))
+        except ValidationError as e:
+            errors[name] = e.messages
+
+    try:
+        values['created_at'] = created_at_field.clean(row.get('created_at')) or timezone.now()
+    except ValidationError as e:
+        errors['created_at'] = e.messages
+    return values, errors
+
+
+class Importer:
+    # Feed rows with add(); call finish() at the end. `on_reject(number, row, errors)` receives every invalid row and
+    # `on_progress(importer)` runs after each committed batch.
+
+    def __init__(self, user=None, batch_size=IMPORT_BATCH_SIZE, on_reject=None, on_progress=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.on_reject = on_reject
+        self.on_progress = on_progress
+        self.imported = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+        self._batch = []
+        self._scopes = set()
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.imported / elapsed if elapsed else 0.0
+
+    def add(self, number, row):
+        values, errors = clean_row(row)
+        if errors:
+            self.rejected += 1
+            if self.on_reject:
+                self.on_reject(number, row, errors)
+            return
+        self._batch.append(Recipe(user=self.user, **values))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def finish(self):
+        self._flush()
+        # bulk_create sends no post_save signals, so count the facets per batch and invalidate the page caches once for
+        # the whole import
+        if self._scopes:
+            bump_versions(self._scopes)
+        if 'public' in self._scopes:
+            suggest.record_bulk_change()
+
+    def _flush(self):
+        if not self._batch:
+            return
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(self._batch)
+            RecipeIngredient.objects.sync(recipes)
+            DietTag.objects.sync(recipes)
+            facets.record_created(recipes)
+        for recipe in recipes:
+            self._scopes.update(recipe_scopes(recipe))
+        self.imported += len(recipes)
+        self._batch = []
+        if self.on_progress:
+            self.on_progress(self)
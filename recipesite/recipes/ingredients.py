@@ -0,0 +1,107 @@
+import re
+from collections import namedtuple
+from fractions import Fraction
+
+# Parsing of the free-form Recipe.ingredients text ("2 cloves garlic, 1 lb chicken breast, salt") into canonical
+# ingredient names with an optional quantity and unit. Known vocabulary terms win, so "2 cloves garlic" and "Garlic"
+# both become "garlic".
+
+# Basic list of common ingredients (expand as needed)
+COMMON_INGREDIENTS = [
+    'chicken', 'beef', 'pork', 'tofu', 'salmon', 'shrimp',
+    'rice', 'beans', 'cheese', 'potato', 'egg', 'tomato',
+    'lettuce', 'onion', 'garlic', 'carrot', 'broccoli',
+    'spinach', 'mushroom', 'pepper', 'bacon', 'turkey',
+    'chocolate', 'strawberry', 'banana', 'apple'
+]
+
+UNITS = {
+    'cup': 'cup', 'cups': 'cup', 'c': 'cup',
+    'tablespoon': 'tbsp', 'tablespoons': 'tbsp', 'tbsp': 'tbsp', 'tbs': 'tbsp',
+    'teaspoon': 'tsp', 'teaspoons': 'tsp', 'tsp': 'tsp',
+    'gram': 'g', 'grams': 'g', 'g': 'g', 'kilogram': 'kg', 'kilograms': 'kg', 'kg': 'kg',
+    'ounce': 'oz', 'ounces': 'oz', 'oz': 'oz', 'pound': 'lb', 'pounds': 'lb', 'lb': 'lb', 'lbs': 'lb',
+    'milliliter': 'ml', 'milliliters': 'ml', 'ml': 'ml', 'liter': 'l', 'liters': 'l', 'l': 'l',
+    'clove': 'clove', 'cloves': 'clove', 'pinch': 'pinch', 'dash': 'dash',
+    'can': 'can', 'cans': 'can', 'slice': 'slice', 'slices': 'slice', 'piece': 'piece', 'pieces': 'piece',
+    'bunch': 'bunch', 'handful': 'handful', 'stick': 'stick', 'sticks': 'stick',
+    'package': 'package', 'packages': 'package',
+}
+
+# Fragments left over when a comma-joined list is split inside an item, e.g. "2 cloves garlic, minced"
+PREPARATIONS = {
+    'minced', 'chopped', 'diced', 'sliced', 'grated', 'peeled', 'crushed', 'divided', 'optional', 'to taste',
+    'finely chopped', 'thinly sliced', 'softened', 'melted', 'drained', 'rinsed', 'for garnish',
+}
+
+UNICODE_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+QUANTITY_RE = re.compile(r'^(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*[\d./]+)?\s*')
+UNIT_RE = re.compile(r'^(' + '|'.join(sorted(map(re.escape, UNITS), key=len, reverse=True)) + r')\.?\s+(?:of\s+)?')
+# Whole-word matches, singular or plural ("egg"/"eggs", "tomato"/"tomatoes", "beans"/"bean")
+VOCABULARY_RE = [
+    (term, re.compile(rf"\b{re.escape(term[:-1] if term.endswith('s') else term)}(?:e?s)?\b"))
+    for term in COMMON_INGREDIENTS
+]
+
+ParsedIngredient = namedtuple('ParsedIngredient', ['name', 'quantity', 'unit'])
+
+
+def extract_known_ingredient(query):
+    query_lower = query.lower()
+    for ingredient in COMMON_INGREDIENTS:
+        if ingredient in query_lower:
+            return ingredient
+    return None
+
+
+def normalize_ingredient_name(text):
+    # Canonical form used for Ingredient.name: a vocabulary term if one occurs, else the lower-cased singular text
+    text = ' '.join(re.sub(r'\([^)]*\)', ' ', text.lower()).split()).strip(' .;:-*')
+    text = re.sub(r'\s+(?:to taste|for garnish|optional)$', '', text)
+    for term, pattern in VOCABULARY_RE:
+        if pattern.search(text):
+            return term
+    if text.endswith('ies') and len(text) > 4:
+        text = text[:-3] + 'y'
+    elif text.endswith('s') and not text.endswith(('ss', 'us')) and len(text) > 3:
+        text = text[:-1]
+    return text[:100]
+
+
+def _parse_quantity(text):
+    match = QUANTITY_RE.match(text)
+    if not match:
+        return None, text
+    whole, _, fraction = match.group(1).partition(' ')
+    quantity = float(Fraction(whole)) + (float(Fraction(fraction)) if fraction else 0)
+    return quantity, text[match.end():]
+
+
+def parse_ingredient(item):
+    # One list entry, e.g. "1 1/2 cups of rice (uncooked)" -> ("rice", 1.5, "cup"); None for leftovers like "minced"
+    text = item.strip()
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    quantity, text = _parse_quantity(text.strip())
+
+    unit = ''
+    match = UNIT_RE.match(text.lower())
+    if match and (quantity is not None or match.group(1) not in ('c', 'l', 'g')):
+        unit = UNITS[match.group(1)]
+        text = text[match.end():]
+
+    name = normalize_ingredient_name(text)
+    if not name or name in PREPARATIONS or not re.search(r'[a-z]', name):
+        return None
+    return ParsedIngredient(name, quantity, unit)
+
+
+def parse_ingredients(text):
+    # All distinct ingredients of a free-form list, in order of first appearance
+    parsed = {}
+    for item in re.split(r'[,\n;]+', text or ''):
+        ingredient = parse_ingredient(item)
+        if ingredient is not None and ingredient.name not in parsed:
+            parsed[ingredient.name] = ingredient
+    return list(parsed.values())
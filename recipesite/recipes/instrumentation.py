@@ -0,0 +1,175 @@
+import contextvars
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+from .metrics import registry
+
+logger = logging.getLogger('recipes.requests')
+
+# Per-request performance instrumentation.
+#
+# InstrumentationMiddleware keeps a RequestStats in a context variable for the duration of each request. While it is
+# set, every SQL query (through a database execute wrapper), template render and outbound API call (HttpClient /
+# AsyncHttpClient) adds its time to it. At the end the stats are sent as a Server-Timing header and handed to the
+# sinks in RECIPES_INSTRUMENTATION_SINKS. Context variables follow the request into sync_to_async threads, so async
+# views are measured too. Outside a request the hooks do a single lookup and nothing else.
+
+_current = contextvars.ContextVar('recipes_request_stats', default=None)
+
+request_duration = registry.histogram(
+    'recipes_request_duration_seconds', 'Wall time of requests by URL name.'
+)
+request_sql_duration = registry.histogram(
+    'recipes_request_sql_duration_seconds', 'SQL time per request by URL name.'
+)
+request_sql_queries = registry.histogram(
+    'recipes_request_sql_queries', 'SQL queries per request by URL name.', buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+request_template_duration = registry.histogram(
+    'recipes_request_template_duration_seconds', 'Template render time per request by URL name.'
+)
+request_http_duration = registry.histogram(
+    'recipes_request_http_duration_seconds', 'Outbound API time per request by URL name.'
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.status = None
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.http_count = 0
+        self.http_time = 0.0
+        self._render_started = None
+
+    def server_timing(self):
+        return ', '.join([
+            f'total;dur={self.duration * 1000:.1f}',
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'http;dur={self.http_time * 1000:.1f};desc="{self.http_count} calls"',
+        ])
+
+
+def current_stats():
+    return _current.get()
+
+
+def sql_timer(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - start
+        stats.sql_count += 1
+
+
+def install_sql_timer(connection, **kwargs):
+    # A standing execute wrapper on every connection, instead of connection.execute_wrapper() around each request:
+    # async views run their queries on other threads, with their own connections
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+connection_created.connect(install_sql_timer)
+
+
+def record_http(duration):
+    stats = _current.get()
+    if stats is not None:
+        stats.http_count += 1
+        stats.http_time += duration
+
+
+# Sinks: callables receiving the finished RequestStats
+
+
+def log_sink(stats):
+    logger.info(
+        'view=%s status=%s total_ms=%.1f sql_queries=%d sql_ms=%.1f template_ms=%.1f http_calls=%d http_ms=%.1f',
+        stats.view, stats.status, stats.duration * 1000, stats.sql_count, stats.sql_time * 1000,
+        stats.template_time * 1000, stats.http_count, stats.http_time * 1000,
+    )
+
+
+def metrics_sink(stats):
+    # Rendered by the metrics view in the Prometheus text format
+    request_duration.observe(stats.duration, view=stats.view)
+    request_sql_duration.observe(stats.sql_time, view=stats.view)
+    request_sql_queries.observe(stats.sql_count, view=stats.view)
+    request_template_duration.observe(stats.template_time, view=stats.view)
+    request_http_duration.observe(stats.http_time, view=stats.view)
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sinks = [import_string(path) for path in settings.RECIPES_INSTRUMENTATION_SINKS]
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            install_sql_timer(connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    def process_template_response(self, request, response):
+        # Called just before a TemplateResponse is rendered; the post-render callback marks the end
+        stats = _current.get()
+        if stats is not None:
+            stats._render_started = time.perf_counter()
+            response.add_post_render_callback(lambda r: self._rendered(stats))
+        return response
+
+    @staticmethod
+    def _rendered(stats):
+        stats.template_time += time.perf_counter() - stats._render_started
+
+    def finish(self, request, response, stats):
+        # Streaming responses are timed up to the first byte
+        stats.duration = time.perf_counter() - stats.started
+        stats.status = response.status_code
+        match = getattr(request, 'resolver_match', None)
+        stats.view = match.view_name if match else 'unresolved'
+
+        if settings.RECIPES_SERVER_TIMING:
+            response.headers['Server-Timing'] = stats.server_timing()
+        for sink in self.sinks:
+            try:
+                sink(stats)
+            except Exception:
+                logger.exception('Instrumentation sink %r failed', sink)
+        return response
@@ -0,0 +1,233 @@
+import hashlib
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import spoonacular
+from .caching import get_cache
+from .models import Job, Recipe
+
+logger = logging.getLogger(__name__)
+
+# Background jobs, queued in the Job table and run by `manage.py run_workers`, so nothing but the database is needed.
+#
+# - Idempotent: every job has a key. Enqueueing a key that is waiting or running is a no-op; a finished one is queued
+#   again. Handlers only fill in what is still missing, so running one twice does no harm.
+# - Claiming is a compare-and-set UPDATE on the job row, so any number of worker processes can poll the table without
+#   running a job twice. A claimed job holds a lease; if its worker dies the job is claimed again when the lease ends.
+# - A failing job is retried with exponential backoff (plus jitter) until RECIPES_JOBS_MAX_ATTEMPTS runs have failed.
+# - Handlers that call Spoonacular are rate limited to RECIPES_JOBS_RATE_LIMIT runs per minute, so background work
+#   stays under the API quota and leaves room for the autofill button.
+
+HANDLERS = {}
+RATE_LIMITED = set()
+
+MAX_RETRY_DELAY = 60 * 60
+
+
+def handler(kind, rate_limited=False):
+    def register(function):
+        HANDLERS[kind] = function
+        if rate_limited:
+            RATE_LIMITED.add(kind)
+        return function
+    return register
+
+
+def job_key(kind, identity):
+    key = f'{kind}:{identity}'
+    if len(key) > 255:
+        key = f'{kind}:sha256:' + hashlib.sha256(key.encode()).hexdigest()
+    return key
+
+
+def enqueue(kind, identity, payload=None, delay=0):
+    # Queues the job unless one with the same key is already waiting or running; returns the key
+    key = job_key(kind, identity)
+    values = {
+        'kind': kind, 'payload': payload or {}, 'status': Job.PENDING, 'attempts': 0, 'last_error': '',
+        'run_at': timezone.now() + timedelta(seconds=delay), 'locked_by': '', 'locked_until': None,
+        'finished_at': None,
+    }
+    requeued = Job.objects.filter(key=key, status__in=[Job.DONE, Job.FAILED]).update(**values)
+    if not requeued:
+        Job.objects.bulk_create([Job(key=key, **values)], ignore_conflicts=True)
+    return key
+
+
+def claimable(now):
+    return Q(status=Job.PENDING, run_at__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+
+
+def claim(worker, lease=None):
+    # Takes the next due job for `worker`, or returns None
+    now = timezone.now()
+    lease = timedelta(seconds=lease or settings.RECIPES_JOBS_LEASE)
+    candidates = Job.objects.filter(claimable(now)).order_by('run_at', 'id').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        claimed = Job.objects.filter(claimable(now), pk=job_id).update(
+            status=Job.RUNNING, locked_by=worker, locked_until=now + lease, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def retry_delay(attempts):
+    # Seconds before run `attempts + 1`: RECIPES_JOBS_RETRY_DELAY doubled per failed run, +-50% jitter
+    delay = settings.RECIPES_JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+    return min(delay * random.uniform(0.5, 1.5), MAX_RETRY_DELAY)
+
+
+def finish(job, worker, error=None):
+    # Records the outcome, unless the lease was lost and another worker owns the job by now
+    now = timezone.now()
+    owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker)
+    if error is None:
+        return owned.update(status=Job.DONE, finished_at=now, locked_by='', locked_until=None, last_error='')
+    if job.attempts >= settings.RECIPES_JOBS_MAX_ATTEMPTS:
+        return owned.update(status=Job.FAILED, finished_at=now, locked_by='', locked_until=None, last_error=error)
+    return owned.update(
+        status=Job.PENDING, run_at=now + timedelta(seconds=retry_delay(job.attempts)), locked_by='',
+        locked_until=None, last_error=error,
+    )
+
+
+class RateLimiter:
+    # At most `rate` acquisitions per `period` seconds, counted in fixed windows in the page cache. Worker processes
+    # sharing that cache (Redis, Memcached) share the limit; with the default LocMemCache each process counts alone,
+    # so run_workers gives each its share of the rate.
+
+    def __init__(self, name, rate, period=60):
+        self.name = name
+        self.rate = rate
+        self.period = period
+
+    def acquire(self):
+        # 0 if a run may start now, else the seconds until the next window
+        now = time.time()
+        window = int(now // self.period)
+        key = f'recipes:ratelimit:{self.name}:{window}'
+        cache = get_cache()
+        cache.add(key, 0, self.period * 2)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(key, 1, self.period * 2)
+            count = 1
+        if count <= self.rate:
+            return 0
+        return (window + 1) * self.period - now
+
+
+class Worker:
+    def __init__(self, name=None, rate_limit=None, poll_interval=1.0, sleep=time.sleep):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.limiter = RateLimiter('spoonacular', rate_limit or settings.RECIPES_JOBS_RATE_LIMIT)
+        self.poll_interval = poll_interval
+        self.sleep = sleep
+        self.stopping = False
+
+    def run_job(self, job):
+        if job.kind in RATE_LIMITED:
+            while wait := self.limiter.acquire():
+                self.sleep(wait)
+        try:
+            HANDLERS[job.kind](**job.payload)
+        except Exception as e:
+            logger.warning('Job %s failed on run %d: %s', job.key, job.attempts, e)
+            finish(job, self.name, error=''.join(traceback.format_exception_only(e)).strip() or repr(e))
+            return False
+        finish(job, self.name)
+        return True
+
+    def run(self, burst=False):
+        # Runs jobs until stop() (or, with `burst`, until none is due); returns the number of jobs run
+        count = 0
+        while not self.stopping:
+            job = claim(self.name)
+            if job is None:
+                if burst:
+                    break
+                self.sleep(self.poll_interval)
+                continue
+            self.run_job(job)
+            count += 1
+        return count
+
+    def stop(self, *args):
+        self.stopping = True
+
+
+# ----------------------------------------------------------------------
+# Handlers
+# ----------------------------------------------------------------------
+
+# Fields enrichment may fill in; empty text or a 0 cost/time means "not given"
+ENRICHED_FIELDS = ('description', 'ingredients', 'cost', 'time')
+
+
+def enrichment_enabled():
+    # New recipes may leave ENRICHED_FIELDS empty only when a lookup will actually fill them in
+    return settings.RECIPES_ENRICH_ON_CREATE and bool(settings.SPOONACULAR_API_KEY)
+
+
+def needs_enrichment(recipe):
+    return any(not getattr(recipe, name) for name in ENRICHED_FIELDS)
+
+
+def enqueue_enrichment(recipe):
+    return enqueue('enrich_recipe', recipe.pk, {'recipe_id': recipe.pk})
+
+
+@handler('enrich_recipe', rate_limited=True)
+def enrich_recipe(recipe_id):
+    # Fills the recipe's missing description, ingredients, cost and time from the Spoonacular match of its name
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not needs_enrichment(recipe):
+        return
+    suggestion = spoonacular.lookup(recipe.name)
+    if suggestion is None:
+        return
+    fields = [name for name in ENRICHED_FIELDS if not getattr(recipe, name) and suggestion.get(name)]
+    for name in fields:
+        setattr(recipe, name, suggestion[name])
+    if fields:
+        recipe.save(update_fields=fields)
+
+
+@handler('prewarm_autofill', rate_limited=True)
+def prewarm_autofill(query):
+    # Puts the autofill answer for a query into the Spoonacular cache
+    spoonacular.lookup(query)
+
+
+def popular_queries(limit):
+    # The most common public recipe names: the dishes people are likeliest to ask autofill about
+    return list(
+        Recipe.objects.filter(is_public=True)
+        .values(query=Lower('name'))
+        .annotate(recipes=Count('id'))
+        .order_by('-recipes', 'query')
+        .values_list('query', flat=True)[:limit]
+    )
+
+
+def enqueue_prewarm(queries):
+    # Queues a prewarm job for every query whose autofill answer isn't cached yet; returns those queries
+    queued = []
+    for query in sorted({spoonacular.normalize_query(query) for query in queries} - {''}):
+        if spoonacular.cache_get(spoonacular.search_key(query)) is None:
+            enqueue('prewarm_autofill', query, {'query': query})
+            queued.append(query)
+    return queued
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import DietTag, Recipe, RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the stored description/ingredients previews, parsed ingredients (with ingredient_count) and diet '
+        'tags (with diet_mask) of every recipe, e.g. after changing PREVIEW_LENGTH, the ingredient parser or the diet '
+        'vocabulary, or after raw SQL edits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        batch = []
+        recipes = Recipe.objects.only('description', 'ingredients', 'diet').order_by('pk').iterator(chunk_size=batch_size)
+        for recipe in recipes:
+            recipe.refresh_previews()
+            recipe.refresh_diet_mask()
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                total += self._save(batch)
+                batch = []
+        total += self._save(batch)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed summaries of {total} recipes.'))
+
+    def _save(self, batch):
+        Recipe.objects.bulk_update(batch, ['description_preview', 'ingredients_preview', 'diet_mask'])
+        RecipeIngredient.objects.sync(batch)
+        DietTag.objects.sync(batch)
+        return len(batch)
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from recipes.benchmarks import Benchmark, compare, environment, load_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the recipe views (list deep pages, table sorts, detail, create, update, autofill against a local '
+        'Spoonacular stub) and report p50/p95/p99 latency and throughput as JSON. Run it against a disposable '
+        'database filled by generate_recipes: it creates recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per scenario.')
+        parser.add_argument('--depth', type=int, default=50, help='Page number for the deep page scenarios.')
+        parser.add_argument('--warm-cache', action='store_true', help='Keep the page cache between requests.')
+        parser.add_argument('--autofill-delay', type=float, default=0.05, help='Stub upstream latency in seconds.')
+        parser.add_argument('--only', nargs='+', help='Run only scenarios starting with these prefixes.')
+        parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout).')
+        parser.add_argument('--compare', help='Earlier JSON report to print p50/p95 changes against.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        benchmark = Benchmark(
+            iterations=options['iterations'], warmup=options['warmup'], warm_cache=options['warm_cache'],
+            depth=options['depth'], seed=options['seed'], autofill_delay=options['autofill_delay'],
+        )
+
+        def progress(name, result):
+            self.stderr.write(f"{name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                              f"{result['throughput_rps']} req/s")
+
+        # DEBUG would keep every query in connection.queries and skew the numbers
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            report = {**environment(), 'options': {
+                key: options[key] for key in ('iterations', 'warmup', 'depth', 'warm_cache', 'autofill_delay')
+            }}
+            report['scenarios'] = benchmark.run(only=options['only'], progress=progress)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            for line in compare(load_report(options['compare']), report):
+                self.stderr.write(line)
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from recipes.benchmarks import WriteLoad, compare, database_profile, environment, load_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Write load test: concurrent clients post create and update forms; reports write throughput, latency and '
+        'lock errors as JSON. Run it once per database profile (e.g. SQLITE_TUNING=0, then the default) against a '
+        'disposable database and compare the reports with --compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers.')
+        parser.add_argument('--writes', type=int, default=50, help='Writes per writer.')
+        parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout).')
+        parser.add_argument('--compare', help='Earlier JSON report to print p50/p95 changes against.')
+
+    def handle(self, *args, **options):
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            report = {**environment(), 'database_profile': database_profile(), 'options': {
+                key: options[key] for key in ('threads', 'writes')
+            }}
+            result = WriteLoad(threads=options['threads'], writes=options['writes']).run()
+            report['scenarios'] = {'writes': result}
+        self.stderr.write(
+            f"{result['writes_per_s']} writes/s, p95 {result.get('p95_ms')}ms, "
+            f"{result['errors']} of {result['attempted']} failed ({result['locked_errors']} locked)"
+        )
+
+        output = json.dumps(report, indent=2, default=str)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            previous = load_report(options['compare'])
+            for line in compare(previous, report):
+                self.stderr.write(line)
+            before = previous['scenarios']['writes']
+            self.stderr.write(
+                f"writes/s {before['writes_per_s']} -> {result['writes_per_s']}, "
+                f"errors {before['errors']} -> {result['errors']}"
+            )
@@ -0,0 +1,49 @@
+import sys
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.export import FORMATS, export_stream
+from recipes.table import FILTER_PARAMS, SORT_FIELDS, table_queryset
+
+
+class Command(BaseCommand):
+    help = 'Stream the recipe table to a file or stdout as CSV or JSON Lines, optionally gzipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help='File to write to (default: stdout).')
+        parser.add_argument(
+            '--user', help="Export what this username sees: public recipes plus their own (default: public only)."
+        )
+        parser.add_argument('--sort', choices=SORT_FIELDS)
+        parser.add_argument('--dir', choices=['asc', 'desc'])
+        # The table's filters, with the same meaning as its GET parameters
+        for bound in ('cost_min', 'cost_max', 'time_min', 'time_max'):
+            parser.add_argument(f"--{bound.replace('_', '-')}", dest=bound, type=int)
+        parser.add_argument('--diet', action='append', help='Only recipes tagged with this diet; may repeat.')
+        parser.add_argument('--owner', help="Only this username's recipes.")
+        parser.add_argument('--mine', action='store_true', help="Only the --user's own recipes.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        user = AnonymousUser()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist.")
+
+        if options['mine'] and not options['user']:
+            raise CommandError('--mine needs --user.')
+        params = {key: options[key] for key in ('sort', 'dir', *FILTER_PARAMS) if options[key] not in (None, False)}
+        chunks = export_stream(table_queryset(user, params), options['format'], chunk_size=options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
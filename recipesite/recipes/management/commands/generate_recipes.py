@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.benchmarks import generate_recipes
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with synthetic users and recipes for benchmarking (e.g. --count 10000, 100000, 1000000).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Recipes to create.')
+        parser.add_argument('--users', type=int, help='Users to spread them over (default: count / 20).')
+        parser.add_argument('--public-ratio', type=float, default=0.7, help='Share of public recipes.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        step = max(count // 10, options['batch_size'])
+
+        def progress(created):
+            if created % step < options['batch_size'] or created == count:
+                self.stdout.write(f'{created}/{count} recipes')
+
+        generate_recipes(
+            count, users=options['users'], public_ratio=options['public_ratio'], seed=options['seed'],
+            batch_size=options['batch_size'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created {count} recipes.'))
@@ -0,0 +1,76 @@
+import gzip
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.importer import FORMATS, IMPORT_BATCH_SIZE, READERS, Importer, guess_format
+
+
+class Command(BaseCommand):
+    help = 'Bulk import recipes from CSV, JSON Lines or Spoonacular JSON, writing rejected rows to a side file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Input file, optionally .gz (default: stdin).')
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: guessed from the file name).')
+        parser.add_argument('--user', help='Username that will own the imported recipes (default: none).')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per INSERT transaction.')
+        parser.add_argument(
+            '--rejects', help='JSON Lines file for rejected rows (default: <path>.rejects.jsonl, or rejects.jsonl).'
+        )
+        parser.add_argument('--progress-every', type=int, default=10000, help='Report throughput every N rows.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(None if path == '-' else path)
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist.")
+
+        rejects_path = options['rejects'] or ('rejects.jsonl' if path == '-' else f'{path}.rejects.jsonl')
+        rejects = None
+        last_report = 0
+
+        def on_reject(number, row, errors):
+            nonlocal rejects
+            if rejects is None:
+                rejects = open(rejects_path, 'w', encoding='utf-8')
+            rejects.write(json.dumps({'line': number, 'row': row, 'errors': errors}, default=str) + '\n')
+
+        def on_progress(importer):
+            nonlocal last_report
+            if importer.imported - last_report >= options['progress_every']:
+                last_report = importer.imported
+                self.stdout.write(
+                    f'{importer.imported} imported, {importer.rejected} rejected ({importer.rate:,.0f} rows/s)'
+                )
+
+        importer = Importer(user, options['batch_size'], on_reject=on_reject, on_progress=on_progress)
+        try:
+            with self._open(path) as stream:
+                for number, row in READERS[fmt](stream):
+                    importer.add(number, row)
+            importer.finish()
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+        finally:
+            if rejects is not None:
+                rejects.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.imported} recipes ({importer.rate:,.0f} rows/s), rejected {importer.rejected}.'
+        ))
+        if importer.rejected:
+            self.stdout.write(f'Rejected rows written to {rejects_path}')
+
+    def _open(self, path):
+        if path == '-':
+            return open(sys.stdin.fileno(), encoding='utf-8', closefd=False)
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt', encoding='utf-8', newline='')
+        return open(path, encoding='utf-8', newline='')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.jobs import enqueue_prewarm, popular_queries
+
+
+class Command(BaseCommand):
+    help = (
+        'Queue background jobs that put autofill answers into the Spoonacular cache before anyone asks: the given '
+        'queries plus the most common public recipe names. Queries already cached are skipped. Run the jobs with '
+        'run_workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help='Dish names to prewarm.')
+        parser.add_argument('--popular', type=int, default=100, help='How many common recipe names to add.')
+
+    def handle(self, *args, **options):
+        queued = enqueue_prewarm([*options['queries'], *popular_queries(options['popular'])])
+        self.stdout.write(self.style.SUCCESS(f'Queued {len(queued)} prewarm jobs.'))
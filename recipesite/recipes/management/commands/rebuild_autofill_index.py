@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.autofill_index import build_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the local autofill index from the cached Spoonacular recipes and the public recipes, and swap it in '
+        'for the running workers. Run it periodically (e.g. nightly from cron) to pick up new recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='Where to write the index (default: the RECIPES_AUTOFILL_INDEX_PATH setting).'
+        )
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.RECIPES_AUTOFILL_INDEX_PATH
+        start = time.perf_counter()
+        count = build_index(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} dishes into {path} in {time.perf_counter() - start:.1f}s.'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.caching import bump_versions
+from recipes.facets import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the public recipe facets (diet, cost, time, author) with GROUP BY queries and repair the stored '
+        'counters where they drifted, e.g. after queryset.update() or raw SQL. Meant to run periodically from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drift.')
+
+    def handle(self, *args, **options):
+        drift = reconcile(dry_run=options['dry_run'])
+        for facet, value, stored, actual in drift:
+            self.stdout.write(f'{facet}={value!r}: stored {stored}, actual {actual}')
+        if drift and not options['dry_run']:
+            # Cached stats and pages were built from the drifted counts
+            bump_versions(['public'])
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drift)} drifted facet counts.'))
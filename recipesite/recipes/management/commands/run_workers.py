@@ -0,0 +1,64 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipes.caching import get_cache
+from recipes.jobs import Worker
+
+
+def run_worker(rate_limit, poll_interval, burst):
+    worker = Worker(rate_limit=rate_limit, poll_interval=poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    try:
+        return worker.run(burst=burst)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs (recipe enrichment, autofill prewarming) from the database queue in a pool of worker '
+        'processes. Stop with Ctrl+C or SIGTERM; running jobs finish first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Worker processes.')
+        parser.add_argument('--rate-limit', type=int, help='Spoonacular jobs per minute (default: the setting).')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        rate_limit = options['rate_limit'] or settings.RECIPES_JOBS_RATE_LIMIT
+        if isinstance(get_cache(), LocMemCache):
+            # Each process counts its own calls, so split the quota between them
+            rate_limit = max(1, rate_limit // processes)
+        args = (rate_limit, options['poll_interval'], options['burst'])
+
+        if processes == 1:
+            count = run_worker(*args)
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} jobs.'))
+            return
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=run_worker, args=args) for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        # Pass a SIGTERM on to the workers (Process.terminate() sends them SIGTERM), which stop after their current job
+        signal.signal(signal.SIGTERM, lambda *_: [worker.terminate() for worker in workers if worker.is_alive()])
+        self.stdout.write(f'Started {processes} workers.')
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # The children got the SIGINT too; wait for their current jobs
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
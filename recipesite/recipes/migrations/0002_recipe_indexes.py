@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['created_at', 'id'], name='recipe_public_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['name', 'id'], name='recipe_public_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['cost', 'id'], name='recipe_public_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['time', 'id'], name='recipe_public_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['is_public', 'id'], name='recipe_public_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', False)), fields=['user', 'created_at', 'id'], name='recipe_private_created_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# The search index as of this migration, so later edits to recipes/search.py can't change what it creates or drops
+
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_COLUMNS = ('name', 'description', 'ingredients', 'diet')
+TRIGGERS = ('ai', 'ad', 'au')
+
+
+def fts_statements():
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    delete_old = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, content='recipes_recipe', "
+        f"content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON recipes_recipe BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON recipes_recipe BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON recipes_recipe "
+        f"BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ]
+
+
+def search_gin_index():
+    vector = (
+        SearchVector('name', weight='A', config='english')
+        + SearchVector('ingredients', weight='B', config='english')
+        + SearchVector('diet', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    )
+    return GinIndex(vector, name='recipe_search_vector_idx')
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('recipes', 'Recipe'), search_gin_index())
+    elif schema_editor.connection.vendor == 'sqlite':
+        for statement in fts_statements():
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('recipes', 'Recipe'), search_gin_index())
+    elif schema_editor.connection.vendor == 'sqlite':
+        for suffix in TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_spoonacular_cache'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,129 @@
+import re
+from fractions import Fraction
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+# The vocabulary and parsing as of this migration, so later edits to recipes/ingredients.py can't change what it does
+
+COMMON_INGREDIENTS = [
+    'chicken', 'beef', 'pork', 'tofu', 'salmon', 'shrimp',
+    'rice', 'beans', 'cheese', 'potato', 'egg', 'tomato',
+    'lettuce', 'onion', 'garlic', 'carrot', 'broccoli',
+    'spinach', 'mushroom', 'pepper', 'bacon', 'turkey',
+    'chocolate', 'strawberry', 'banana', 'apple'
+]
+
+UNITS = {
+    'cup': 'cup', 'cups': 'cup', 'c': 'cup',
+    'tablespoon': 'tbsp', 'tablespoons': 'tbsp', 'tbsp': 'tbsp', 'tbs': 'tbsp',
+    'teaspoon': 'tsp', 'teaspoons': 'tsp', 'tsp': 'tsp',
+    'gram': 'g', 'grams': 'g', 'g': 'g', 'kilogram': 'kg', 'kilograms': 'kg', 'kg': 'kg',
+    'ounce': 'oz', 'ounces': 'oz', 'oz': 'oz', 'pound': 'lb', 'pounds': 'lb', 'lb': 'lb', 'lbs': 'lb',
+    'milliliter': 'ml', 'milliliters': 'ml', 'ml': 'ml', 'liter': 'l', 'liters': 'l', 'l': 'l',
+    'clove': 'clove', 'cloves': 'clove', 'pinch': 'pinch', 'dash': 'dash',
+    'can': 'can', 'cans': 'can', 'slice': 'slice', 'slices': 'slice', 'piece': 'piece', 'pieces': 'piece',
+    'bunch': 'bunch', 'handful': 'handful', 'stick': 'stick', 'sticks': 'stick',
+    'package': 'package', 'packages': 'package',
+}
+
+PREPARATIONS = {
+    'minced', 'chopped', 'diced', 'sliced', 'grated', 'peeled', 'crushed', 'divided', 'optional', 'to taste',
+    'finely chopped', 'thinly sliced', 'softened', 'melted', 'drained', 'rinsed', 'for garnish',
+}
+
+UNICODE_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+QUANTITY_RE = re.compile(r'^(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*[\d./]+)?\s*')
+UNIT_RE = re.compile(r'^(' + '|'.join(sorted(map(re.escape, UNITS), key=len, reverse=True)) + r')\.?\s+(?:of\s+)?')
+VOCABULARY_RE = [
+    (term, re.compile(rf"\b{re.escape(term[:-1] if term.endswith('s') else term)}(?:e?s)?\b"))
+    for term in COMMON_INGREDIENTS
+]
+
+
+def normalize_ingredient_name(text):
+    text = ' '.join(re.sub(r'\([^)]*\)', ' ', text.lower()).split()).strip(' .;:-*')
+    text = re.sub(r'\s+(?:to taste|for garnish|optional)$', '', text)
+    for term, pattern in VOCABULARY_RE:
+        if pattern.search(text):
+            return term
+    if text.endswith('ies') and len(text) > 4:
+        text = text[:-3] + 'y'
+    elif text.endswith('s') and not text.endswith(('ss', 'us')) and len(text) > 3:
+        text = text[:-1]
+    return text[:100]
+
+
+def parse_ingredient(item):
+    # One list entry -> (name, quantity, unit), or None for leftovers like "minced"
+    text = item.strip()
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    text = text.strip()
+    quantity = None
+    match = QUANTITY_RE.match(text)
+    if match:
+        whole, _, fraction = match.group(1).partition(' ')
+        quantity = float(Fraction(whole)) + (float(Fraction(fraction)) if fraction else 0)
+        text = text[match.end():]
+
+    unit = ''
+    match = UNIT_RE.match(text.lower())
+    if match and (quantity is not None or match.group(1) not in ('c', 'l', 'g')):
+        unit = UNITS[match.group(1)]
+        text = text[match.end():]
+
+    name = normalize_ingredient_name(text)
+    if not name or name in PREPARATIONS or not re.search(r'[a-z]', name):
+        return None
+    return name, quantity, unit
+
+
+def parse_ingredients(text):
+    parsed = {}
+    for item in re.split(r'[,\n;]+', text or ''):
+        ingredient = parse_ingredient(item)
+        if ingredient is not None and ingredient[0] not in parsed:
+            parsed[ingredient[0]] = ingredient
+    return list(parsed.values())
+
+
+def parse_existing_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+
+    # The autofill vocabulary seeds the table so its terms get the lowest ids
+    Ingredient.objects.bulk_create([Ingredient(name=name) for name in COMMON_INGREDIENTS], ignore_conflicts=True)
+    ingredient_ids = dict(Ingredient.objects.values_list('name', 'id'))
+
+    rows = []
+    for recipe_id, text in Recipe.objects.values_list('id', 'ingredients').iterator(chunk_size=BATCH_SIZE):
+        for name, quantity, unit in parse_ingredients(text):
+            if name not in ingredient_ids:
+                ingredient_ids[name] = Ingredient.objects.create(name=name).id
+            rows.append(RecipeIngredient(
+                recipe_id=recipe_id, ingredient_id=ingredient_ids[name], quantity=quantity, unit=unit
+            ))
+        if len(rows) >= BATCH_SIZE:
+            RecipeIngredient.objects.bulk_create(rows)
+            rows = []
+    RecipeIngredient.objects.bulk_create(rows)
+
+
+def clear_parsed_ingredients(apps, schema_editor):
+    apps.get_model('recipes', 'RecipeIngredient').objects.all().delete()
+    apps.get_model('recipes', 'Ingredient').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredients'),
+    ]
+
+    operations = [
+        migrations.RunPython(parse_existing_ingredients, clear_parsed_ingredients),
+    ]
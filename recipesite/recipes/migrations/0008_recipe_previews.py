@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:20
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 1000
+
+
+def fill_previews(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    batch = []
+    for recipe in Recipe.objects.only('description', 'ingredients').iterator(chunk_size=BATCH_SIZE):
+        recipe.description_preview = Truncator(recipe.description).chars(60)
+        recipe.ingredients_preview = Truncator(recipe.ingredients).chars(60)
+        batch.append(recipe)
+        if len(batch) >= BATCH_SIZE:
+            Recipe.objects.bulk_update(batch, ['description_preview', 'ingredients_preview'])
+            batch = []
+    Recipe.objects.bulk_update(batch, ['description_preview', 'ingredients_preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_pantry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='description_preview',
+            field=models.CharField(blank=True, default='', editable=False, max_length=60),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_preview',
+            field=models.CharField(blank=True, default='', editable=False, max_length=60),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:39
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+
+# The buckets and diet splitting as of this migration, so later edits to recipes/facets.py can't change what it does
+
+# Lower bounds of the buckets; a value falls in the last bucket whose bound it reaches
+COST_BOUNDS = [0, 5, 10, 20, 50]
+TIME_BOUNDS = [0, 15, 30, 60, 120]
+
+
+def bucket(value, bounds):
+    found = bounds[0]
+    for bound in bounds:
+        if value is not None and value >= bound:
+            found = bound
+    return str(found)
+
+
+def diet_values(diet):
+    values = {part.strip().lower()[:100] for part in re.split(r'[,;/]+', diet or '')} - {''}
+    return sorted(values) or ['']
+
+
+def count_public_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeFacetCount = apps.get_model('recipes', 'RecipeFacetCount')
+
+    # One GROUP BY per facet column
+    public = Recipe.objects.filter(is_public=True)
+    counts = Counter()
+    counts['total', ''] = public.count()
+    for diet, total in public.values_list('diet').annotate(total=models.Count('id')).order_by():
+        for value in diet_values(diet):
+            counts['diet', value] += total
+    for field, bounds in (('cost', COST_BOUNDS), ('time', TIME_BOUNDS)):
+        for value, total in public.values_list(field).annotate(total=models.Count('id')).order_by():
+            counts[field, bucket(value, bounds)] += total
+    for user_id, total in public.values_list('user_id').annotate(total=models.Count('id')).order_by():
+        if user_id:
+            counts['user', str(user_id)] += total
+
+    RecipeFacetCount.objects.bulk_create([
+        RecipeFacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items() if count
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_previews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='unique_recipe_facet')],
+            },
+        ),
+        migrations.RunPython(count_public_recipes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:56
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# The diet tags and their parsing as of this migration, so later edits to recipes/diets.py can't change what it does
+
+# (name, label, other spellings)
+DIET_TAGS = [
+    ('vegan', 'Vegan', ['plant based', 'plant-based']),
+    ('vegetarian', 'Vegetarian', ['veggie', 'vegeterian', 'lacto ovo vegetarian', 'lacto-ovo vegetarian']),
+    ('gluten-free', 'Gluten-Free', ['gluten free', 'glutenfree', 'gf', 'no gluten']),
+    ('dairy-free', 'Dairy-Free', ['dairy free', 'df', 'no dairy', 'lactose free', 'lactose-free']),
+    ('keto', 'Keto', ['ketogenic']),
+    ('paleo', 'Paleo', ['paleolithic', 'primal']),
+    ('pescatarian', 'Pescatarian', ['pescetarian']),
+    ('low-carb', 'Low-Carb', ['low carb']),
+    ('nut-free', 'Nut-Free', ['nut free', 'no nuts']),
+    ('whole30', 'Whole30', ['whole 30']),
+]
+
+
+def normalize_fragment(text):
+    return ' '.join(re.sub(r'[^\w\s-]', ' ', text.lower()).replace('-', ' ').split())
+
+
+ALIASES = {
+    normalize_fragment(spelling): name
+    for name, label, spellings in DIET_TAGS
+    for spelling in [name, label, *spellings]
+}
+
+
+def parse_diets(text):
+    names = []
+    for part in re.split(r'[,;/\n]+', text or ''):
+        name = ALIASES.get(normalize_fragment(part))
+        if part.strip() and name and name not in names:
+            names.append(name)
+    return names
+
+
+def tag_existing_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    DietTag = apps.get_model('recipes', 'DietTag')
+    RecipeFacetCount = apps.get_model('recipes', 'RecipeFacetCount')
+    Through = Recipe.diet_tags.through
+
+    DietTag.objects.bulk_create([
+        DietTag(name=name, label=label, bit=bit) for bit, (name, label, _) in enumerate(DIET_TAGS)
+    ])
+    tag_ids = dict(DietTag.objects.values_list('name', 'id'))
+
+    bits = {name: 1 << bit for bit, (name, _, _) in enumerate(DIET_TAGS)}
+    recipes, rows = [], []
+    for recipe in Recipe.objects.only('diet').iterator(chunk_size=BATCH_SIZE):
+        names = parse_diets(recipe.diet)
+        recipe.diet_mask = sum(bits[name] for name in names)
+        recipes.append(recipe)
+        rows += [Through(recipe_id=recipe.pk, diettag_id=tag_ids[name]) for name in names]
+        if len(recipes) >= BATCH_SIZE:
+            Recipe.objects.bulk_update(recipes, ['diet_mask'])
+            Through.objects.bulk_create(rows)
+            recipes, rows = [], []
+    Recipe.objects.bulk_update(recipes, ['diet_mask'])
+    Through.objects.bulk_create(rows)
+
+    # The diet facet counts canonical tags from now on; recipes without a known diet count as ""
+    counts = Counter()
+    public = Recipe.objects.filter(is_public=True).values_list('diet').annotate(total=models.Count('id')).order_by()
+    for diet, total in public:
+        for value in parse_diets(diet) or ['']:
+            counts[value] += total
+    RecipeFacetCount.objects.filter(facet='diet').delete()
+    RecipeFacetCount.objects.bulk_create([
+        RecipeFacetCount(facet='diet', value=value, count=count) for value, count in counts.items() if count
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_facet_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DietTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True)),
+                ('label', models.CharField(max_length=50)),
+                ('bit', models.PositiveSmallIntegerField(unique=True)),
+            ],
+            options={
+                'ordering': ['bit'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='diet_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='diet_tags',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='recipes', to='recipes.diettag'),
+        ),
+        migrations.RunPython(tag_existing_recipes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', False)), fields=['user', 'name', 'id'], name='recipe_private_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', False)), fields=['user', 'cost', 'id'], name='recipe_private_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', False)), fields=['user', 'time', 'id'], name='recipe_private_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', False)), fields=['user', 'is_public', 'id'], name='recipe_private_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['user', 'name', 'id'], name='recipe_public_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['user', 'cost', 'id'], name='recipe_public_user_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['user', 'time', 'id'], name='recipe_public_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['user', 'is_public', 'id'], name='recipe_public_user_id_idx'),
+        ),
+    ]
@@ -1,9 +1,87 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Cast
 from django.utils import timezone
+from django.utils.text import Truncator
+
+from .diets import DIET_TAGS, diet_mask, mask_names, parse_diets
+from .ingredients import normalize_ingredient_name, parse_ingredients
 
 # Create your models here.
 
+# Characters of description/ingredients shown on listing pages
+PREVIEW_LENGTH = 60
+
+
+def make_preview(text):
+    # The same text truncatechars:60 renders, ellipsis included
+    return Truncator(text or '').chars(PREVIEW_LENGTH)
+
+
+def visibility_partitions(user):
+    # Public recipes plus the user's own private ones, as disjoint conditions that can each be answered from a single
+    # index. OR-ing them in one WHERE clause hides the indexes from the planner, so the paginator runs them separately.
+    partitions = [models.Q(is_public=True)]
+    if user is not None and user.is_authenticated:
+        partitions.append(models.Q(is_public=False, user=user))
+    return partitions
+
+
+class RecipeQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        condition = models.Q()
+        for partition in visibility_partitions(user):
+            condition |= partition
+        return self.filter(condition)
+
+    # bulk_create skips save(), so fill in the stored previews and diet mask here
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.refresh_previews()
+            obj.refresh_diet_mask()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def with_diets(self, names, lookup=None):
+        # Recipes tagged with every one of the given diet names: one bitwise test on diet_mask. No index can answer
+        # that test, so it filters rows found some other way (usually while walking a sort index). Pass one of the
+        # names as `lookup` to find the candidates through that tag's DietTag rows instead, for a rare diet.
+        mask = diet_mask(names)
+        queryset = self.alias(diet_match=models.F('diet_mask').bitand(mask)).filter(diet_match=mask)
+        if lookup is not None:
+            tagged = Recipe.diet_tags.through.objects.filter(diettag__name=lookup)
+            queryset = queryset.filter(pk__in=tagged.values('recipe_id'))
+        return queryset
+
+    # "Recipes containing X" queries go through the (ingredient, recipe) index of RecipeIngredient instead of parsing
+    # the ingredients text of every row
+    def with_any_ingredients(self, names):
+        names = {normalize_ingredient_name(name) for name in names}
+        return self.filter(
+            pk__in=RecipeIngredient.objects.filter(ingredient__name__in=names).values('recipe')
+        )
+
+    def with_all_ingredients(self, names):
+        names = {normalize_ingredient_name(name) for name in names}
+        matching = (
+            RecipeIngredient.objects.filter(ingredient__name__in=names)
+            .values('recipe')
+            .annotate(matched=models.Count('ingredient'))
+            .filter(matched=len(names))
+            .values('recipe')
+        )
+        return self.filter(pk__in=matching)
+
+    def ranked_by_pantry(self, ingredient_ids):
+        # One GROUP BY over the inverted index: recipes sharing at least one pantry ingredient, ordered by the
+        # fraction of their ingredients the pantry covers
+        return (
+            self.filter(recipe_ingredients__ingredient__in=ingredient_ids)
+            .annotate(matched=models.Count('recipe_ingredients'))
+            .annotate(coverage=Cast('matched', models.FloatField()) / models.F('ingredient_count'))
+            .order_by('-coverage', '-matched', '-id')
+        )
+
 
 class Recipe(models.Model):
     # The name/title of the recipe
@@ -21,9 +99,27 @@ class Recipe(models.Model):
     # List of ingredients required for the recipe
     ingredients = models.TextField()
 
+    # The same list parsed into canonical ingredients; rebuilt by the post_save signal whenever the text changes
+    parsed_ingredients = models.ManyToManyField(
+        'Ingredient', through='RecipeIngredient', related_name='recipes', blank=True
+    )
+
+    # Number of parsed ingredients, precomputed so pantry coverage is a division instead of a second aggregate
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # The start of the description and ingredients as listing pages show them, kept in sync by save() so listings can
+    # skip the full TextFields
+    description_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True, default='', editable=False)
+    ingredients_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True, default='', editable=False)
+
     # Dietary information or classification (e.g., "vegan", "gluten-free")
     diet = models.TextField()
 
+    # The diet text parsed into canonical tags, as rows (kept in sync by the post_save signal) and as one bit per tag
+    # (kept in sync by save()) so "vegan AND gluten-free" filters compare an integer instead of matching text
+    diet_tags = models.ManyToManyField('DietTag', related_name='recipes', blank=True, editable=False)
+    diet_mask = models.BigIntegerField(default=0, editable=False)
+
     # ForeignKey linking each recipe to a specific user (the recipe's author)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
 
@@ -33,6 +129,280 @@ class Recipe(models.Model):
     # Timestamp for when the recipe was created; defaults to the current time
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = RecipeQuerySet.as_manager()
+
+    def refresh_previews(self):
+        self.description_preview = make_preview(self.description)
+        self.ingredients_preview = make_preview(self.ingredients)
+
+    def refresh_diet_mask(self):
+        self.diet_mask = diet_mask(parse_diets(self.diet))
+
+    def save(self, *args, **kwargs):
+        self.refresh_previews()
+        self.refresh_diet_mask()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = {
+                'description': ['description_preview'], 'ingredients': ['ingredients_preview'], 'diet': ['diet_mask'],
+            }
+            extra = [name for field in update_fields for name in derived.get(field, [])]
+            if extra:
+                kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
+    # Keep the values as loaded from the database, so post_save receivers can tell what a save changed
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    class Meta:
+        # Each index matches one visibility partition and one ordering used by the list and table views, with the id
+        # tie-breaker last so cursor pagination can seek straight to the next page. They are partial indexes because
+        # Django renders is_public=True as a bare boolean column, which only a matching index WHERE clause can use.
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'], condition=models.Q(is_public=True), name='recipe_public_created_idx'
+            ),
+            models.Index(fields=['name', 'id'], condition=models.Q(is_public=True), name='recipe_public_name_idx'),
+            models.Index(fields=['cost', 'id'], condition=models.Q(is_public=True), name='recipe_public_cost_idx'),
+            models.Index(fields=['time', 'id'], condition=models.Q(is_public=True), name='recipe_public_time_idx'),
+            models.Index(
+                fields=['is_public', 'id'], condition=models.Q(is_public=True), name='recipe_public_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'created_at', 'id'],
+                condition=models.Q(is_public=False),
+                name='recipe_private_created_idx',
+            ),
+            models.Index(
+                fields=['user', 'name', 'id'], condition=models.Q(is_public=False), name='recipe_private_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'cost', 'id'], condition=models.Q(is_public=False), name='recipe_private_cost_idx'
+            ),
+            models.Index(
+                fields=['user', 'time', 'id'], condition=models.Q(is_public=False), name='recipe_private_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'is_public', 'id'], condition=models.Q(is_public=False), name='recipe_private_id_idx'
+            ),
+            # The table's owner filter: one author's public recipes in each sort order
+            models.Index(
+                fields=['user', 'name', 'id'], condition=models.Q(is_public=True), name='recipe_public_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'cost', 'id'], condition=models.Q(is_public=True), name='recipe_public_user_cost_idx'
+            ),
+            models.Index(
+                fields=['user', 'time', 'id'], condition=models.Q(is_public=True), name='recipe_public_user_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'is_public', 'id'], condition=models.Q(is_public=True), name='recipe_public_user_id_idx'
+            ),
+        ]
+
     # String representation of the object
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+class Ingredient(models.Model):
+    # Canonical, lower-case singular name, e.g. "garlic" for "2 cloves Garlic"
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class DietTagManager(models.Manager):
+    def sync(self, recipes):
+        # Rebuilds the diet tag rows of the given recipes from their diet_mask, in a fixed number of queries
+        recipes = list(recipes)
+        names = {name for recipe in recipes for name in mask_names(recipe.diet_mask)}
+        Through = Recipe.diet_tags.through
+        with transaction.atomic(using=self.db):
+            tag_ids = dict(self.filter(name__in=names).values_list('name', 'id'))
+            if names - set(tag_ids):
+                self.bulk_create(
+                    [DietTag(name=name, label=label, bit=bit) for bit, (name, label, _) in enumerate(DIET_TAGS)],
+                    ignore_conflicts=True,
+                )
+                tag_ids = dict(self.filter(name__in=names).values_list('name', 'id'))
+            Through.objects.using(self.db).filter(recipe_id__in=[recipe.pk for recipe in recipes]).delete()
+            Through.objects.using(self.db).bulk_create([
+                Through(recipe_id=recipe.pk, diettag_id=tag_ids[name])
+                for recipe in recipes
+                for name in mask_names(recipe.diet_mask)
+            ])
+
+
+class DietTag(models.Model):
+    # One canonical diet from recipes/diets.py, e.g. "gluten-free" (label "Gluten-Free"), owning bit `bit` of
+    # Recipe.diet_mask
+    name = models.CharField(max_length=30, unique=True)
+    label = models.CharField(max_length=50)
+    bit = models.PositiveSmallIntegerField(unique=True)
+
+    objects = DietTagManager()
+
+    class Meta:
+        ordering = ['bit']
+
+    def __str__(self):
+        return self.label
+
+
+class RecipeIngredientManager(models.Manager):
+    def sync(self, recipes):
+        # Rebuilds the parsed ingredient rows (and ingredient_count) of the given recipes from their ingredients text,
+        # in a fixed number of queries however many recipes are passed
+        recipes = list(recipes)
+        parsed = {recipe.pk: parse_ingredients(recipe.ingredients) for recipe in recipes}
+        names = {item.name for items in parsed.values() for item in items}
+        for recipe in recipes:
+            recipe.ingredient_count = len(parsed[recipe.pk])
+
+        with transaction.atomic(using=self.db):
+            Ingredient.objects.bulk_create([Ingredient(name=name) for name in names], ignore_conflicts=True)
+            ingredient_ids = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+
+            self.filter(recipe_id__in=parsed).delete()
+            self.bulk_create([
+                RecipeIngredient(
+                    recipe_id=recipe_id, ingredient_id=ingredient_ids[item.name], quantity=item.quantity, unit=item.unit
+                )
+                for recipe_id, items in parsed.items()
+                for item in items
+            ])
+            Recipe.objects.using(self.db).bulk_update(recipes, ['ingredient_count'])
+
+
+class RecipeIngredient(models.Model):
+    # Both foreign keys are covered by the composite unique constraint / index below
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='recipe_ingredients', db_index=False)
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, related_name='recipe_ingredients', db_index=False
+    )
+
+    # Parsed amount, when the text has one ("1 1/2 cups rice" -> 1.5 / "cup")
+    quantity = models.FloatField(null=True, blank=True)
+    unit = models.CharField(max_length=20, blank=True)
+
+    objects = RecipeIngredientManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'ingredient'], name='unique_recipe_ingredient'),
+        ]
+        # Inverted index: ingredient -> recipes using it
+        indexes = [
+            models.Index(fields=['ingredient', 'recipe'], name='ingredient_recipes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient} in {self.recipe}"
+
+
+class PantryItemManager(models.Manager):
+    def replace_for(self, user, names):
+        # Sets the user's pantry to exactly the given ingredient names
+        names = {normalize_ingredient_name(name) for name in names} - {''}
+        with transaction.atomic(using=self.db):
+            Ingredient.objects.bulk_create([Ingredient(name=name) for name in names], ignore_conflicts=True)
+            self.filter(user=user).delete()
+            self.bulk_create([
+                PantryItem(user=user, ingredient=ingredient)
+                for ingredient in Ingredient.objects.filter(name__in=names)
+            ])
+
+
+class PantryItem(models.Model):
+    # An ingredient the user has at home
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pantry_items', db_index=False)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='+')
+
+    objects = PantryItemManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'], name='unique_pantry_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient} ({self.user})"
+
+
+class RecipeFacetCount(models.Model):
+    # Number of public recipes with one facet value (see recipes/facets.py), e.g. ("diet", "vegan") or ("cost", "10")
+    # for the $10 to $19 bucket; kept current by the Recipe signals instead of a GROUP BY per request
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_recipe_facet'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+class SpoonacularCacheEntry(models.Model):
+    # Shared second-level cache for Spoonacular responses (see recipes/spoonacular.py), kept in the database so every
+    # worker process sees what the others already paid quota for
+
+    # Normalized request key, e.g. "search:garlic chicken|chicken" or "information:715538"
+    key = models.CharField(max_length=255, unique=True)
+
+    # Trimmed response payload; NULL marks a cached miss (no results / unknown recipe id)
+    payload = models.JSONField(null=True)
+
+    # When the entry stops being served
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class Job(models.Model):
+    # A unit of background work for the queue in recipes/jobs.py, run by `manage.py run_workers`
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    # Handler name, e.g. "enrich_recipe"
+    kind = models.CharField(max_length=50)
+
+    # Idempotency key, e.g. "enrich_recipe:42": enqueueing a key that is already waiting or running adds nothing
+    key = models.CharField(max_length=255, unique=True)
+
+    # Arguments for the handler
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+
+    # Runs counted so far (a run is counted when a worker claims the job) and the last failure
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    # Not run before this time; pushed back by retries
+    run_at = models.DateTimeField(default=timezone.now)
+
+    # The worker running the job and the end of its lease. A running job whose lease ran out (its worker died) can be
+    # claimed again.
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx')]
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,226 @@
+import base64
+import functools
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections, models
+from django.http import Http404
+
+# Keyset ("cursor") pagination.
+#
+# Instead of COUNT(*) + OFFSET n, every page is fetched with a WHERE clause that continues right after the last row
+# of the previous page, e.g. for ORDER BY created_at DESC, id DESC:
+#
+#     WHERE created_at < :last_created_at OR (created_at = :last_created_at AND id < :last_id)
+#
+# so page N costs the same as page 1. The ordering of the queryset must end with a unique column (the primary key)
+# so that every row has a distinct position.
+#
+# A queryset filtered on an OR of disjoint conditions (see models.visibility_partitions) can be paginated per
+# partition: each partition is seeked and limited on its own index and the partial pages are combined with a
+# UNION ALL, or merged in Python on backends that can't LIMIT inside a compound query (SQLite).
+#
+# A cursor holds only the id of the boundary row; its sort values are read back (through the queryset, so only a row
+# the viewer can see) when the cursor is used. Carrying the values instead would put a whole description into the
+# page links when sorting by it. A cursor whose row has since gone away starts over from the first page.
+
+
+class CursorPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class CursorPaginator:
+    def __init__(self, queryset, per_page, partitions=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.partitions = partitions
+
+        # (field name, descending) pairs taken from the queryset's ORDER BY
+        self.ordering = [
+            (field.lstrip('-'), field.startswith('-')) for field in queryset.query.order_by
+        ]
+        if not self.ordering or self.ordering[-1][0] not in ('id', 'pk'):
+            raise ValueError("CursorPaginator needs a queryset ordered by a unique trailing 'id'.")
+
+    def page(self, cursor=None):
+        values, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+        # Fetch one extra row to find out whether there is another page after this one
+        return self._build_page(self._fetch(values, backwards, self.per_page + 1), values, backwards)
+
+    async def apage(self, cursor=None):
+        # page() for async views, on the async ORM
+        values, backwards = await self.adecode_cursor(cursor) if cursor else (None, False)
+        return self._build_page(await self._afetch(values, backwards, self.per_page + 1), values, backwards)
+
+    def _build_page(self, rows, values, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self.encode_cursor(rows[-1], backwards=False) if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if rows and has_previous else None,
+        )
+
+    def page_querysets(self, values=None, backwards=False):
+        # Walking backwards flips every comparison and the ORDER BY; the rows are reversed again in page()
+        ordering = [(name, descending != backwards) for name, descending in self.ordering]
+        order_by = [f"-{name}" if descending else name for name, descending in ordering]
+        keyset = self._keyset_filter(ordering, values) if values is not None else models.Q()
+
+        branches = [self.queryset.filter(partition) for partition in self.partitions or [models.Q()]]
+        return [branch.filter(keyset).order_by(*order_by) for branch in branches]
+
+    def _fetch(self, values, backwards, limit):
+        querysets = self.page_querysets(values, backwards)
+        if len(querysets) == 1:
+            return list(querysets[0][:limit])
+
+        if self._union_supported():
+            return list(self._union(querysets, limit))
+
+        # The partitions are disjoint, so merging the partial pages gives the first rows of the whole listing
+        return self._merge([row for queryset in querysets for row in queryset[:limit]], querysets, limit)
+
+    async def _afetch(self, values, backwards, limit):
+        querysets = self.page_querysets(values, backwards)
+        if len(querysets) == 1:
+            return [row async for row in querysets[0][:limit]]
+
+        if self._union_supported():
+            return [row async for row in self._union(querysets, limit)]
+
+        rows = [row for queryset in querysets async for row in queryset[:limit]]
+        return self._merge(rows, querysets, limit)
+
+    def _union_supported(self):
+        return connections[self.queryset.db].features.supports_slicing_ordering_in_compound
+
+    @staticmethod
+    def _union(querysets, limit):
+        first, *rest = [queryset[:limit] for queryset in querysets]
+        return first.union(*rest, all=True).order_by(*querysets[0].query.order_by)[:limit]
+
+    def _merge(self, rows, querysets, limit):
+        order_by = querysets[0].query.order_by
+        return sorted(rows, key=functools.cmp_to_key(self._row_comparator(order_by)))[:limit]
+
+    def _row_comparator(self, order_by):
+        fields = [(self._field(name.lstrip('-')), name.startswith('-')) for name in order_by]
+
+        def compare(a, b):
+            for field, descending in fields:
+                x, y = field.value_from_object(a), field.value_from_object(b)
+                if x != y:
+                    return (-1 if x < y else 1) * (-1 if descending else 1)
+            return 0
+
+        return compare
+
+    @staticmethod
+    def _keyset_filter(ordering, values):
+        # (a, b, c) > (x, y, z)  <=>  a > x OR (a = x AND (b > y OR (b = y AND c > z)))
+        condition = None
+        for (name, descending), value in reversed(list(zip(ordering, values))):
+            after = models.Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            condition = after if condition is None else after | (models.Q(**{name: value}) & condition)
+
+        # The redundant a >= x bound is what lets the planner seek into the index instead of walking it from the start
+        (name, descending), value = ordering[0], values[0]
+        return models.Q(**{f"{name}__{'lte' if descending else 'gte'}": value}) & condition
+
+    def encode_cursor(self, obj, backwards=False):
+        payload = json.dumps({'id': self._field('pk').value_to_string(obj), 'b': backwards}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        # (sort values of the boundary row, backwards), or (None, False) for the first page when the row is gone
+        pk, backwards = self._parse_cursor(cursor)
+        values = self._boundary(pk).first()
+        return values, backwards and values is not None
+
+    async def adecode_cursor(self, cursor):
+        pk, backwards = self._parse_cursor(cursor)
+        values = await self._boundary(pk).afirst()
+        return values, backwards and values is not None
+
+    def _parse_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            return self._field('pk').to_python(payload['id']), bool(payload.get('b'))
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise Http404('Invalid cursor.')
+
+    def _boundary(self, pk):
+        names = [name for name, _ in self.ordering]
+        return self.queryset.filter(pk=pk).order_by().values_list(*names)
+
+    def _field(self, name):
+        model = self.queryset.model
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+
+class CursorPaginationMixin:
+    # Drop-in replacement for the offset pagination of MultipleObjectMixin. Views using it must order their queryset
+    # by a unique trailing 'id'.
+    cursor_param = 'cursor'
+
+    # Disjoint Q objects whose OR is the queryset's filter, to paginate them as separate index seeks
+    def get_cursor_partitions(self):
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, partitions=self.get_cursor_partitions())
+        page = paginator.page(self.request.GET.get(self.cursor_param) or None)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if page is not None:
+            context['next_page_query'] = self._cursor_query(page.next_cursor)
+            context['previous_page_query'] = self._cursor_query(page.previous_cursor)
+        return context
+
+    def _cursor_query(self, cursor):
+        return cursor_query(self.request.GET, cursor, self.cursor_param)
+
+
+def cursor_query(params, cursor, cursor_param='cursor'):
+    # Query string of the page at `cursor`, keeping the other params (sort, dir, ...) so links stay on the same listing
+    if cursor is None:
+        return None
+    params = params.copy()
+    params[cursor_param] = cursor
+    return params.urlencode()
@@ -0,0 +1,94 @@
+import contextvars
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Read replicas.
+#
+# ReplicaRouter sends every write to the primary ('default'). Reads go to a replica only while ReplicaMiddleware has
+# picked one for the current request, which it does for safe (GET/HEAD/OPTIONS) requests, i.e. the list, table and
+# detail pages and the JSON API. Everything else (form posts, signup, signals, management commands) reads from the
+# primary, so code that writes and then reads its own rows never sees a lagging copy.
+#
+# Read-your-writes: an unsafe request sets a cookie that keeps the client's reads on the primary for
+# RECIPES_REPLICA_PIN_SECONDS, which should exceed the replication lag, so a recipe saved through RecipeCreateView is
+# on the list page the user is redirected to. A write during a safe request switches the rest of it to the primary.
+#
+# Replicas are the aliases in RECIPES_READ_REPLICAS (see settings.py). With none configured everything uses the
+# primary.
+
+PIN_COOKIE = 'recipes_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = contextvars.ContextVar('recipes_read_alias', default=None)
+
+
+def reading_from_replica():
+    return _read_alias.get() is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Later reads of this request must see the write
+        _read_alias.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.RECIPES_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_alias.set(self.read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = _read_alias.set(self.read_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.pin(request, response)
+
+    @staticmethod
+    def read_alias(request):
+        replicas = settings.RECIPES_READ_REPLICAS
+        if not replicas or request.method not in SAFE_METHODS:
+            return None
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        # One replica for the whole request, so its reads are consistent with each other
+        return None if pinned else random.choice(replicas)
+
+    @staticmethod
+    def pin(request, response):
+        if settings.RECIPES_READ_REPLICAS and request.method not in SAFE_METHODS:
+            seconds = settings.RECIPES_REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax')
+        return response
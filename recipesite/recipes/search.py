@@ -0,0 +1,117 @@
+import re
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, models
+
+from .models import Recipe
+
+# Ranked full-text search over name, description, ingredients and diet.
+#
+# SQLite: an external-content FTS5 table (recipes_recipe_fts) kept in sync with recipes_recipe by triggers, ranked
+# with bm25(). PostgreSQL: a weighted SearchVector with a GIN expression index, ranked with ts_rank. Other backends
+# fall back to icontains scans.
+
+SEARCH_LIMIT = 50
+
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_COLUMNS = ('name', 'description', 'ingredients', 'diet')
+# bm25() column weights, in FTS_COLUMNS order: a hit in the name counts most, the long description least
+FTS_WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+GIN_INDEX_NAME = 'recipe_search_vector_idx'
+
+
+def _fts_statements():
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    delete_old = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, content='recipes_recipe', "
+        f"content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON recipes_recipe BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON recipes_recipe BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON recipes_recipe "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def ensure_fts_index(connection):
+    # Idempotent. SQLite migrations that rebuild recipes_recipe (copy, drop, rename) silently drop its triggers, so
+    # this also runs after every migrate and re-indexes everything if a trigger had to be recreated.
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{FTS_TABLE}_%']
+        )
+        complete = cursor.fetchone()[0] == 3
+        for statement in _fts_statements():
+            cursor.execute(statement)
+        if not complete:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_fts_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def recipe_search_vector():
+    # The GIN index is built on exactly this expression, so queries must use it unchanged to hit the index
+    return (
+        SearchVector('name', weight='A', config='english')
+        + SearchVector('ingredients', weight='B', config='english')
+        + SearchVector('diet', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    )
+
+
+def search_gin_index():
+    return GinIndex(recipe_search_vector(), name=GIN_INDEX_NAME)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def search_recipes(query, user, limit=SEARCH_LIMIT):
+    # Returns up to `limit` recipes visible to `user` matching every term of `query`, best match first
+    terms = search_terms(query)
+    queryset = Recipe.objects.visible_to(user)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'sqlite':
+        # Quoted prefix terms: user input can't inject FTS5 syntax, and "chick" already finds "chicken"
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        return queryset.extra(
+            select={'rank': f'bm25({FTS_TABLE}, {weights})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = recipes_recipe.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).order_by('rank', '-id')[:limit]
+
+    if vendor == 'postgresql':
+        search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='english')
+        return queryset.annotate(
+            search=recipe_search_vector(), rank=SearchRank(recipe_search_vector(), search_query)
+        ).filter(search=search_query).order_by('-rank', '-id')[:limit]
+
+    for term in terms:
+        condition = models.Q()
+        for column in FTS_COLUMNS:
+            condition |= models.Q(**{f'{column}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset.order_by('-created_at', '-id')[:limit]
@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import facets, suggest
+from .caching import bump_versions, recipe_scopes
+from .models import DietTag, Recipe, RecipeIngredient
+
+# Stored values the receivers below compare against: the facet fields, the diet mask behind the diet tag rows, and the
+# ingredients text behind the parsed ingredient rows
+TRACKED_FIELDS = (*facets.FACET_FIELDS, 'diet_mask', 'ingredients')
+
+
+def load_tracked_fields(instance):
+    # The facet counters need the stored values a save/delete replaces; fetch any the instance was loaded without
+    loaded = getattr(instance, '_loaded_values', {})
+    missing = [name for name in TRACKED_FIELDS if name not in loaded]
+    if missing:
+        stored = Recipe.objects.filter(pk=instance.pk).values(*missing).first() or {}
+        instance._loaded_values = {**loaded, **stored}
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(sender, instance, raw=False, **kwargs):
+    if not instance._state.adding:
+        load_tracked_fields(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    load_tracked_fields(instance)
+
+
+# Invalidate only the cached pages that could show the recipe: its owner's, plus the public ones if it is or was public
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    scopes = set(recipe_scopes(instance, was_public=loaded.get('is_public', False)))
+    if loaded.get('user_id') and loaded['user_id'] != instance.user_id:
+        scopes.add(f"user:{loaded['user_id']}")
+    # Deferred fields were not part of this save, so their stored values still hold
+    current = {name: vars(instance).get(name, loaded.get(name)) for name in TRACKED_FIELDS}
+    facets.record_change({} if created else loaded, current)
+    if current['diet_mask'] != (0 if created else loaded.get('diet_mask')):
+        DietTag.objects.sync([instance])
+    if current['ingredients'] != ('' if created else loaded.get('ingredients')):
+        RecipeIngredient.objects.sync([instance])
+    version = bump_versions(scopes)
+    if 'public' in scopes:
+        suggest.record_change(instance, version)
+    instance._loaded_values = {**loaded, **current}
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    facets.record_change(getattr(instance, '_loaded_values', {}), {})
+    scopes = recipe_scopes(instance)
+    version = bump_versions(scopes)
+    if 'public' in scopes:
+        suggest.record_change(instance, version, deleted=True)
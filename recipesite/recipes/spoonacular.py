@@ -0,0 +1,392 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from html import unescape
+
+import httpx
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .http_client import AsyncHttpClient, HttpClient, time_budget
+from .ingredients import extract_known_ingredient
+from .models import SpoonacularCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Spoonacular lookups behind a two-level cache:
+#
+#   1. an in-process LRU (LocalTTLCache) that answers repeated clicks without any I/O
+#   2. the SpoonacularCacheEntry table, shared by every worker process
+#
+# Both levels cache misses too ("negative caching"), with a shorter TTL, so a dish Spoonacular doesn't know about
+# doesn't cost quota on every click either. Network errors are never cached.
+#
+# Every lookup has an async twin (a-prefixed, as in Django's async ORM) for the async views, built on an httpx client
+# that shares the sync client's circuit breaker.
+
+# Marks a cached miss, as opposed to None for "not in the cache"
+MISS = object()
+
+
+def clean_html(text):
+    text = unescape(text)
+    return re.sub('<[^<]+?>', '', text)  # Remove HTML tags
+
+
+def normalize_query(query):
+    # "  Garlic   CHICKEN " and "garlic chicken" are the same search
+    return ' '.join(query.lower().split())
+
+
+class LocalTTLCache:
+    # Small thread-safe LRU whose entries also expire after a deadline
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalTTLCache(settings.SPOONACULAR_LOCAL_CACHE_SIZE)
+
+client = HttpClient(
+    'spoonacular',
+    pool_size=settings.SPOONACULAR_POOL_SIZE,
+    retries=settings.SPOONACULAR_RETRIES,
+    max_retry_after=settings.SPOONACULAR_MAX_RETRY_AFTER,
+    failure_threshold=settings.SPOONACULAR_BREAKER_THRESHOLD,
+    reset_timeout=settings.SPOONACULAR_BREAKER_RESET_TIMEOUT,
+)
+
+async_client = AsyncHttpClient(
+    'spoonacular',
+    max_connections=settings.SPOONACULAR_ASYNC_MAX_CONNECTIONS,
+    retries=settings.SPOONACULAR_RETRIES,
+    max_retry_after=settings.SPOONACULAR_MAX_RETRY_AFTER,
+    breaker=client.breaker,
+)
+
+
+def cache_get(key):
+    value = local_cache.get(key)
+    if value is not None:
+        return value
+
+    entry = SpoonacularCacheEntry.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+    if entry is None:
+        return None
+
+    value = MISS if entry.payload is None else entry.payload
+    local_cache.set(key, value, (entry.expires_at - timezone.now()).total_seconds())
+    return value
+
+
+async def acache_get(key):
+    value = local_cache.get(key)
+    if value is not None:
+        return value
+
+    entry = await SpoonacularCacheEntry.objects.filter(key=key, expires_at__gt=timezone.now()).afirst()
+    if entry is None:
+        return None
+
+    value = MISS if entry.payload is None else entry.payload
+    local_cache.set(key, value, (entry.expires_at - timezone.now()).total_seconds())
+    return value
+
+
+# Expired rows are never served; cache_set deletes them in batches, at most every PURGE_INTERVAL seconds per process
+PURGE_INTERVAL = 10 * 60
+PURGE_BATCH = 1000
+_next_purge = 0.0
+
+
+def _purge_due():
+    global _next_purge
+    now = time.monotonic()
+    if now < _next_purge:
+        return False
+    _next_purge = now + PURGE_INTERVAL
+    return True
+
+
+def _expired_ids():
+    expired = SpoonacularCacheEntry.objects.filter(expires_at__lte=timezone.now())
+    return expired.values_list('pk', flat=True)[:PURGE_BATCH]
+
+
+def purge_expired():
+    # Deletes up to PURGE_BATCH expired entries; returns how many
+    return SpoonacularCacheEntry.objects.filter(pk__in=list(_expired_ids())).delete()[0]
+
+
+async def apurge_expired():
+    ids = [pk async for pk in _expired_ids()]
+    return (await SpoonacularCacheEntry.objects.filter(pk__in=ids).adelete())[0]
+
+
+def _cache_defaults(value, ttl):
+    return {'payload': None if value is MISS else value, 'expires_at': timezone.now() + timedelta(seconds=ttl)}
+
+
+def cache_set(key, value, ttl):
+    local_cache.set(key, value, ttl)
+    SpoonacularCacheEntry.objects.update_or_create(key=key, defaults=_cache_defaults(value, ttl))
+    if _purge_due():
+        purge_expired()
+
+
+async def acache_set(key, value, ttl):
+    local_cache.set(key, value, ttl)
+    await SpoonacularCacheEntry.objects.aupdate_or_create(key=key, defaults=_cache_defaults(value, ttl))
+    if _purge_due():
+        await apurge_expired()
+
+
+def search_key(query):
+    normalized = normalize_query(query)
+    key = f"search:{normalized}|{extract_known_ingredient(normalized) or ''}"
+    if len(key) > 255:
+        key = 'search:sha256:' + hashlib.sha256(key.encode()).hexdigest()
+    return key
+
+
+def information_key(recipe_id):
+    return f"information:{recipe_id}"
+
+
+def _get(path, params):
+    response = client.get(
+        f"{settings.SPOONACULAR_BASE_URL}{path}",
+        params={'apiKey': settings.SPOONACULAR_API_KEY, **params},
+        timeout=settings.SPOONACULAR_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def _aget(path, params):
+    response = await async_client.get(
+        f"{settings.SPOONACULAR_BASE_URL}{path}",
+        params={'apiKey': settings.SPOONACULAR_API_KEY, **params},
+        timeout=settings.SPOONACULAR_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _search_params(query):
+    normalized = normalize_query(query)
+    params = {
+        'query': normalized,
+        'number': 3,
+        'instructionsRequired': True,
+    }
+    ingredient = extract_known_ingredient(normalized)
+    if ingredient:
+        params['titleMatch'] = ingredient
+    return params
+
+
+def _search_result(payload):
+    # (recipe ids, value to cache, ttl)
+    recipe_ids = [result['id'] for result in payload.get('results', [])]
+    if recipe_ids:
+        return recipe_ids, recipe_ids, settings.SPOONACULAR_SEARCH_TTL
+    return recipe_ids, MISS, settings.SPOONACULAR_NEGATIVE_TTL
+
+
+def search(query):
+    # Returns the ranked candidate recipe ids for a dish name
+    key = search_key(query)
+    cached = cache_get(key)
+    if cached is not None:
+        return [] if cached is MISS else cached
+
+    recipe_ids, value, ttl = _search_result(_get('/recipes/complexSearch', _search_params(query)))
+    cache_set(key, value, ttl)
+    return recipe_ids
+
+
+async def asearch(query):
+    key = search_key(query)
+    cached = await acache_get(key)
+    if cached is not None:
+        return [] if cached is MISS else cached
+
+    recipe_ids, value, ttl = _search_result(await _aget('/recipes/complexSearch', _search_params(query)))
+    await acache_set(key, value, ttl)
+    return recipe_ids
+
+
+def trim_information(data):
+    # Only what autofill needs, so cache rows stay small
+    return {
+        'id': data.get('id'),
+        'title': data.get('title', ''),
+        'summary': data.get('summary', ''),
+        'extendedIngredients': [
+            {'original': i.get('original', ''), 'name': i.get('name', '')}
+            for i in data.get('extendedIngredients', [])
+        ],
+        'readyInMinutes': data.get('readyInMinutes', 0),
+        'pricePerServing': data.get('pricePerServing', 0),
+        'diets': data.get('diets', []),
+    }
+
+
+def information(recipe_id):
+    # Returns the trimmed /information payload of a recipe, or None if Spoonacular doesn't know the id
+    return information_bulk([recipe_id])[recipe_id]
+
+
+def _bulk_params(recipe_ids):
+    return {'ids': ','.join(str(recipe_id) for recipe_id in recipe_ids), 'includeNutrition': False}
+
+
+def _bulk_results(recipe_ids, payload):
+    # (recipe id, trimmed payload or None, value to cache, ttl) for every requested id
+    fetched = {data['id']: trim_information(data) for data in payload}
+    for recipe_id in recipe_ids:
+        data = fetched.get(recipe_id)
+        if data is None:
+            yield recipe_id, None, MISS, settings.SPOONACULAR_NEGATIVE_TTL
+        else:
+            yield recipe_id, data, data, settings.SPOONACULAR_INFORMATION_TTL
+
+
+def information_bulk(recipe_ids):
+    # Maps each id to its trimmed /information payload (None for unknown ids). Everything not cached is fetched with
+    # a single informationBulk call instead of one /information round trip per id.
+    found = {}
+    missing = []
+    for recipe_id in recipe_ids:
+        cached = cache_get(information_key(recipe_id))
+        if cached is None:
+            missing.append(recipe_id)
+        else:
+            found[recipe_id] = None if cached is MISS else cached
+
+    if missing:
+        payload = _get('/recipes/informationBulk', _bulk_params(missing))
+        for recipe_id, data, value, ttl in _bulk_results(missing, payload):
+            cache_set(information_key(recipe_id), value, ttl)
+            found[recipe_id] = data
+
+    return found
+
+
+async def ainformation_bulk(recipe_ids):
+    found = {}
+    missing = []
+    for recipe_id in recipe_ids:
+        cached = await acache_get(information_key(recipe_id))
+        if cached is None:
+            missing.append(recipe_id)
+        else:
+            found[recipe_id] = None if cached is MISS else cached
+
+    if missing:
+        payload = await _aget('/recipes/informationBulk', _bulk_params(missing))
+        for recipe_id, data, value, ttl in _bulk_results(missing, payload):
+            await acache_set(information_key(recipe_id), value, ttl)
+            found[recipe_id] = data
+
+    return found
+
+
+def to_suggestion(info_data):
+    return {
+        'description': clean_html(info_data.get('summary', '')),
+        'ingredients': ', '.join(i['original'] for i in info_data.get('extendedIngredients', [])),
+        'time': info_data.get('readyInMinutes', 0),
+        'cost': round(info_data.get('pricePerServing', 0) / 100),
+    }
+
+
+def _first_with_ingredients(recipe_ids, found):
+    return next(
+        (data for data in (found[i] for i in recipe_ids) if data and data['extendedIngredients']),
+        None,
+    )
+
+
+def first_with_ingredients(recipe_ids):
+    # Walks the candidates in rank order. A cached candidate that has ingredients answers without any network call;
+    # at the first uncached one, all remaining uncached candidates are fetched together in one request.
+    for position, recipe_id in enumerate(recipe_ids):
+        cached = cache_get(information_key(recipe_id))
+        if cached is None:
+            return _first_with_ingredients(recipe_ids[position:], information_bulk(recipe_ids[position:]))
+        if cached is not MISS and cached['extendedIngredients']:
+            return cached
+    return None
+
+
+async def afirst_with_ingredients(recipe_ids):
+    for position, recipe_id in enumerate(recipe_ids):
+        cached = await acache_get(information_key(recipe_id))
+        if cached is None:
+            return _first_with_ingredients(recipe_ids[position:], await ainformation_bulk(recipe_ids[position:]))
+        if cached is not MISS and cached['extendedIngredients']:
+            return cached
+    return None
+
+
+def lookup(name):
+    # Returns description/ingredients/time/cost for the best match of a dish name, or None if there is none. Unlike
+    # autofill(), errors propagate, so background jobs can retry them.
+    # Try up to 3 recipes for a good match
+    info_data = first_with_ingredients(search(name))
+    return to_suggestion(info_data) if info_data else None
+
+
+def autofill(name):
+    # lookup() for the autofill button, within SPOONACULAR_AUTOFILL_BUDGET: any failure is just "no suggestion"
+    try:
+        with time_budget(settings.SPOONACULAR_AUTOFILL_BUDGET):
+            return lookup(name)
+
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.warning('Spoonacular lookup for %r failed: %s', name, e)
+        return None
+
+
+async def aautofill(name):
+    # autofill() for async views: waits on the network without holding a worker thread
+    try:
+        with time_budget(settings.SPOONACULAR_AUTOFILL_BUDGET):
+            info_data = await afirst_with_ingredients(await asearch(name))
+        return to_suggestion(info_data) if info_data else None
+
+    except (requests.RequestException, httpx.HTTPError, ValueError, KeyError) as e:
+        logger.warning('Spoonacular lookup for %r failed: %s', name, e)
+        return None
@@ -0,0 +1,77 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class SpoonacularStub:
+    # Minimal local stand-in for the Spoonacular API, used by the tests and the benchmarks. Fill in `searches`
+    # (query -> list of ids) and `recipes` (id -> /information payload), set `delay` to simulate a slow upstream,
+    # queue error statuses in `failures` to answer the next requests with (sent with a Retry-After header when
+    # `retry_after` is set), and inspect `requests` to count calls.
+
+    def __init__(self):
+        self.searches = {}
+        self.recipes = {}
+        self.requests = []
+        self.delay = 0
+        self.failures = []
+        self.retry_after = None
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                stub.requests.append((parsed.path, params))
+
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if stub.failures:
+                    headers = {} if stub.retry_after is None else {'Retry-After': str(stub.retry_after)}
+                    self._send(stub.failures.pop(0), {'status': 'failure'}, headers)
+                    return
+
+                match = re.fullmatch(r'/recipes/(\d+)/information', parsed.path)
+                if parsed.path == '/recipes/complexSearch':
+                    ids = stub.searches.get(params.get('query'), [])
+                    self._send(200, {'results': [{'id': recipe_id} for recipe_id in ids]})
+                elif parsed.path == '/recipes/informationBulk':
+                    ids = [int(recipe_id) for recipe_id in params['ids'].split(',')]
+                    self._send(200, [stub.recipes[i] for i in ids if i in stub.recipes])
+                elif match and int(match.group(1)) in stub.recipes:
+                    self._send(200, stub.recipes[int(match.group(1))])
+                else:
+                    self._send(404, {'status': 'failure'})
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def count(self, path):
+        return sum(1 for requested, _ in self.requests if requested == path)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,337 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from .caching import get_cache, get_versions
+from .ingredients import parse_ingredients
+from .models import Recipe, RecipeIngredient
+
+# Typeahead suggestions for the create form's name field: public recipe names and ingredient names starting with what
+# the user typed, or with a word of it ("chick" suggests "Garlic Chicken" as well as "chicken").
+#
+# Each process keeps the terms in memory as one sorted list of "<fragment>\0<kind>\0<term>" keys, a fragment being
+# the term from one of its word starts, and answers a prefix with two bisects. Prefixes matching more than HOT_KEYS
+# keys ("ch", "sal") would take too long to rank on every request, so their best terms are kept ranked (top_size()
+# of them) and moved as the terms' counts change.
+#
+# Saving or deleting a public recipe updates the index in place (see signals.py) and appends the recipe's pk to a
+# change log in the shared cache. Every RECIPES_SUGGEST_REFRESH seconds a process whose 'public' page cache version
+# moved on replays the log entries it has not seen, reloading only those recipes. It rebuilds the whole index only
+# when the log can't explain the change: entries evicted, the log reset, a bulk write (record_bulk_change()), or a
+# version bump with no entry at all.
+
+RECIPE = 'recipe'
+INGREDIENT = 'ingredient'
+MIN_LENGTH = 2
+# Prefixes matching more keys than this keep their best terms ranked; ranking up to this many on request takes < 1 ms
+HOT_KEYS = 500
+# Prefixes whose answers are kept until the terms change
+MEMO_SIZE = 10_000
+
+LOG_KEY = 'suggest:changes'
+LOG_TIMEOUT = 24 * 60 * 60
+# Log entry standing for "reload everything" (recipe pks start at 1)
+RELOAD = 0
+# More changed recipes than this since the last refresh are cheaper to reload all at once
+MAX_REPLAY = 1000
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def fragments(term):
+    # The term from each of its word starts: "garlic chicken" -> "garlic chicken", "chicken"
+    words = term.split(' ')
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+def recipe_terms(recipe):
+    # The (kind, term) pairs a public recipe contributes, with its name as typed for display
+    if not recipe.is_public:
+        return {}
+    terms = {(INGREDIENT, ingredient.name): ingredient.name for ingredient in parse_ingredients(recipe.ingredients)}
+    if normalize(recipe.name):
+        terms[RECIPE, normalize(recipe.name)] = recipe.name.strip()
+    return terms
+
+
+# ----------------------------------------------------------------------
+# Change log
+# ----------------------------------------------------------------------
+
+def log_position():
+    # Number of the last change logged, or None when the log is gone (never written, or evicted)
+    return get_cache().get(LOG_KEY)
+
+
+def log_change(pk):
+    # Appends a changed recipe (or RELOAD) to the log; returns its number
+    cache = get_cache()
+    cache.add(LOG_KEY, 0, timeout=None)
+    try:
+        number = cache.incr(LOG_KEY)
+    except ValueError:
+        # Evicted between the two calls; readers see the restarted log and rebuild
+        cache.add(LOG_KEY, 0, timeout=None)
+        number = cache.incr(LOG_KEY)
+    cache.set(f'{LOG_KEY}:{number}', pk, LOG_TIMEOUT)
+    return number
+
+
+def logged_changes(start, end):
+    # The recipe pks logged after `start` up to `end`, or None when an entry is missing or asks for a reload
+    keys = [f'{LOG_KEY}:{number}' for number in range(start + 1, end + 1)]
+    found = get_cache().get_many(keys)
+    if len(found) < len(keys) or RELOAD in found.values():
+        return None
+    return set(found.values())
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self.keys = []
+        self.counts = Counter()
+        self.display = {}
+        self.contributions = {}
+        self.top = {}
+        self.memo = {}
+        self.version = None
+        self.position = 0
+        self.checked = 0.0
+        self.lock = threading.RLock()
+
+    def reset(self):
+        # Forgets the index; the next suggestion builds it again
+        with self.lock:
+            self.keys, self.counts, self.display, self.contributions = [], Counter(), {}, {}
+            self.top, self.memo = {}, {}
+            self.version = None
+            self.position = 0
+
+    def load(self):
+        # Reads every public recipe's terms; ingredients come from the parsed RecipeIngredient rows
+        terms = {}
+        for pk, name in Recipe.objects.filter(is_public=True).values_list('pk', 'name').iterator(chunk_size=2000):
+            if normalize(name):
+                terms[pk] = {(RECIPE, normalize(name)): name.strip()}
+        rows = RecipeIngredient.objects.filter(recipe__is_public=True).values_list('recipe_id', 'ingredient__name')
+        for pk, name in rows.iterator(chunk_size=2000):
+            terms.setdefault(pk, {})[INGREDIENT, name] = name
+
+        counts, display = Counter(), {}
+        for recipe in terms.values():
+            counts.update(recipe.keys())
+            for term, text in recipe.items():
+                display.setdefault(term, text)
+        keys = sorted(
+            f'{fragment}\0{kind}\0{term}' for kind, term in counts for fragment in fragments(term)
+        )
+        return keys, counts, display, {pk: tuple(recipe.items()) for pk, recipe in terms.items()}
+
+    def rebuild(self):
+        # The log position is read first: changes made while loading are replayed again later, which is harmless
+        version = get_versions(['public'])['public']
+        position = log_position() or 0
+        keys, counts, display, contributions = self.load()
+        with self.lock:
+            self.keys, self.counts, self.display, self.contributions = keys, counts, display, contributions
+            self.top = self.rank_hot_prefixes()
+            self.memo = {}
+            self.version = version
+            self.position = position
+            self.checked = time.monotonic()
+
+    def refresh(self):
+        # Builds the index on first use, and catches up with changes other processes made to public recipes
+        if self.version is None:
+            self.rebuild()
+        elif time.monotonic() - self.checked >= settings.RECIPES_SUGGEST_REFRESH:
+            self.checked = time.monotonic()
+            version = get_versions(['public'])['public']
+            if version != self.version:
+                self.catch_up(version)
+
+    def catch_up(self, version):
+        position = log_position()
+        pks = None
+        if position is not None and self.position < position:
+            pks = logged_changes(self.position, position)
+        if pks is None or len(pks) > MAX_REPLAY:
+            self.rebuild()
+            return
+        recipes = Recipe.objects.filter(pk__in=pks).only('name', 'ingredients', 'is_public')
+        terms = {recipe.pk: recipe_terms(recipe) for recipe in recipes}
+        with self.lock:
+            for pk in pks:
+                self.update_recipe(pk, terms.get(pk, {}))
+            self.version = version
+            self.position = max(self.position, position)
+
+    def rank(self, prefix, term):
+        # Sort key of a term matching `prefix`: names starting with it first, then by how many recipes use them
+        return not term[1].startswith(prefix), -self.counts[term], term[1], term[0]
+
+    def matches(self, prefix):
+        # Every term with a fragment starting with `prefix`
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + '\U0010ffff', start)
+        found = set()
+        for key in self.keys[start:end]:
+            _, kind, term = key.split('\0')
+            found.add((kind, term))
+        return found
+
+    def best(self, prefix, terms, limit):
+        return heapq.nsmallest(limit, terms, key=lambda term: self.rank(prefix, term))
+
+    def rank_hot_prefixes(self):
+        # {prefix: (best terms in rank order, whether that is every match)} for every prefix matching over HOT_KEYS
+        # keys. A prefix's keys are one run of the sorted list, and only the runs of hot prefixes can hold longer ones.
+        size = top_size()
+        top = {}
+        runs, n = [(0, len(self.keys))], MIN_LENGTH
+        while runs:
+            hot = []
+            for start, end in runs:
+                i = start
+                while i < end:
+                    fragment = self.keys[i].partition('\0')[0]
+                    if len(fragment) < n:
+                        i += 1
+                        continue
+                    prefix = fragment[:n]
+                    j = bisect.bisect_left(self.keys, prefix + '\U0010ffff', i, end)
+                    if j - i > HOT_KEYS:
+                        terms = {tuple(key.split('\0')[1:]) for key in self.keys[i:j]}
+                        top[prefix] = (self.best(prefix, terms, size), len(terms) <= size)
+                        hot.append((i, j))
+                    i = j
+            runs, n = hot, n + 1
+        return top
+
+    def hot_prefixes(self, term):
+        # The ranked prefixes `term` matches; the prefixes of a prefix that isn't hot aren't either
+        for fragment in fragments(term[1]):
+            for n in range(MIN_LENGTH, len(fragment) + 1):
+                if fragment[:n] not in self.top:
+                    break
+                yield fragment[:n]
+
+    def rerank(self, term):
+        # Moves `term` within the ranked lists of its prefixes after its count changed
+        size = top_size()
+        for prefix in list(self.hot_prefixes(term)):
+            ranked, complete = self.top[prefix]
+            ranked = [other for other in ranked if other != term]
+            if self.counts[term] > 0:
+                key = self.rank(prefix, term)
+                # Past the last ranked term of an incomplete list, unlisted terms may rank higher
+                if complete or (ranked and key < self.rank(prefix, ranked[-1])):
+                    bisect.insort(ranked, term, key=lambda other: self.rank(prefix, other))
+            if len(ranked) > size:
+                ranked, complete = ranked[:size], False
+            elif not complete and len(ranked) < settings.RECIPES_SUGGEST_LIMIT:
+                # Too many listed terms went away; find the next best ones
+                matches = self.matches(prefix)
+                ranked, complete = self.best(prefix, matches, size), len(matches) <= size
+            if ranked:
+                self.top[prefix] = (ranked, complete)
+            else:
+                self.top.pop(prefix, None)
+
+    def add(self, term, text):
+        self.counts[term] += 1
+        if self.counts[term] == 1:
+            self.display[term] = text
+            kind, name = term
+            for fragment in fragments(name):
+                bisect.insort(self.keys, f'{fragment}\0{kind}\0{name}')
+        self.rerank(term)
+
+    def discard(self, term):
+        self.counts[term] -= 1
+        if self.counts[term] <= 0:
+            del self.counts[term], self.display[term]
+            kind, name = term
+            for fragment in fragments(name):
+                key = f'{fragment}\0{kind}\0{name}'
+                i = bisect.bisect_left(self.keys, key)
+                if i < len(self.keys) and self.keys[i] == key:
+                    del self.keys[i]
+        self.rerank(term)
+
+    def update_recipe(self, pk, terms):
+        # Replaces what recipe `pk` contributes (nothing once deleted or private); a no-op until the index is built
+        with self.lock:
+            if self.version is None:
+                return
+            old = dict(self.contributions.pop(pk, ()))
+            if terms:
+                self.contributions[pk] = tuple(terms.items())
+            if old.keys() == terms.keys():
+                return
+            for term in old.keys() - terms.keys():
+                self.discard(term)
+            for term in terms.keys() - old.keys():
+                self.add(term, terms[term])
+            self.memo = {}
+
+    def record_local(self, position, version):
+        # After this process applied its own change number `position`: when every earlier change was applied too, the
+        # index is as current as the version that change produced, and needs no catching up for it
+        with self.lock:
+            if self.version is not None and position == self.position + 1:
+                self.position = position
+                self.version = version
+
+    def suggest(self, query, limit):
+        # Up to `limit` terms matching the query, names starting with it first, then by how many recipes use them
+        prefix = normalize(query)
+        if len(prefix) < MIN_LENGTH:
+            return []
+        with self.lock:
+            ranked, complete = self.top.get(prefix, (None, False))
+            if ranked is not None and (complete or limit <= len(ranked)):
+                return self.present(ranked[:limit])
+            cached = self.memo.get((prefix, limit))
+            if cached is not None:
+                return cached
+            result = self.present(self.best(prefix, self.matches(prefix), limit))
+            if len(self.memo) >= MEMO_SIZE:
+                self.memo = {}
+            self.memo[prefix, limit] = result
+            return result
+
+    def present(self, terms):
+        return [{'text': self.display[term], 'kind': term[0]} for term in terms]
+
+
+def top_size():
+    # Terms kept per short prefix: a full answer plus room for some to drop out before the prefix is scanned again
+    return 2 * settings.RECIPES_SUGGEST_LIMIT
+
+
+index = SuggestionIndex()
+
+
+def record_change(recipe, version, deleted=False):
+    # Called after a save/delete of a public (or formerly public) recipe bumped the 'public' version to `version`
+    position = log_change(recipe.pk)
+    if index.version is not None:
+        index.update_recipe(recipe.pk, {} if deleted else recipe_terms(recipe))
+        index.record_local(position, version)
+
+
+def record_bulk_change():
+    # For writes that skip the Recipe signals (bulk_create, queryset.update): every process rebuilds its index
+    log_change(RELOAD)
+
+
+def suggest(query, limit):
+    index.refresh()
+    return index.suggest(query, limit)
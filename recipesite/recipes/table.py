@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.db.models import Subquery
+
+from .diets import ALIASES, DIET_BITS, normalize_fragment
+from .facets import facet_stats
+from .models import Recipe
+
+# Sorting and filtering of the recipe table, shared by RecipeTableView and the exports so a download always matches
+# what the table shows.
+#
+# Every filter is answered from an index whatever the sort, so no combination scans the table: cost/time ranges seek
+# the recipe_public_cost/time indexes (no sort step at all when sorting by the same column), owner / "mine only" seek
+# the (user, sort column) index of each partition and read one author's rows already in order, and diets are one
+# bitwise test on diet_mask. Description is the one sort column without indexes, so sorting by it sorts the matches.
+#
+# Diets have no index of their own. For a common diet the test runs on each row while walking the sort index, which
+# stops after a page: about page size / share-of-recipes rows. For a rare diet that walk would read most of the index,
+# so its recipes are looked up through the DietTag rows instead and only they are sorted. The facet counts pick the
+# cheaper way, so a page never reads more than about sqrt(page size * public recipes) rows for the diet filter.
+
+SORT_FIELDS = ['name', 'description', 'cost', 'time', 'is_public']
+DEFAULT_SORT = 'cost'
+
+# GET parameters of the filters, all optional; diet may repeat (recipes must match every one)
+FILTER_PARAMS = ['cost_min', 'cost_max', 'time_min', 'time_max', 'diet', 'owner', 'mine']
+RANGE_FILTERS = {'cost_min': 'cost__gte', 'cost_max': 'cost__lte', 'time_min': 'time__gte', 'time_max': 'time__lte'}
+# Rows per table page, for choosing how to answer the diet filter
+PAGE_SIZE = 20
+
+
+def table_ordering(params):
+    sort_by = params.get('sort', DEFAULT_SORT)
+    direction = params.get('dir', 'asc')
+
+    if sort_by not in SORT_FIELDS:
+        sort_by = DEFAULT_SORT
+
+    # The id tie-breaker gives every row a unique position for cursor pagination
+    return [sort_by, 'id'] if direction == 'asc' else [f"-{sort_by}", '-id']
+
+
+def _getlist(params, key):
+    if hasattr(params, 'getlist'):
+        return params.getlist(key)
+    value = params.get(key)
+    return value if isinstance(value, (list, tuple)) else [value] if value else []
+
+
+def table_filters(params):
+    # The active filters, cleaned: {'cost_min': 5, 'diet': ['vegan'], 'owner': 'ann', 'mine': True, ...}.
+    # Malformed values are ignored rather than rejected, like an unknown sort column.
+    filters = {}
+    for key in RANGE_FILTERS:
+        try:
+            filters[key] = int(params.get(key, ''))
+        except (TypeError, ValueError):
+            pass
+    # Any spelling of a diet tag ("gluten free", "GF"); unknown diets are kept so that they match nothing
+    diets = {ALIASES.get(normalize_fragment(diet), diet) for diet in _getlist(params, 'diet') if diet.strip()}
+    if diets:
+        filters['diet'] = sorted(diets)
+    if (params.get('owner') or '').strip():
+        filters['owner'] = params['owner'].strip()
+    if params.get('mine') in ('1', 'on', 'true', True):
+        filters['mine'] = True
+    return filters
+
+
+def rare_diet(names):
+    # The rarest of the diets if looking its recipes up beats walking a sort index for them, else None. Walking reads
+    # about PAGE_SIZE * total / count rows, the lookup reads count rows (then sorts them).
+    stats = facet_stats()
+    counts = {row['value']: row['count'] for row in stats['diet']}
+    rarest = min(names, key=lambda name: counts.get(name, 0))
+    count = counts.get(rarest, 0)
+    return rarest if count * count < PAGE_SIZE * stats['total'] else None
+
+
+def table_queryset(user, params):
+    # Recipes visible to `user`, filtered and sorted per the table's GET parameters (any mapping with .get())
+    queryset = Recipe.objects.visible_to(user)
+    filters = table_filters(params)
+
+    queryset = queryset.filter(**{RANGE_FILTERS[key]: value for key, value in filters.items() if key in RANGE_FILTERS})
+    if 'diet' in filters:
+        if all(diet in DIET_BITS for diet in filters['diet']):
+            queryset = queryset.with_diets(filters['diet'], lookup=rare_diet(filters['diet']))
+        else:
+            queryset = queryset.none()
+    if 'owner' in filters:
+        # An equality on one user (usernames are unique), so the (user, sort column) indexes return rows in order
+        owner = User.objects.filter(username=filters['owner']).values('pk')[:1]
+        queryset = queryset.filter(user=Subquery(owner))
+    if filters.get('mine'):
+        queryset = queryset.filter(user=user) if user is not None and user.is_authenticated else queryset.none()
+    return queryset.order_by(*table_ordering(params))
@@ -1,21 +1,27 @@
 from django import template
+from django.http import QueryDict
 from django.utils.html import format_html
-from urllib.parse import urlencode
 
 # registers template tag file with Django. This must be done in every file that has custom template to define it
 register = template.Library()
 
 # Decorator that tells Django that the function is a simple tag you can use in templates like
-@register.simple_tag
-def sortable_column(field, label, current_sort=None, current_dir='asc'):
+# {% sortable_column "cost" "Cost ($)" current_sort current_dir %}. takes_context gives it the request, so the
+# link keeps the active filters.
+@register.simple_tag(takes_context=True)
+def sortable_column(context, field, label, current_sort=None, current_dir='asc'):
     toggle_dir = 'desc' if current_sort == field and current_dir == 'asc' else 'asc'
     arrow = ''
     if current_sort == field:
         arrow = '↑' if current_dir == 'asc' else '↓'
 
-    # Builds a URL query string like ?sort=cost%dir=desc. Clicking the column will reload the page with this sort
-    # direction
-    query_string = urlencode({'sort': field, 'dir': toggle_dir})
+    # Builds a URL query string like ?cost_min=5&sort=cost&dir=desc from the current one. Clicking the column will
+    # reload the page with this sort direction, starting again from the first page
+    request = context.get('request')
+    params = request.GET.copy() if request is not None else QueryDict(mutable=True)
+    params.pop('cursor', None)
+    params['sort'] = field
+    params['dir'] = toggle_dir
 
     # returns a clickable <a> tag
-    return format_html('<a href="?{}">{} {}</a>', query_string, label, arrow)
\ No newline at end of file
+    return format_html('<a href="?{}">{} {}</a>', params.urlencode(), label, arrow)
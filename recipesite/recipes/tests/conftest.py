@@ -0,0 +1,46 @@
+import pytest
+from django.core.cache import caches
+from recipes import autofill_index, spoonacular
+from recipes.spoonacular_stub import SpoonacularStub
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Starts every test with empty caches, so pages and version counters cached
+    by one test never leak into the next.
+    """
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_autofill_index(settings, tmp_path_factory):
+    """
+    Points autofill at an index file that doesn't exist, so an index built
+    locally never answers in place of the Spoonacular stub.
+    """
+    settings.RECIPES_AUTOFILL_INDEX_PATH = tmp_path_factory.getbasetemp() / 'missing.idx'
+    autofill_index.index_file.reset()
+    yield
+    autofill_index.index_file.reset()
+
+
+@pytest.fixture
+def spoonacular_stub(settings):
+    """
+    Starts a local Spoonacular stub and points the client (with an empty
+    in-process cache and a closed circuit breaker) at it for the duration of
+    the test.
+    """
+    stub = SpoonacularStub().start()
+
+    settings.SPOONACULAR_BASE_URL = stub.url
+    settings.SPOONACULAR_API_KEY = 'test-key'
+    spoonacular.local_cache.clear()
+    spoonacular.client.breaker.reset()
+    yield stub
+
+    spoonacular.local_cache.clear()
+    spoonacular.client.breaker.reset()
+    stub.stop()
@@ -0,0 +1,165 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from recipes.models import Recipe
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user who owns a private recipe.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+@pytest.fixture
+def recipes(user):
+    """
+    Creates three public recipes of another user and one private recipe of the test user.
+    """
+    other = User.objects.create_user(username="otheruser", password="password")
+    common = {"description": "Long text", "ingredients": "rice, garlic", "diet": "Vegan", "cost": 5, "time": 30}
+    public = [Recipe.objects.create(name=f"Garlic Rice {n}", user=other, **common) for n in range(3)]
+    private = Recipe.objects.create(name="Secret Rice", user=user, is_public=False, **common)
+    return public + [private]
+
+
+# ----------------------------------------------------------------------
+# List Tests
+# ----------------------------------------------------------------------
+
+def test_list_returns_public_recipes_newest_first(client, recipes):
+    """
+    Tests that anonymous clients get the public recipes without the long text fields by default.
+    """
+    data = client.get(reverse("recipesns:api_recipe_list")).json()
+
+    assert [item["name"] for item in data["results"]] == ["Garlic Rice 2", "Garlic Rice 1", "Garlic Rice 0"]
+    assert data["results"][0]["author"] == "otheruser"
+    assert "description" not in data["results"][0]
+    assert data["next_cursor"] is None
+
+
+def test_list_includes_own_private_recipes(client, recipes):
+    """
+    Tests that a logged-in user also sees their private recipes.
+    """
+    client.login(username="testuser", password="password")
+    data = client.get(reverse("recipesns:api_recipe_list")).json()
+
+    assert data["results"][0]["name"] == "Secret Rice"
+
+
+def test_list_cursor_pagination(client, recipes):
+    """
+    Tests that the next_cursor walks through all public recipes.
+    """
+    url = reverse("recipesns:api_recipe_list")
+    first = client.get(url, {"limit": 2}).json()
+    second = client.get(url, {"limit": 2, "cursor": first["next_cursor"]}).json()
+
+    assert len(first["results"]) == 2
+    assert [item["name"] for item in second["results"]] == ["Garlic Rice 0"]
+    assert second["next_cursor"] is None
+    assert second["previous_cursor"]
+
+
+def test_sparse_fieldsets_only_load_requested_columns(client, recipes, django_assert_num_queries):
+    """
+    Tests that ?fields= limits both the output and the SELECTed columns.
+    """
+    with django_assert_num_queries(1) as context:
+        data = client.get(reverse("recipesns:api_recipe_list"), {"fields": "name,cost"}).json()
+
+    assert data["results"][0] == {"name": "Garlic Rice 2", "cost": 5}
+    sql = context.captured_queries[0]["sql"]
+    assert '"description"' not in sql
+    assert '"ingredients"' not in sql
+
+
+def test_unknown_field_is_rejected(client, recipes):
+    """
+    Tests that unknown fields get a 400 with the list of valid ones.
+    """
+    response = client.get(reverse("recipesns:api_recipe_list"), {"fields": "name,password"})
+
+    assert response.status_code == 400
+    assert "password" in response.json()["error"]
+
+
+# ----------------------------------------------------------------------
+# Detail and Search Tests
+# ----------------------------------------------------------------------
+
+def test_detail_returns_all_fields(client, recipes):
+    """
+    Tests that the detail endpoint returns every field by default.
+    """
+    data = client.get(reverse("recipesns:api_recipe_detail", args=[recipes[0].pk])).json()
+
+    assert data["description"] == "Long text"
+    assert data["ingredients"] == "rice, garlic"
+
+
+def test_detail_hides_other_users_private_recipes(client, recipes):
+    """
+    Tests that a private recipe is a 404 for anyone but its owner, like RecipeDetailView.
+    """
+    url = reverse("recipesns:api_recipe_detail", args=[recipes[-1].pk])
+    assert client.get(url).status_code == 404
+
+    client.login(username="testuser", password="password")
+    assert client.get(url).json()["name"] == "Secret Rice"
+
+
+def test_search(client, recipes):
+    """
+    Tests that search returns matching visible recipes with selected fields.
+    """
+    data = client.get(reverse("recipesns:api_recipe_search"), {"q": "garlic", "fields": "name"}).json()
+
+    assert sorted(item["name"] for item in data["results"]) == ["Garlic Rice 0", "Garlic Rice 1", "Garlic Rice 2"]
+
+
+# ----------------------------------------------------------------------
+# Conditional GET Tests
+# ----------------------------------------------------------------------
+
+def test_if_none_match_returns_304_without_queries(client, recipes, django_assert_num_queries):
+    """
+    Tests that revalidating an unchanged response is a 304 that skips the database.
+    """
+    url = reverse("recipesns:api_recipe_list")
+    etag = client.get(url).headers["ETag"]
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+
+
+def test_etag_changes_when_recipe_changes(client, recipes):
+    """
+    Tests that editing a visible recipe gives a new ETag and fresh content.
+    """
+    url = reverse("recipesns:api_recipe_detail", args=[recipes[0].pk])
+    etag = client.get(url).headers["ETag"]
+
+    recipes[0].name = "Renamed"
+    recipes[0].save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+
+
+def test_api_is_read_only(client, recipes):
+    """
+    Tests that write methods are refused.
+    """
+    response = client.post(reverse("recipesns:api_recipe_list"), {"name": "New"})
+
+    assert response.status_code == 405
@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import Http404
+from django.test import AsyncRequestFactory
+from recipes import async_views, spoonacular
+from recipes.caching import get_cache
+from recipes.models import Recipe
+from recipes.tests.test_spoonacular import BULK, information_payload
+
+factory = AsyncRequestFactory()
+
+
+def async_request(path, user=None, **params):
+    """
+    Builds an ASGI request carrying `user` the way AuthenticationMiddleware would.
+    """
+    request = factory.get(path, params)
+    user = user or AnonymousUser()
+
+    async def auser():
+        return user
+
+    request.auser = auser
+    return request
+
+
+def call(view, request, **kwargs):
+    """
+    Runs an async view and renders its TemplateResponse, as the handler would.
+    """
+    response = async_to_sync(view)(request, **kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    return response
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user who owns a private recipe.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+@pytest.fixture
+def recipes(user):
+    """
+    Creates eight public recipes and one private recipe of the test user.
+    """
+    common = {"description": "Tasty", "cost": 5, "time": 20, "ingredients": "rice", "diet": "Vegan", "user": user}
+    public = [Recipe.objects.create(name=f"Public {n}", **common) for n in range(8)]
+    return public + [Recipe.objects.create(name="Private", is_public=False, **common)]
+
+
+# ----------------------------------------------------------------------
+# List and Detail Tests
+# ----------------------------------------------------------------------
+
+def test_async_list_paginates_visible_recipes(recipes):
+    """
+    Tests that the async list renders the first page of public recipes with a next link.
+    """
+    response = call(async_views.recipe_list, async_request("/recipes/"))
+
+    assert response.status_code == 200
+    assert b"Public 7" in response.content
+    assert b"Public 1" not in response.content
+    assert b"Private" not in response.content
+    assert b"cursor=" in response.content
+    assert response.headers["ETag"]
+
+
+def test_async_list_matches_sync_list(client, user, recipes):
+    """
+    Tests that the async and sync lists render the same recipes for a logged-in owner.
+    """
+    client.force_login(user)
+    sync_names = [recipe.name for recipe in client.get("/recipes/").context["recipes"]]
+
+    response = call(async_views.recipe_list, async_request("/recipes/", user))
+
+    assert sync_names[0] == "Private"
+    for name in sync_names:
+        assert name.encode() in response.content
+
+
+def test_async_list_answers_304(recipes):
+    """
+    Tests that the async list honours If-None-Match.
+    """
+    etag = call(async_views.recipe_list, async_request("/recipes/")).headers["ETag"]
+
+    request = async_request("/recipes/")
+    request.META["HTTP_IF_NONE_MATCH"] = etag
+    response = call(async_views.recipe_list, request)
+
+    assert response.status_code == 304
+
+
+def test_async_list_keeps_cache_io_off_the_event_loop(recipes, user, monkeypatch):
+    """
+    Tests that the async list only touches the page cache through its async API, whose sync calls run in a thread,
+    for anonymous and logged-in viewers alike.
+    """
+    cache = get_cache()
+    on_loop = []
+
+    def watch(name):
+        method = getattr(cache, name)
+
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(name)
+            except RuntimeError:
+                pass
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(cache, name, wrapper)
+
+    for name in ("get", "get_many", "add", "set", "set_many"):
+        watch(name)
+
+    anonymous = call(async_views.recipe_list, async_request("/recipes/"))
+    call(async_views.recipe_list, async_request("/recipes/", user))
+    cached = call(async_views.recipe_list, async_request("/recipes/"))
+
+    assert on_loop == []
+    assert cached.content == anonymous.content
+
+
+def test_async_detail_visibility(user, recipes):
+    """
+    Tests that the async detail page hides private recipes from everyone but the owner.
+    """
+    private = recipes[-1]
+    with pytest.raises(Http404):
+        call(async_views.recipe_detail, async_request(f"/recipes/{private.pk}/"), pk=private.pk)
+    response = call(async_views.recipe_detail, async_request(f"/recipes/{private.pk}/", user), pk=private.pk)
+
+    assert b"Private" in response.content
+    assert b"testuser" in response.content
+
+
+# ----------------------------------------------------------------------
+# Autofill Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_async_autofill(spoonacular_stub):
+    """
+    Tests that the async autofill view returns the same suggestion as the sync one.
+    """
+    spoonacular_stub.searches["garlic chicken"] = [1, 2]
+    spoonacular_stub.recipes[1] = information_payload(1, ingredients=())
+    spoonacular_stub.recipes[2] = information_payload(2)
+
+    response = async_to_sync(async_views.autofill_recipe)(async_request("/", name="Garlic Chicken"))
+
+    assert response.status_code == 200
+    assert b'"ingredients": "2 cloves garlic, 1 lb chicken"' in response.content
+    assert spoonacular_stub.count(BULK) == 1
+
+
+@pytest.mark.django_db
+def test_async_autofill_failure_returns_none(spoonacular_stub):
+    """
+    Tests that upstream errors become an unsuccessful suggestion, not an exception.
+    """
+    spoonacular.async_client.retries = 0
+    spoonacular_stub.failures = [500]
+
+    try:
+        assert async_to_sync(spoonacular.aautofill)("soup") is None
+    finally:
+        spoonacular.async_client.retries = 2
+
+
+@pytest.mark.django_db
+def test_concurrent_autofills_overlap(spoonacular_stub):
+    """
+    Tests that slow lookups run concurrently: 50 autofills against an upstream taking 0.2s per call finish far sooner
+    than the 20s they would take one after another.
+    """
+    spoonacular_stub.delay = 0.2
+    for n in range(50):
+        spoonacular_stub.searches[f"dish {n}"] = [n]
+        spoonacular_stub.recipes[n] = information_payload(n)
+
+    async def run():
+        return await asyncio.gather(*(spoonacular.aautofill(f"dish {n}") for n in range(50)))
+
+    start = time.perf_counter()
+    results = async_to_sync(run)()
+
+    assert all(results)
+    assert time.perf_counter() - start < 5
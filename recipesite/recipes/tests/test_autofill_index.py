@@ -0,0 +1,171 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from recipes import autofill_index
+from recipes.models import Recipe, SpoonacularCacheEntry
+
+from .test_spoonacular import information_payload
+
+DISHES = [
+    ("Garlic Chicken", {"description": "Garlicky", "ingredients": "garlic, chicken", "time": 25, "cost": 3}, None),
+    ("Lemon Chicken", {"description": "Zesty", "ingredients": "lemon, chicken", "time": 30, "cost": 4}, None),
+    ("Beef Stew", {"description": "Hearty", "ingredients": "beef, carrots", "time": 90, "cost": 6}, None),
+    ("Tomato Soup", {"description": "Smooth", "ingredients": "tomato, cream", "time": 20, "cost": 2}, None),
+]
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def index(tmp_path):
+    """
+    Builds an index of the sample dishes and opens it.
+    """
+    path = tmp_path / "autofill.idx"
+    autofill_index.build_index(path, DISHES)
+    index = autofill_index.AutofillIndex(path)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def index_path(settings, tmp_path):
+    """
+    Points autofill at an index file in the test's directory (not built yet).
+    """
+    settings.RECIPES_AUTOFILL_INDEX_PATH = tmp_path / "autofill.idx"
+    autofill_index.index_file.reset()
+    return settings.RECIPES_AUTOFILL_INDEX_PATH
+
+
+# ----------------------------------------------------------------------
+# Index Tests
+# ----------------------------------------------------------------------
+
+def test_exact_name_matches(index):
+    """
+    Tests that a dish name finds its own entry, regardless of case and punctuation.
+    """
+    assert len(index) == 4
+    assert index.lookup("garlic chicken!", 0.6)["description"] == "Garlicky"
+    assert index.lookup("  TOMATO   soup", 0.6)["time"] == 20
+
+
+def test_misspelled_name_matches(index):
+    """
+    Tests that a close misspelling still scores above the threshold.
+    """
+    assert index.lookup("Beef Stews", 0.6)["description"] == "Hearty"
+
+
+def test_ingredient_keyword_breaks_ties(index):
+    """
+    Tests that the query's known ingredient favours the entry that contains it.
+    """
+    assert index.lookup("lemon chicken", 0.6)["description"] == "Zesty"
+    assert index.lookup("garlick chicken", 0.5)["description"] == "Garlicky"
+
+
+def test_lookup_within_postings_budget(index, monkeypatch):
+    """
+    Tests that lookups counting only the shortest trigram lists still find close names, and exact ones directly.
+    """
+    monkeypatch.setattr(autofill_index, "POSTINGS_BUDGET", 0)
+    monkeypatch.setattr(autofill_index, "MIN_COUNTED", 1)
+    assert index.lookup("Beef Stews", 0.6)["description"] == "Hearty"
+    assert index.lookup("garlick chicken", 0.5)["description"] == "Garlicky"
+    assert index.exact("Lemon  chicken")[0]["suggestion"]["description"] == "Zesty"
+    assert index.exact("lemon chick") == []
+
+
+def test_unrelated_name_misses(index):
+    """
+    Tests that nothing is returned when no dish is similar enough, or the query is empty.
+    """
+    assert index.lookup("chocolate cake", 0.6) is None
+    assert index.lookup("chicken", 0.6) is None
+    assert index.lookup("!!", 0.6) is None
+
+
+# ----------------------------------------------------------------------
+# Build and Autofill Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_rebuild_command_indexes_cache_and_public_recipes(index_path):
+    """
+    Tests that the command indexes cached Spoonacular payloads and public recipes with ingredients, once per name.
+    """
+    expired = timezone.now()
+    SpoonacularCacheEntry.objects.create(key="information:7", payload=information_payload(7), expires_at=expired)
+    SpoonacularCacheEntry.objects.create(key="search:soup", payload=[7], expires_at=expired)
+    Recipe.objects.create(name="Recipe 7", description="d", cost=1, time=1, ingredients="x", diet="", is_public=True)
+    Recipe.objects.create(name="Rice Bowl", description="d", cost=1, time=5, ingredients="rice", diet="", is_public=True)
+    Recipe.objects.create(name="Secret", description="d", cost=1, time=1, ingredients="y", diet="", is_public=False)
+    Recipe.objects.create(name="Empty", description="d", cost=1, time=1, ingredients="", diet="", is_public=True)
+
+    call_command("rebuild_autofill_index")
+
+    index = autofill_index.AutofillIndex(index_path)
+    assert len(index) == 2
+    assert index.lookup("recipe 7", 0.6)["ingredients"] == "2 cloves garlic, 1 lb chicken"
+    assert index.lookup("rice bowl", 0.6)["time"] == 5
+    assert index.lookup("secret", 0.6) is None
+    index.close()
+
+
+@pytest.mark.django_db
+def test_recipes_made_private_or_deleted_are_not_suggested(index_path):
+    """
+    Tests that entries of recipes deleted or made private since the rebuild are passed over.
+    """
+    recipe = Recipe.objects.create(
+        name="Rice Bowl", description="d", cost=1, time=5, ingredients="rice", diet="", is_public=True
+    )
+    other = Recipe.objects.create(
+        name="Rice Bowls", description="e", cost=1, time=6, ingredients="rice", diet="", is_public=True
+    )
+    call_command("rebuild_autofill_index")
+    assert autofill_index.lookup("rice bowl")["time"] == 5
+
+    recipe.is_public = False
+    recipe.save()
+    assert autofill_index.lookup("rice bowl")["time"] == 6
+
+    other.delete()
+    assert autofill_index.lookup("rice bowl") is None
+
+
+@pytest.mark.django_db
+def test_autofill_answers_from_index_without_network(client, index_path, spoonacular_stub):
+    """
+    Tests that autofill answers an indexed dish locally and asks Spoonacular about anything else.
+    """
+    autofill_index.build_index(index_path, DISHES)
+    spoonacular_stub.searches["chocolate cake"] = [9]
+    spoonacular_stub.recipes[9] = information_payload(9)
+
+    response = client.get(reverse("recipesns:autofill_recipe"), {"name": "Garlic chicken"})
+    assert response.json() == {"success": True, **DISHES[0][1]}
+    assert spoonacular_stub.requests == []
+
+    response = client.get(reverse("recipesns:autofill_recipe"), {"name": "Chocolate cake"})
+    assert response.json()["time"] == 25
+    assert spoonacular_stub.requests
+
+
+def test_rebuilt_index_is_picked_up(index_path, monkeypatch):
+    """
+    Tests that a running process switches to the new file once a rebuild replaced it.
+    """
+    monkeypatch.setattr(autofill_index, "RELOAD_INTERVAL", 0)
+    assert autofill_index.lookup("beef stew") is None
+
+    autofill_index.build_index(index_path, DISHES[:2])
+    assert autofill_index.lookup("beef stew") is None
+
+    autofill_index.build_index(index_path, DISHES)
+    assert autofill_index.lookup("beef stew")["cost"] == 6
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from recipes.benchmarks import Benchmark, WriteLoad, compare, generate_recipes, summarize
+from recipes.models import Recipe, RecipeIngredient
+
+# ----------------------------------------------------------------------
+# Data Generator Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_generate_recipes_is_reproducible():
+    """
+    Tests that the generator creates the requested recipes with parsed ingredients and the same data per seed.
+    """
+    generate_recipes(30, users=3, seed=7)
+    first = list(Recipe.objects.order_by("id").values_list("name", "cost", "is_public"))
+    Recipe.objects.all().delete()
+
+    generate_recipes(30, users=3, seed=7)
+    second = list(Recipe.objects.order_by("id").values_list("name", "cost", "is_public"))
+
+    assert len(first) == 30
+    assert first == second
+    assert RecipeIngredient.objects.exists()
+    assert all(recipe.description_preview for recipe in Recipe.objects.all())
+
+
+# ----------------------------------------------------------------------
+# Report Tests
+# ----------------------------------------------------------------------
+
+def test_summarize_percentiles():
+    """
+    Tests the latency percentiles and throughput of a run.
+    """
+    samples = [n / 1000 for n in range(1, 101)]
+
+    result = summarize(samples, elapsed=2.0)
+
+    assert result["requests"] == 100
+    assert result["p50_ms"] == 51
+    assert result["p95_ms"] == 95
+    assert result["p99_ms"] == 99
+    assert result["max_ms"] == 100
+    assert result["throughput_rps"] == 50
+
+
+def test_compare_reports_relative_change():
+    """
+    Tests that comparing two reports gives the change per scenario.
+    """
+    before = {"scenarios": {"detail": {"p50_ms": 10, "p95_ms": 20}}}
+    after = {"scenarios": {"detail": {"p50_ms": 15, "p95_ms": 10}, "create": {"p50_ms": 1, "p95_ms": 1}}}
+
+    assert compare(before, after) == ["detail: p50_ms 15.0ms (+50%), p95_ms 10.0ms (-50%)"]
+
+
+@pytest.mark.django_db
+def test_benchmark_runs_every_scenario():
+    """
+    Tests a short benchmark run over generated data, including autofill against the stub.
+    """
+    generate_recipes(40, users=2)
+
+    results = Benchmark(iterations=2, warmup=1, depth=3, autofill_delay=0).run()
+
+    assert {"list_first_page", "list_page_3", "table_cost_asc", "table_name_desc", "table_cost_asc_page_3",
+            "detail", "create", "update", "autofill"} <= set(results)
+    assert all(result["requests"] == 2 for result in results.values())
+
+
+@pytest.mark.django_db
+def test_benchmark_command_writes_json(tmp_path):
+    """
+    Tests that the benchmark command writes a JSON report with the environment and the selected scenarios.
+    """
+    generate_recipes(20, users=2)
+    output = tmp_path / "report.json"
+
+    call_command("benchmark", iterations=2, warmup=0, only=["detail"], output=str(output))
+
+    report = json.loads(output.read_text())
+    assert report["recipes"] == 20
+    assert report["options"]["iterations"] == 2
+    assert set(report["scenarios"]) == {"detail"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_load_counts_writes():
+    """
+    Tests that the write load test posts every create and update and reports the throughput.
+    """
+    # One writer: the in-memory test database locks whole tables between connections
+    result = WriteLoad(threads=1, writes=4).run()
+
+    assert result["attempted"] == 4
+    assert result["requests"] == 4
+    assert result["errors"] == 0
+    assert result["writes_per_s"] > 0
+    # The recipe to update plus the two creates
+    assert Recipe.objects.filter(name__startswith="Write Load").count() == 3
@@ -0,0 +1,231 @@
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.http import http_date
+from recipes.caching import get_versions
+from recipes.models import Recipe
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user who owns the recipes below.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+@pytest.fixture
+def other_user(db):
+    """
+    Creates a second user whose cached pages must survive the first user's edits.
+    """
+    return User.objects.create_user(username="otheruser", password="password")
+
+
+def make_recipe(user, name, is_public=True):
+    return Recipe.objects.create(
+        name=name,
+        description="Tasty",
+        cost=5,
+        time=20,
+        ingredients="Rice",
+        diet="Vegan",
+        user=user,
+        is_public=is_public,
+    )
+
+
+# ----------------------------------------------------------------------
+# Page Cache Tests
+# ----------------------------------------------------------------------
+
+def test_anonymous_list_is_served_from_cache(client, user, django_assert_num_queries):
+    """
+    Tests that a repeated anonymous request is answered from the cached HTML without touching the database.
+    """
+    make_recipe(user, "Fried Rice")
+    url = reverse("recipesns:recipe_list")
+    first = client.get(url)
+
+    with django_assert_num_queries(0):
+        second = client.get(url)
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert b"Fried Rice" in second.content
+
+
+def test_logged_in_page_reuses_cached_queryset(client, user, django_assert_num_queries):
+    """
+    Tests that a logged-in user's repeated request re-renders the page but reuses the cached recipes.
+    """
+    make_recipe(user, "Secret Stew", is_public=False)
+    client.login(username="testuser", password="password")
+    url = reverse("recipesns:recipe_table")
+    client.get(url)
+
+    # Only the session and user lookups remain
+    with django_assert_num_queries(2):
+        response = client.get(url)
+
+    assert [recipe.name for recipe in response.context["recipes"]] == ["Secret Stew"]
+
+
+def test_cache_key_covers_sort_and_direction(client, user):
+    """
+    Tests that different sort orders are cached separately.
+    """
+    make_recipe(user, "Apple Pie")
+    make_recipe(user, "Zucchini Bread")
+    url = reverse("recipesns:recipe_table")
+
+    ascending = client.get(url, {"sort": "name", "dir": "asc"})
+    descending = client.get(url, {"sort": "name", "dir": "desc"})
+
+    assert ascending.content.index(b"Apple Pie") < ascending.content.index(b"Zucchini Bread")
+    assert descending.content.index(b"Zucchini Bread") < descending.content.index(b"Apple Pie")
+
+
+def test_public_change_invalidates_anonymous_pages(client, user):
+    """
+    Tests that creating, updating and deleting a public recipe show up on the next anonymous request.
+    """
+    url = reverse("recipesns:recipe_list")
+    client.get(url)
+
+    recipe = make_recipe(user, "Pad Thai")
+    assert b"Pad Thai" in client.get(url).content
+
+    recipe.name = "Pad See Ew"
+    recipe.save()
+    assert b"Pad See Ew" in client.get(url).content
+
+    recipe.delete()
+    assert b"Pad See Ew" not in client.get(url).content
+
+
+def test_unpublishing_invalidates_anonymous_pages(client, user):
+    """
+    Tests that making a public recipe private removes it from the cached public pages.
+    """
+    recipe = make_recipe(user, "Gumbo")
+    url = reverse("recipesns:recipe_list")
+    assert b"Gumbo" in client.get(url).content
+
+    recipe = Recipe.objects.get(pk=recipe.pk)
+    recipe.is_public = False
+    recipe.save()
+
+    assert b"Gumbo" not in client.get(url).content
+
+
+def test_private_change_only_bumps_owner_version(user, other_user):
+    """
+    Tests that saving a private recipe leaves the public and other users' cache versions alone.
+    """
+    before = get_versions(["public", f"user:{user.pk}", f"user:{other_user.pk}"])
+
+    make_recipe(user, "Leftovers", is_public=False)
+
+    after = get_versions(["public", f"user:{user.pk}", f"user:{other_user.pk}"])
+    assert after["public"] == before["public"]
+    assert after[f"user:{other_user.pk}"] == before[f"user:{other_user.pk}"]
+    assert after[f"user:{user.pk}"] > before[f"user:{user.pk}"]
+
+
+# ----------------------------------------------------------------------
+# Conditional GET Tests
+# ----------------------------------------------------------------------
+
+def test_list_sets_validators(client, user):
+    """
+    Tests that list pages carry ETag, Last-Modified and revalidation headers.
+    """
+    make_recipe(user, "Tacos")
+    response = client.get(reverse("recipesns:recipe_list"))
+
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert "must-revalidate" in response.headers["Cache-Control"]
+    assert "public" in response.headers["Cache-Control"]
+
+
+def test_matching_etag_returns_304(client, user):
+    """
+    Tests that revalidating with the current ETag or Last-Modified gets an empty 304.
+    """
+    make_recipe(user, "Tacos")
+    url = reverse("recipesns:recipe_list")
+    response = client.get(url)
+
+    by_etag = client.get(url, HTTP_IF_NONE_MATCH=response.headers["ETag"])
+    by_date = client.get(url, HTTP_IF_MODIFIED_SINCE=response.headers["Last-Modified"])
+
+    assert by_etag.status_code == 304
+    assert by_etag.content == b""
+    assert by_date.status_code == 304
+
+
+def test_stale_etag_gets_fresh_page(client, user):
+    """
+    Tests that an ETag from before a change no longer matches.
+    """
+    url = reverse("recipesns:recipe_list")
+    etag = client.get(url).headers["ETag"]
+
+    make_recipe(user, "Burrito")
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert b"Burrito" in response.content
+
+
+def test_etag_differs_per_viewer(client, user):
+    """
+    Tests that an anonymous ETag is not accepted for a logged-in user's page.
+    """
+    url = reverse("recipesns:recipe_list")
+    etag = client.get(url).headers["ETag"]
+
+    client.login(username="testuser", password="password")
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert "private" in response.headers["Cache-Control"]
+
+
+def test_logged_in_page_is_not_revalidated_across_logins(client, user):
+    """
+    Tests that a logged-in page's ETag is tied to the session's CSRF token, so after logging in again the page (and
+    the token in its forms) is sent afresh, and that such pages get no Last-Modified to revalidate against instead.
+    """
+    url = reverse("recipesns:recipe_list")
+    credentials = {"username": "testuser", "password": "password"}
+    client.post(reverse("login"), credentials)
+    response = client.get(url)
+    etag = response.headers["ETag"]
+
+    assert "Last-Modified" not in response.headers
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    client.post(reverse("logout"))
+    client.post(reverse("login"), credentials)
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)).status_code == 200
+
+
+def test_api_keeps_validators_for_logged_in_users(client, user):
+    """
+    Tests that JSON responses, which embed no CSRF token, keep both validators for logged-in users.
+    """
+    client.force_login(user)
+    response = client.get(reverse("recipesns:api_recipe_list"))
+
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
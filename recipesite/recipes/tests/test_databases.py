@@ -0,0 +1,81 @@
+import pytest
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from recipesite.databases import database_from_env, postgresql_database, sqlite_database
+
+# ----------------------------------------------------------------------
+# SQLite Profile Tests
+# ----------------------------------------------------------------------
+
+def test_sqlite_profile_applies_pragmas_on_connect(tmp_path, django_db_blocker):
+    """
+    Tests that a new connection of the tuned SQLite profile runs in WAL mode with the configured PRAGMAs.
+    """
+    database = sqlite_database(tmp_path / "db.sqlite3", env={"SQLITE_MMAP_SIZE": "1048576", "SQLITE_BUSY_TIMEOUT": "7"})
+    wrapper = DatabaseWrapper({**database, "TIME_ZONE": None, "AUTOCOMMIT": True, "ATOMIC_REQUESTS": False,
+                               "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}, alias="profile_test")
+    try:
+        with django_db_blocker.unblock(), wrapper.cursor() as cursor:
+            pragma = lambda name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("mmap_size") == 1048576
+            assert pragma("busy_timeout") == 7000
+    finally:
+        wrapper.close()
+
+
+def test_sqlite_profile_takes_write_lock_up_front():
+    """
+    Tests that transactions begin IMMEDIATE and connections are kept with health checks.
+    """
+    database = sqlite_database("db.sqlite3", env={})
+
+    assert database["OPTIONS"]["transaction_mode"] == "IMMEDIATE"
+    assert database["CONN_MAX_AGE"] == 60
+    assert database["CONN_HEALTH_CHECKS"] is True
+
+
+def test_untuned_sqlite_profile_is_the_plain_default():
+    """
+    Tests that SQLITE_TUNING=0 gives the untuned profile used as the load test baseline.
+    """
+    database = database_from_env("db.sqlite3", env={"SQLITE_TUNING": "0", "SQLITE_PATH": "/tmp/other.sqlite3"})
+
+    assert database == {"ENGINE": "django.db.backends.sqlite3", "NAME": "/tmp/other.sqlite3"}
+
+
+# ----------------------------------------------------------------------
+# PostgreSQL Profile Tests
+# ----------------------------------------------------------------------
+
+def test_postgresql_profile_uses_native_pool():
+    """
+    Tests that the PostgreSQL profile configures Django's connection pool and leaves CONN_MAX_AGE at 0 for it.
+    """
+    database = database_from_env("db.sqlite3", env={
+        "DB_ENGINE": "postgresql", "POSTGRES_HOST": "db", "DB_POOL_MAX_SIZE": "20",
+    })
+
+    assert database["ENGINE"] == "django.db.backends.postgresql"
+    assert database["HOST"] == "db"
+    assert database["CONN_MAX_AGE"] == 0
+    assert database["CONN_HEALTH_CHECKS"] is True
+    assert database["OPTIONS"]["pool"] == {"min_size": 2, "max_size": 20, "timeout": 10.0}
+
+
+def test_postgresql_profile_without_pool_keeps_connections():
+    """
+    Tests that with DB_POOL=0 connections persist for DB_CONN_MAX_AGE seconds instead.
+    """
+    database = postgresql_database(env={"DB_POOL": "0", "DB_CONN_MAX_AGE": "300"})
+
+    assert "pool" not in database["OPTIONS"]
+    assert database["CONN_MAX_AGE"] == 300
+
+
+def test_unknown_engine_is_rejected():
+    """
+    Tests that a misspelt DB_ENGINE fails loudly instead of falling back to SQLite.
+    """
+    with pytest.raises(ValueError, match="mysql"):
+        database_from_env("db.sqlite3", env={"DB_ENGINE": "mysql"})
@@ -0,0 +1,244 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import reverse
+from recipes.diets import DIET_BITS, diet_mask, diet_text, parse_diets
+from recipes.forms import RecipeForm
+from recipes.importer import Importer
+from recipes.models import DietTag, Recipe, RecipeFacetCount
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user who owns the recipes below.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+def make_recipe(user, name, diet):
+    return Recipe.objects.create(name=name, description="Tasty", cost=5, time=20, ingredients="Rice", diet=diet,
+                                 user=user, is_public=True)
+
+
+def tag_names(recipe):
+    return sorted(recipe.diet_tags.values_list("name", flat=True))
+
+
+# ----------------------------------------------------------------------
+# Parsing Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("text, expected", [
+    ("Vegan", ["vegan"]),
+    ("vegan, Gluten Free", ["vegan", "gluten-free"]),
+    ("GF; veggie / KETO!", ["gluten-free", "vegetarian", "keto"]),
+    ("Vegan, vegan", ["vegan"]),
+    ("low sodium", []),
+    ("", []),
+])
+def test_parse_diets(text, expected):
+    """
+    Tests that spelling variants map to one canonical tag and unknown fragments are skipped.
+    """
+    assert parse_diets(text) == expected
+
+
+def test_diet_text_keeps_notes():
+    """
+    Tests that the rewritten text lists the tag labels in vocabulary order, followed by the free-form notes.
+    """
+    assert diet_text({"keto", "vegan"}, "gluten free, low sodium") == "Vegan, Keto, low sodium"
+
+
+# ----------------------------------------------------------------------
+# Model Tests
+# ----------------------------------------------------------------------
+
+def test_save_sets_mask_and_tags(user):
+    """
+    Tests that saving a recipe stores its diet bitmask and tag rows, and keeps both current on edits.
+    """
+    recipe = make_recipe(user, "Buddha Bowl", "Vegan, gluten free")
+
+    assert recipe.diet_mask == DIET_BITS["vegan"] | DIET_BITS["gluten-free"]
+    assert tag_names(recipe) == ["gluten-free", "vegan"]
+
+    recipe = Recipe.objects.get(pk=recipe.pk)
+    recipe.diet = "Keto"
+    recipe.save(update_fields=["diet"])
+
+    recipe.refresh_from_db()
+    assert recipe.diet_mask == DIET_BITS["keto"]
+    assert tag_names(recipe) == ["keto"]
+
+
+def test_unchanged_diet_does_not_rewrite_tags(user, django_assert_num_queries):
+    """
+    Tests that saves which leave the diet alone skip the tag rows.
+    """
+    recipe = make_recipe(user, "Chili", "Vegan")
+    recipe.name = "Bean Chili"
+
+    with django_assert_num_queries(1):
+        recipe.save(update_fields=["name"])
+
+
+def test_with_diets_requires_every_tag(user):
+    """
+    Tests that with_diets() matches recipes carrying all the given tags.
+    """
+    make_recipe(user, "Salad", "Vegan, Gluten-Free")
+    make_recipe(user, "Stew", "Vegan")
+    make_recipe(user, "Steak", "Keto, gluten free")
+
+    assert sorted(Recipe.objects.with_diets(["vegan"]).values_list("name", flat=True)) == ["Salad", "Stew"]
+    assert list(Recipe.objects.with_diets(["vegan", "gluten-free"]).values_list("name", flat=True)) == ["Salad"]
+    assert "&" in str(Recipe.objects.with_diets(["vegan"]).query)
+
+
+def test_bulk_import_tags_recipes(user):
+    """
+    Tests that imported recipes get their mask and tag rows without going through save().
+    """
+    importer = Importer(user)
+    importer.add(1, {"name": "Dal", "description": "Tasty", "cost": "3", "time": "30", "ingredients": "lentils",
+                     "diet": "vegetarian, GF", "is_public": "true"})
+    importer.finish()
+
+    recipe = Recipe.objects.get(name="Dal")
+    assert recipe.diet_mask == DIET_BITS["vegetarian"] | DIET_BITS["gluten-free"]
+    assert tag_names(recipe) == ["gluten-free", "vegetarian"]
+
+
+# ----------------------------------------------------------------------
+# Form Tests
+# ----------------------------------------------------------------------
+
+FORM_DATA = {"name": "Tacos", "description": "Spicy", "cost": 8, "time": 20, "ingredients": "Beans",
+             "is_public": True}
+
+
+def test_form_ticked_tags_write_the_text(user):
+    """
+    Tests that ticking tags is enough, and that the text gets their labels plus any notes.
+    """
+    form = RecipeForm(data={**FORM_DATA, "diet": "low sodium", "diet_tags": ["gluten-free", "vegan"],
+                            "diet_tags_shown": "True"})
+    assert form.is_valid(), form.errors
+    recipe = form.save(commit=False)
+    recipe.user = user
+    recipe.save()
+
+    assert recipe.diet == "Vegan, Gluten-Free, low sodium"
+    assert tag_names(recipe) == ["gluten-free", "vegan"]
+
+
+def test_form_unticking_removes_tag(user):
+    """
+    Tests that unticking a box drops the tag from the text, while typed tags are added.
+    """
+    recipe = make_recipe(user, "Tacos", "Vegan, Gluten-Free")
+    form = RecipeForm(instance=recipe)
+    assert form["diet_tags"].initial == ["vegan", "gluten-free"]
+
+    form = RecipeForm(data={**FORM_DATA, "diet": "Vegan, Gluten-Free, keto", "diet_tags": ["vegan"],
+                            "diet_tags_shown": "True"}, instance=recipe)
+    assert form.is_valid(), form.errors
+    form.save()
+
+    assert recipe.diet == "Vegan, Keto"
+    assert tag_names(recipe) == ["keto", "vegan"]
+
+
+def test_form_text_only_post_keeps_tags(user):
+    """
+    Tests that a post without the checkboxes (e.g. a script) takes the tags from the text.
+    """
+    recipe = make_recipe(user, "Tacos", "Vegan")
+    form = RecipeForm(data={**FORM_DATA, "diet": "vegan"}, instance=recipe)
+
+    assert form.is_valid(), form.errors
+    assert form.cleaned_data["diet"] == "Vegan"
+
+
+def test_form_needs_some_diet():
+    """
+    Tests that an empty text with no ticked tags is rejected.
+    """
+    form = RecipeForm(data={**FORM_DATA, "diet": ""})
+
+    assert not form.is_valid()
+    assert "diet" in form.errors
+
+
+def test_create_page_shows_checkboxes(client, user):
+    """
+    Tests that the create page renders the diet tag checkboxes.
+    """
+    client.login(username="testuser", password="password")
+    content = client.get(reverse("recipesns:recipe_create")).content.decode()
+
+    assert 'name="diet_tags" value="gluten-free"' in content
+    assert 'name="diet_tags_shown"' in content
+
+
+# ----------------------------------------------------------------------
+# Table Filter Tests
+# ----------------------------------------------------------------------
+
+def test_table_diet_filter_accepts_spellings(client, user):
+    """
+    Tests that the table's diet filter takes any spelling of a tag and matches nothing for unknown diets.
+    """
+    make_recipe(user, "Salad", "Vegan, GF")
+    make_recipe(user, "Stew", "Vegan")
+    url = reverse("recipesns:recipe_table")
+
+    names = lambda params: [recipe.name for recipe in client.get(url, params).context["recipes"]]
+
+    assert names({"diet": ["vegan", "gluten free"]}) == ["Salad"]
+    assert names({"diet": "Plant-Based"}) == ["Salad", "Stew"]
+    assert names({"diet": "carnivore"}) == []
+    assert diet_mask(["vegan", "unknown"]) == DIET_BITS["vegan"]
+
+
+# ----------------------------------------------------------------------
+# Migration Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db(transaction=True)
+def test_data_migration_tags_existing_recipes():
+    """
+    Migrating an existing database parses the diet text of every recipe into
+    tags and a mask, and recounts the diet facet by tag.
+    """
+    executor = MigrationExecutor(connection)
+    executor.migrate([("recipes", "0009_facet_counts")])
+    old_apps = executor.loader.project_state([("recipes", "0009_facet_counts")]).apps
+    OldRecipe = old_apps.get_model("recipes", "Recipe")
+    curry = OldRecipe.objects.create(name="Curry", description="d", cost=5, time=30, ingredients="rice",
+                                     diet="Plant based; GF", is_public=True)
+    OldRecipe.objects.create(name="Steak", description="d", cost=9, time=20, ingredients="beef", diet="Low sodium",
+                             is_public=True)
+    OldRecipe.objects.create(name="Secret", description="d", cost=1, time=5, ingredients="tofu", diet="Vegan",
+                             is_public=False)
+
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate([("recipes", "0010_diet_tags")])
+
+    recipe = Recipe.objects.get(pk=curry.pk)
+    assert recipe.diet_mask == DIET_BITS["vegan"] | DIET_BITS["gluten-free"]
+    assert sorted(recipe.diet_tags.values_list("name", flat=True)) == ["gluten-free", "vegan"]
+    assert DietTag.objects.get(name="whole30").bit == 9
+    assert dict(RecipeFacetCount.objects.filter(facet="diet").values_list("value", "count")) == {
+        "vegan": 1, "gluten-free": 1, "": 1,
+    }
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
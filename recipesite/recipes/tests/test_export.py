@@ -0,0 +1,162 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from recipes import export
+from recipes.models import Recipe
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user who owns the recipes below.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+@pytest.fixture
+def recipes(user):
+    """
+    Creates two public recipes of another user and one private recipe of the test user.
+    """
+    other = User.objects.create_user(username="otheruser", password="password")
+    common = {"description": "Good, really", "ingredients": "Rice, Beans", "diet": "Vegan"}
+    return [
+        Recipe.objects.create(name="Cheap Rice", cost=2, time=20, user=other, is_public=True, **common),
+        Recipe.objects.create(name="Fancy Rice", cost=30, time=90, user=other, is_public=True, **common),
+        Recipe.objects.create(name="My Rice", cost=10, time=40, user=user, is_public=False, **common),
+    ]
+
+
+def read_csv(content):
+    return list(csv.DictReader(io.StringIO(content.decode())))
+
+
+# ----------------------------------------------------------------------
+# Endpoint Tests
+# ----------------------------------------------------------------------
+
+def test_csv_export_streams_visible_recipes(client, recipes):
+    """
+    Tests that an anonymous CSV export streams only the public recipes, sorted like the table.
+    """
+    response = client.get(reverse("recipesns:recipe_export"), {"format": "csv", "sort": "cost", "dir": "desc"})
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"].startswith("text/csv")
+    assert 'filename="recipes.csv"' in response["Content-Disposition"]
+    rows = read_csv(b"".join(response.streaming_content))
+    assert [row["name"] for row in rows] == ["Fancy Rice", "Cheap Rice"]
+    assert rows[0]["author"] == "otheruser"
+    assert rows[0]["description"] == "Good, really"
+
+
+def test_export_includes_own_private_recipes(client, user, recipes):
+    """
+    Tests that a logged-in user's export also contains their private recipes.
+    """
+    client.login(username="testuser", password="password")
+    response = client.get(reverse("recipesns:recipe_export"), {"format": "jsonl", "sort": "cost"})
+
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [row["name"] for row in rows] == ["Cheap Rice", "My Rice", "Fancy Rice"]
+    assert rows[1]["is_public"] is False
+
+
+def test_gzip_export(client, recipes):
+    """
+    Tests that the gzip variants decompress to the plain export.
+    """
+    url = reverse("recipesns:recipe_export")
+    plain = b"".join(client.get(url, {"format": "jsonl"}).streaming_content)
+    response = client.get(url, {"format": "jsonl.gz"})
+
+    assert response["Content-Type"] == "application/gzip"
+    assert gzip.decompress(b"".join(response.streaming_content)) == plain
+
+
+def test_unknown_format_is_rejected(client, db):
+    """
+    Tests that an unsupported format gets a 400 instead of an empty download.
+    """
+    response = client.get(reverse("recipesns:recipe_export"), {"format": "xlsx"})
+
+    assert response.status_code == 400
+
+
+def test_table_links_to_export_with_current_sort(client, recipes):
+    """
+    Tests that the table's export links carry its sort parameters.
+    """
+    response = client.get(reverse("recipesns:recipe_table"), {"sort": "time", "dir": "desc"})
+
+    assert b"table/export/?sort=time&amp;dir=desc&amp;format=csv" in response.content
+
+
+def test_export_buffers_rows_into_chunks(db, recipes, monkeypatch):
+    """
+    Tests that the stream hands out several buffered chunks rather than the whole file at once.
+    """
+    monkeypatch.setattr(export, "BUFFER_SIZE", 100)
+
+    chunks = list(export.export_stream(Recipe.objects.order_by("id"), "csv", chunk_size=1))
+
+    assert len(chunks) > 1
+    assert len(read_csv(b"".join(chunks))) == 3
+
+
+# ----------------------------------------------------------------------
+# Command Tests
+# ----------------------------------------------------------------------
+
+def test_export_command_writes_file(recipes, tmp_path):
+    """
+    Tests that export_recipes writes the public recipes for anonymous exports.
+    """
+    path = tmp_path / "recipes.csv.gz"
+
+    call_command("export_recipes", "--format", "csv.gz", "--output", str(path), "--sort", "name")
+
+    rows = read_csv(gzip.decompress(path.read_bytes()))
+    assert [row["name"] for row in rows] == ["Cheap Rice", "Fancy Rice"]
+
+
+def test_export_command_as_user(user, recipes, tmp_path):
+    """
+    Tests that --user exports what that user can see.
+    """
+    path = tmp_path / "recipes.jsonl"
+
+    call_command("export_recipes", "--format", "jsonl", "--output", str(path), "--user", "testuser")
+
+    names = {json.loads(line)["name"] for line in path.read_text().splitlines()}
+    assert names == {"Cheap Rice", "Fancy Rice", "My Rice"}
+
+
+def test_export_command_applies_table_filters(user, recipes, tmp_path):
+    """
+    Tests that the range, diet, owner and mine options filter like the table's parameters do.
+    """
+    path = tmp_path / "recipes.csv"
+
+    def names(*args):
+        call_command("export_recipes", "--output", str(path), "--sort", "cost", *args)
+        return [row["name"] for row in read_csv(path.read_bytes())]
+
+    assert names("--cost-min", "5", "--time-max", "60") == []
+    assert names("--user", "testuser", "--cost-min", "5", "--time-max", "60") == ["My Rice"]
+    assert names("--diet", "plant based", "--diet", "vegan", "--owner", "otheruser") == ["Cheap Rice", "Fancy Rice"]
+    assert names("--diet", "keto") == []
+    assert names("--user", "testuser", "--mine") == ["My Rice"]
+    with pytest.raises(CommandError):
+        names("--mine")
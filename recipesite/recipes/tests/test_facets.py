@@ -0,0 +1,255 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import reverse
+from recipes.facets import facet_stats, reconcile
+from recipes.importer import Importer
+from recipes.models import Recipe, RecipeFacetCount
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user who owns the recipes below.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+def make_recipe(user, name, diet="Vegan", cost=5, time=20, is_public=True):
+    return Recipe.objects.create(
+        name=name,
+        description="Tasty",
+        cost=cost,
+        time=time,
+        ingredients="Rice",
+        diet=diet,
+        user=user,
+        is_public=is_public,
+    )
+
+
+def counts():
+    return {(row.facet, row.value): row.count for row in RecipeFacetCount.objects.exclude(count=0)}
+
+
+# ----------------------------------------------------------------------
+# Signal Tests
+# ----------------------------------------------------------------------
+
+def test_create_counts_public_recipe(user):
+    """
+    Tests that a new public recipe is counted once per facet, with combined diets split up.
+    """
+    make_recipe(user, "Buddha Bowl", diet="Vegan, Gluten-Free", cost=12, time=45)
+
+    assert counts() == {
+        ("total", ""): 1,
+        ("diet", "vegan"): 1,
+        ("diet", "gluten-free"): 1,
+        ("cost", "10"): 1,
+        ("time", "30"): 1,
+        ("user", str(user.pk)): 1,
+    }
+
+
+def test_private_recipe_is_not_counted(user):
+    """
+    Tests that private recipes stay out of the public facets.
+    """
+    make_recipe(user, "Secret Stew", is_public=False)
+
+    assert counts() == {}
+
+
+def test_update_moves_counts(user):
+    """
+    Tests that changing diet, cost and time moves the recipe between values, also when it was loaded with .only().
+    """
+    recipe = make_recipe(user, "Chili", diet="Vegan", cost=5, time=20)
+
+    recipe = Recipe.objects.only("name", "diet").get(pk=recipe.pk)
+    recipe.diet = "Keto"
+    recipe.save()
+    recipe = Recipe.objects.get(pk=recipe.pk)
+    recipe.cost = 60
+    recipe.time = 150
+    recipe.save()
+
+    assert counts() == {
+        ("total", ""): 1,
+        ("diet", "keto"): 1,
+        ("cost", "50"): 1,
+        ("time", "120"): 1,
+        ("user", str(user.pk)): 1,
+    }
+
+
+def test_publishing_and_unpublishing(user):
+    """
+    Tests that toggling is_public adds and removes the recipe from every facet.
+    """
+    recipe = make_recipe(user, "Gumbo", is_public=False)
+
+    recipe.is_public = True
+    recipe.save()
+    assert counts()[("total", "")] == 1
+
+    recipe.is_public = False
+    recipe.save()
+    assert counts() == {}
+
+
+def test_unchanged_save_writes_nothing(user, django_assert_num_queries):
+    """
+    Tests that a save not touching any facet field leaves the counters alone.
+    """
+    recipe = make_recipe(user, "Tacos")
+    recipe.name = "Fish Tacos"
+
+    with django_assert_num_queries(1):
+        recipe.save(update_fields=["name"])
+
+
+def test_delete_and_cascade_decrement(user):
+    """
+    Tests that deleting a recipe, or its author, removes it from the counts.
+    """
+    make_recipe(user, "Pad Thai")
+    doomed = make_recipe(user, "Pho", diet="Keto")
+
+    doomed.delete()
+    assert counts()[("total", "")] == 1
+    assert ("diet", "keto") not in counts()
+
+    user.delete()
+    assert counts() == {}
+
+
+def test_importer_counts_bulk_rows(user):
+    """
+    Tests that recipes imported with bulk_create are counted too.
+    """
+    importer = Importer(user)
+    for number in range(3):
+        importer.add(number, {"name": f"Dal {number}", "description": "Tasty", "cost": "3", "time": "30",
+                              "ingredients": "lentils", "diet": "vegetarian", "is_public": "true"})
+    importer.finish()
+
+    assert counts()[("diet", "vegetarian")] == 3
+    assert counts()[("total", "")] == 3
+
+
+# ----------------------------------------------------------------------
+# Reconcile Tests
+# ----------------------------------------------------------------------
+
+def test_reconcile_repairs_drift(user):
+    """
+    Tests that reconcile finds and fixes counts that went stale through queryset.update().
+    """
+    make_recipe(user, "Chili", diet="Vegan")
+    Recipe.objects.update(diet="Paleo")
+
+    assert reconcile(dry_run=True) == [("diet", "paleo", 0, 1), ("diet", "vegan", 1, 0)]
+    assert ("diet", "vegan") in counts()
+
+    reconcile()
+    assert counts()[("diet", "paleo")] == 1
+    assert ("diet", "vegan") not in counts()
+    assert reconcile() == []
+
+
+def test_reconcile_command(user, capsys):
+    """
+    Tests that the reconcile command reports what it repaired.
+    """
+    make_recipe(user, "Chili")
+    RecipeFacetCount.objects.all().delete()
+
+    call_command("reconcile_recipe_facets")
+
+    assert "Repaired 5 drifted facet counts." in capsys.readouterr().out
+    assert counts()[("total", "")] == 1
+
+
+# ----------------------------------------------------------------------
+# Stats Tests
+# ----------------------------------------------------------------------
+
+def test_stats_from_counters(user, django_assert_num_queries):
+    """
+    Tests the stats built from the counters, and that repeated reads come from the cache.
+    """
+    other = User.objects.create_user(username="otheruser", password="password")
+    make_recipe(user, "Chili", diet="Vegan", cost=3)
+    make_recipe(user, "Curry", diet="Vegan", cost=25)
+    make_recipe(other, "Steak", diet="", cost=30)
+
+    stats = facet_stats()
+
+    assert stats["total"] == 3
+    assert stats["authors"] == 2
+    assert stats["diet"] == [
+        {"value": "vegan", "label": "Vegan", "count": 2},
+        {"value": "", "label": "Not specified", "count": 1},
+    ]
+    assert [item["count"] for item in stats["cost"]] == [1, 0, 0, 2, 0]
+    assert [(item["label"], item["count"]) for item in stats["users"]] == [("testuser", 2), ("otheruser", 1)]
+    with django_assert_num_queries(0):
+        assert facet_stats() == stats
+
+
+def test_stats_endpoint_and_table_widget(client, user):
+    """
+    Tests the JSON endpoint and the stats shown on the table page, including after a change.
+    """
+    make_recipe(user, "Chili")
+    assert client.get(reverse("recipesns:api_recipe_stats")).json()["total"] == 1
+
+    make_recipe(user, "Curry", diet="Keto")
+    data = client.get(reverse("recipesns:api_recipe_stats")).json()
+    response = client.get(reverse("recipesns:recipe_table"))
+
+    assert data["total"] == 2
+    assert {"value": "keto", "label": "Keto", "count": 1} in data["diet"]
+    assert b"By Diet" in response.content
+    assert b"Keto" in response.content
+
+
+# ----------------------------------------------------------------------
+# Migration Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db(transaction=True)
+def test_data_migration_counts_existing_public_recipes():
+    """
+    Migrating an existing database counts the public recipes into facet rows.
+    """
+    executor = MigrationExecutor(connection)
+    executor.migrate([("recipes", "0008_recipe_previews")])
+    old_apps = executor.loader.project_state([("recipes", "0008_recipe_previews")]).apps
+    OldRecipe = old_apps.get_model("recipes", "Recipe")
+    OldRecipe.objects.create(name="Curry", description="d", cost=12, time=45, ingredients="rice",
+                             diet="Vegan, GF", is_public=True)
+    OldRecipe.objects.create(name="Toast", description="d", cost=1, time=5, ingredients="bread", diet="",
+                             is_public=True)
+    OldRecipe.objects.create(name="Secret", description="d", cost=60, time=5, ingredients="tofu", diet="Keto",
+                             is_public=False)
+
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate([("recipes", "0009_facet_counts")])
+
+    counts = {(row.facet, row.value): row.count for row in RecipeFacetCount.objects.all()}
+    assert counts == {
+        ("total", ""): 2, ("diet", "vegan"): 1, ("diet", "gf"): 1, ("diet", ""): 1,
+        ("cost", "10"): 1, ("cost", "0"): 1, ("time", "30"): 1, ("time", "0"): 1,
+    }
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
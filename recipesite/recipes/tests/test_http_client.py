@@ -0,0 +1,232 @@
+import asyncio
+import time
+
+import pytest
+import requests
+from recipes import spoonacular
+from recipes.http_client import (
+    AsyncHttpClient, BudgetExhausted, CircuitBreaker, CircuitOpenError, HttpClient, request_duration, request_retries,
+    time_budget,
+)
+from recipes.metrics import registry
+
+
+class FakeClock:
+    """
+    Manually advanced clock for driving the circuit breaker through its states.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_retries_transient_upstream_errors(spoonacular_stub):
+    """
+    A 503 followed by a success is retried transparently and counted.
+    """
+    client = HttpClient("test-retry", retries=2, backoff_factor=0)
+    spoonacular_stub.failures = [503]
+    retries_before = request_retries.value(client="test-retry")
+
+    response = client.get(f"{spoonacular_stub.url}/recipes/complexSearch", params={"query": "soup"}, timeout=2)
+
+    assert response.status_code == 200
+    assert spoonacular_stub.count("/recipes/complexSearch") == 2
+    assert request_retries.value(client="test-retry") == retries_before + 1
+    assert request_duration.count(client="test-retry") == 1
+    assert 'recipes_http_client_requests_total{client="test-retry",outcome="ok"} 1' in registry.render()
+
+
+def test_breaker_opens_after_repeated_failures(spoonacular_stub):
+    """
+    After `failure_threshold` failed calls the client fails fast without
+    touching the upstream.
+    """
+    client = HttpClient("test-breaker", retries=0, failure_threshold=2)
+    spoonacular_stub.failures = [500, 500, 500]
+    url = f"{spoonacular_stub.url}/recipes/complexSearch"
+
+    assert client.get(url, timeout=2).status_code == 500
+    assert client.get(url, timeout=2).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        client.get(url, timeout=2)
+    assert len(spoonacular_stub.requests) == 2
+
+
+def test_breaker_half_open_trial_call():
+    """
+    After the reset timeout a single trial call is allowed; its success closes
+    the breaker and its failure opens it again.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 10
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial call at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_not_found_does_not_trip_the_breaker(spoonacular_stub):
+    """
+    4xx answers are the caller's problem, not an upstream outage.
+    """
+    client = HttpClient("test-404", retries=0, failure_threshold=1)
+    client.get(f"{spoonacular_stub.url}/recipes/1/information", timeout=2)
+    assert client.breaker.state == "closed"
+
+
+@pytest.mark.django_db
+def test_autofill_fails_fast_while_the_breaker_is_open(client, spoonacular_stub):
+    """
+    With Spoonacular marked as down, the autofill endpoint answers immediately
+    with success=False instead of waiting on the upstream.
+    """
+    for _ in range(spoonacular.client.breaker.failure_threshold):
+        spoonacular.client.breaker.record_failure()
+
+    response = client.get("/recipes/autofill-recipe/", {"name": "garlic chicken"})
+
+    assert response.json() == {"success": False}
+    assert spoonacular_stub.requests == []
+
+
+def test_connection_errors_count_as_failures():
+    """
+    Refused connections are upstream failures and re-raised to the caller.
+    """
+    client = HttpClient("test-refused", retries=0, failure_threshold=1)
+    with pytest.raises(requests.ConnectionError):
+        client.get("http://127.0.0.1:9/", timeout=1)
+    assert client.breaker.state == "open"
+
+
+def test_unexpected_error_releases_the_trial_call(monkeypatch):
+    """
+    A trial call that ends in an error that says nothing about the upstream
+    lets the next trial through instead of leaving the breaker stuck open.
+    """
+    clock = FakeClock()
+    client = HttpClient("test-trial", retries=0, failure_threshold=1)
+    client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    client.breaker.record_failure()
+    clock.now = 10
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(client.session, "get", broken)
+    with pytest.raises(RuntimeError):
+        client.get("http://127.0.0.1:9/", timeout=1)
+
+    assert client.breaker.state == "half-open"
+    assert client.breaker.before_call() is True
+
+
+def test_cancelled_async_trial_call_is_released(spoonacular_stub):
+    """
+    Cancelling the async trial call (e.g. the browser went away) frees the
+    half-open slot for the next call.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    client = AsyncHttpClient("test-cancel", retries=0, breaker=breaker)
+    breaker.record_failure()
+    clock.now = 10
+    spoonacular_stub.delay = 1
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(client.get(f"{spoonacular_stub.url}/recipes/complexSearch", timeout=5))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert breaker.before_call() is True
+
+
+def test_long_retry_after_is_not_waited_out(spoonacular_stub):
+    """
+    A 503 asking to come back later than max_retry_after is returned at once;
+    a short Retry-After is honoured.
+    """
+    client = HttpClient("test-retry-after", retries=2, max_retry_after=1)
+    url = f"{spoonacular_stub.url}/recipes/complexSearch"
+    spoonacular_stub.retry_after = 60
+    spoonacular_stub.failures = [503]
+
+    assert client.get(url, timeout=2).status_code == 503
+    assert spoonacular_stub.count("/recipes/complexSearch") == 1
+
+    spoonacular_stub.retry_after = 0
+    spoonacular_stub.failures = [503]
+    assert client.get(url, timeout=2).status_code == 200
+
+
+def test_async_long_retry_after_is_not_waited_out(spoonacular_stub):
+    """
+    The async client stops retrying on a long Retry-After as well.
+    """
+    client = AsyncHttpClient("test-async-retry-after", retries=2, max_retry_after=1)
+    url = f"{spoonacular_stub.url}/recipes/complexSearch"
+    spoonacular_stub.retry_after = 60
+    spoonacular_stub.failures = [429]
+
+    assert asyncio.run(client.get(url, timeout=2)).status_code == 429
+    assert spoonacular_stub.count("/recipes/complexSearch") == 1
+
+
+def test_time_budget_cuts_timeouts_and_retries(spoonacular_stub):
+    """
+    Within a time budget a slow call times out when the budget does, a retry
+    that wouldn't fit is not made, and calls after the budget is spent fail
+    without any I/O.
+    """
+    client = HttpClient("test-budget", retries=2, max_retry_after=5)
+    url = f"{spoonacular_stub.url}/recipes/complexSearch"
+
+    spoonacular_stub.retry_after = 1
+    spoonacular_stub.failures = [503]
+    with time_budget(1.5):
+        assert client.get(url, timeout=2).status_code == 503
+    assert spoonacular_stub.count("/recipes/complexSearch") == 1
+
+    spoonacular_stub.delay = 1
+    start = time.monotonic()
+    with time_budget(0.3):
+        with pytest.raises(requests.RequestException):
+            client.get(url, timeout=(2, 2))
+        with pytest.raises(BudgetExhausted):
+            client.get(url, timeout=2)
+    assert time.monotonic() - start < 0.9
+    assert spoonacular_stub.count("/recipes/complexSearch") == 2
+
+
+def test_async_time_budget_cuts_retries(spoonacular_stub):
+    """
+    The async client doesn't start a retry that wouldn't fit in the budget either.
+    """
+    client = AsyncHttpClient("test-async-budget", retries=2, max_retry_after=5)
+    url = f"{spoonacular_stub.url}/recipes/complexSearch"
+    spoonacular_stub.retry_after = 1
+    spoonacular_stub.failures = [503]
+
+    async def get():
+        with time_budget(1.5):
+            return await client.get(url, timeout=2)
+
+    assert asyncio.run(get()).status_code == 503
+    assert spoonacular_stub.count("/recipes/complexSearch") == 1
@@ -0,0 +1,157 @@
+import gzip
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from recipes.importer import Importer, clean_row
+from recipes.models import Recipe
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user to own the imported recipes.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+VALID_ROW = {
+    "name": "Bean Chili",
+    "description": "Smoky",
+    "cost": "8",
+    "time": "45",
+    "ingredients": "2 cans beans, 1 onion, garlic",
+    "diet": "Vegan",
+    "is_public": "true",
+}
+
+
+# ----------------------------------------------------------------------
+# Validation Tests
+# ----------------------------------------------------------------------
+
+def test_clean_row_applies_form_rules():
+    """
+    Tests that rows are checked with RecipeForm's field rules.
+    """
+    values, errors = clean_row({**VALID_ROW, "cost": "cheap", "name": "x" * 101})
+
+    assert set(errors) == {"cost", "name"}
+
+
+def test_clean_row_defaults():
+    """
+    Tests that a missing is_public defaults to public and extra columns are ignored.
+    """
+    row = {key: value for key, value in VALID_ROW.items() if key != "is_public"}
+    values, errors = clean_row({**row, "id": "7", "author": "someone"})
+
+    assert errors == {}
+    assert values["is_public"] is True
+    assert values["cost"] == 8
+    assert "id" not in values
+
+
+def test_importer_batches_and_parses_ingredients(user, django_assert_max_num_queries):
+    """
+    Tests that rows are inserted in batches with their parsed ingredients.
+    """
+    importer = Importer(user, batch_size=50)
+
+    # A handful of queries per batch, not per row
+    with django_assert_max_num_queries(55):
+        for number in range(120):
+            importer.add(number, {**VALID_ROW, "name": f"Chili {number}"})
+        importer.finish()
+
+    assert importer.imported == 120
+    assert Recipe.objects.filter(user=user).count() == 120
+    recipe = Recipe.objects.get(name="Chili 7")
+    assert recipe.ingredient_count == 3
+    assert set(recipe.parsed_ingredients.values_list("name", flat=True)) == {"beans", "onion", "garlic"}
+
+
+# ----------------------------------------------------------------------
+# Command Tests
+# ----------------------------------------------------------------------
+
+def test_import_csv_with_rejects(user, tmp_path, capsys):
+    """
+    Tests that a CSV import inserts valid rows and writes invalid ones to the side file.
+    """
+    path = tmp_path / "recipes.csv"
+    path.write_text(
+        "name,description,cost,time,ingredients,diet,is_public\n"
+        "Bean Chili,Smoky,8,45,beans,Vegan,true\n"
+        ",No name,8,45,beans,Vegan,true\n"
+        "Rice Bowl,Simple,3,15,rice,Vegan,false\n"
+    )
+
+    call_command("import_recipes", str(path), "--user", "testuser")
+
+    assert sorted(Recipe.objects.values_list("name", "is_public")) == [("Bean Chili", True), ("Rice Bowl", False)]
+    rejects = [json.loads(line) for line in (tmp_path / "recipes.csv.rejects.jsonl").read_text().splitlines()]
+    assert len(rejects) == 1
+    assert rejects[0]["line"] == 3
+    assert "name" in rejects[0]["errors"]
+    out = capsys.readouterr().out
+    assert "Imported 2 recipes" in out
+    assert "rows/s" in out
+
+
+def test_import_gzipped_jsonl(user, tmp_path):
+    """
+    Tests that gzipped JSON Lines are imported, malformed lines rejected.
+    """
+    path = tmp_path / "recipes.jsonl.gz"
+    lines = [json.dumps({**VALID_ROW, "cost": 8, "is_public": True}), "{not json"]
+    path.write_bytes(gzip.compress("\n".join(lines).encode()))
+    rejects = tmp_path / "bad.jsonl"
+
+    call_command("import_recipes", str(path), "--rejects", str(rejects))
+
+    assert Recipe.objects.get().name == "Bean Chili"
+    assert "Invalid JSON" in rejects.read_text()
+
+
+def test_import_spoonacular_json(user, tmp_path):
+    """
+    Tests that Spoonacular complexSearch results are mapped onto recipe fields.
+    """
+    path = tmp_path / "search.json"
+    path.write_text(json.dumps({"results": [{
+        "id": 1,
+        "title": "Pasta",
+        "summary": "<b>Quick</b> pasta",
+        "readyInMinutes": 20,
+        "pricePerServing": 250,
+        "diets": ["vegetarian"],
+        "extendedIngredients": [{"original": "200 g pasta"}, {"original": "1 tomato"}],
+    }]}))
+
+    call_command("import_recipes", str(path))
+
+    recipe = Recipe.objects.get()
+    assert (recipe.name, recipe.description, recipe.cost, recipe.time) == ("Pasta", "Quick pasta", 2, 20)
+    assert recipe.ingredients == "200 g pasta, 1 tomato"
+    assert recipe.diet == "vegetarian"
+
+
+def test_import_round_trips_export(user, tmp_path, client):
+    """
+    Tests that a file written by export_recipes imports cleanly and invalidates the cached list page.
+    """
+    Recipe.objects.create(name="Stew", description="Hearty", cost=9, time=120, ingredients="beef", diet="None")
+    path = tmp_path / "recipes.csv"
+    call_command("export_recipes", "--output", str(path))
+    client.get(reverse("recipesns:recipe_list"))
+
+    call_command("import_recipes", str(path))
+
+    assert Recipe.objects.filter(name="Stew").count() == 2
+    assert client.get(reverse("recipesns:recipe_list")).content.count(b"Stew") == 2
@@ -0,0 +1,144 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from recipes.forms import RecipeForm
+from recipes.ingredients import parse_ingredients
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+def make_recipe(name, ingredients, **kwargs):
+    """
+    Creates a public recipe; saving it parses its ingredients.
+    """
+    recipe = Recipe.objects.create(name=name, description="desc", cost=5, time=10, ingredients=ingredients,
+                                   diet="None", is_public=True, **kwargs)
+    return recipe
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 cloves garlic, minced", [("garlic", 2.0, "clove")]),
+    ("1 1/2 cups of rice (uncooked)", [("rice", 1.5, "cup")]),
+    ("½ tsp red pepper flakes", [("pepper", 0.5, "tsp")]),
+    ("Eggs\n3 tomatoes; salt to taste", [("egg", None, ""), ("tomato", 3.0, ""), ("salt", None, "")]),
+    ("Fresh Berries, berries", [("fresh berry", None, ""), ("berry", None, "")]),
+    ("", []),
+])
+def test_parse_ingredients(text, expected):
+    """
+    Quantities and units are split off, vocabulary terms are canonicalized and
+    preparation leftovers such as "minced" are dropped.
+    """
+    assert [tuple(item) for item in parse_ingredients(text)] == expected
+
+
+@pytest.mark.django_db
+def test_sync_rebuilds_rows_from_text():
+    """
+    Syncing replaces a recipe's parsed rows and reuses existing ingredients.
+    """
+    recipe = make_recipe("Omelette", "3 eggs, 50 g cheese")
+    assert sorted(recipe.parsed_ingredients.values_list("name", flat=True)) == ["cheese", "egg"]
+
+    recipe.ingredients = "2 eggs, spinach"
+    RecipeIngredient.objects.sync([recipe])
+
+    assert sorted(recipe.parsed_ingredients.values_list("name", flat=True)) == ["egg", "spinach"]
+    assert RecipeIngredient.objects.get(recipe=recipe, ingredient__name="egg").quantity == 2.0
+    assert Ingredient.objects.filter(name="egg").count() == 1
+
+
+@pytest.mark.django_db
+def test_contains_any_and_all_ingredients():
+    """
+    The inverted index answers "contains any of" and "contains all of" queries,
+    with names normalized the same way as the parsed text.
+    """
+    stir_fry = make_recipe("Stir Fry", "chicken breast, 2 cloves garlic, rice")
+    soup = make_recipe("Garlic Soup", "garlic, onions, stock")
+    make_recipe("Pancakes", "flour, milk, eggs")
+
+    assert set(Recipe.objects.with_any_ingredients(["Garlic"])) == {stir_fry, soup}
+    assert set(Recipe.objects.with_any_ingredients(["onion", "rice"])) == {stir_fry, soup}
+    assert list(Recipe.objects.with_all_ingredients(["garlic", "Chicken"])) == [stir_fry]
+    assert list(Recipe.objects.with_all_ingredients(["garlic", "flour"])) == []
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="Checks SQLite's query plan")
+def test_contains_query_uses_the_inverted_index():
+    """
+    "Contains" lookups seek the (ingredient, recipe) index instead of scanning.
+    """
+    plan = Recipe.objects.with_all_ingredients(["garlic", "chicken"]).explain()
+    assert "ingredient_recipes_idx" in plan
+    assert "SCAN recipes_recipeingredient" not in plan
+
+
+@pytest.mark.django_db
+def test_form_save_keeps_parsed_ingredients_in_sync():
+    """
+    Saving RecipeForm, with or without commit, re-parses the text.
+    """
+    user = User.objects.create_user(username="chef", password="password")
+    data = {"name": "Tacos", "description": "Spicy", "cost": 8, "time": 20,
+            "ingredients": "Tortillas, Beans, 1 tomato", "diet": "Vegan", "is_public": True}
+
+    form = RecipeForm(data=data)
+    recipe = form.save(commit=False)
+    recipe.user = user
+    recipe.save()
+    form.save_m2m()
+    assert sorted(recipe.parsed_ingredients.values_list("name", flat=True)) == ["beans", "tomato", "tortilla"]
+
+    form = RecipeForm(data={**data, "ingredients": "Tortillas, Beef"}, instance=recipe)
+    form.save()
+    assert sorted(recipe.parsed_ingredients.values_list("name", flat=True)) == ["beef", "tortilla"]
+
+
+@pytest.mark.django_db
+def test_model_save_keeps_parsed_ingredients_in_sync():
+    """
+    Any save that changes the ingredients text re-parses it, forms or not;
+    saves leaving the text alone don't touch the rows.
+    """
+    recipe = make_recipe("Chili", "1 lb beef, 2 cans beans")
+    assert recipe.ingredient_count == 2
+
+    recipe.ingredients = "beans, onion, 3 tomatoes"
+    recipe.save(update_fields=["ingredients"])
+    recipe.refresh_from_db()
+    assert sorted(recipe.parsed_ingredients.values_list("name", flat=True)) == ["beans", "onion", "tomato"]
+    assert recipe.ingredient_count == 3
+
+    recipe = Recipe.objects.only("name").get(pk=recipe.pk)
+    recipe.name = "Veggie Chili"
+    recipe.save(update_fields=["name"])
+    assert Recipe.objects.get(pk=recipe.pk).ingredient_count == 3
+    assert RecipeIngredient.objects.filter(recipe=recipe).count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_data_migration_parses_existing_recipes():
+    """
+    Migrating an existing database parses the ingredients text of every recipe
+    and seeds the vocabulary.
+    """
+    executor = MigrationExecutor(connection)
+    executor.migrate([("recipes", "0005_ingredients")])
+    old_apps = executor.loader.project_state([("recipes", "0005_ingredients")]).apps
+    OldRecipe = old_apps.get_model("recipes", "Recipe")
+    recipe = OldRecipe.objects.create(name="Chili", description="desc", cost=5, time=60,
+                                      ingredients="1 lb beef, 2 cans beans, 1 onion", diet="None")
+
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate([("recipes", "0006_parse_ingredients")])
+
+    rows = RecipeIngredient.objects.filter(recipe_id=recipe.pk)
+    assert sorted(rows.values_list("ingredient__name", flat=True)) == ["beans", "beef", "onion"]
+    assert rows.get(ingredient__name="beans").unit == "can"
+    assert Ingredient.objects.filter(name="broccoli").exists()
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
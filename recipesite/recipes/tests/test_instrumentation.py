@@ -0,0 +1,166 @@
+import logging
+import re
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from django.urls import reverse
+from recipes.instrumentation import RequestStats, current_stats
+from recipes.models import Recipe
+from recipes.tests.test_spoonacular import information_payload
+
+
+def timing(response, metric):
+    """
+    Parses one metric of a Server-Timing header into (duration in ms, description).
+    """
+    match = re.search(rf'{metric};dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers["Server-Timing"])
+    return float(match.group(1)), match.group(2)
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def recipe(db):
+    """
+    Creates a public recipe so the list page has something to render.
+    """
+    owner = User.objects.create(username="owner")
+    return Recipe.objects.create(
+        name="Soup", description="Warm", cost=3, time=30, ingredients="water", diet="Vegan", user=owner
+    )
+
+
+# ----------------------------------------------------------------------
+# Server-Timing Tests
+# ----------------------------------------------------------------------
+
+def test_server_timing_reports_sql_and_templates(client, recipe, django_assert_num_queries):
+    """
+    Tests that the header counts exactly the queries the request ran and times the template.
+    """
+    with django_assert_num_queries(1):
+        response = client.get(reverse("recipesns:recipe_list"))
+
+    total, _ = timing(response, "total")
+    sql_time, sql_desc = timing(response, "db")
+    template_time, _ = timing(response, "tpl")
+    assert sql_desc == "1 queries"
+    assert total >= sql_time + template_time
+    assert template_time > 0
+
+
+@pytest.mark.django_db
+def test_server_timing_reports_outbound_http(client, spoonacular_stub):
+    """
+    Tests that Spoonacular calls made while handling the request are timed.
+    """
+    spoonacular_stub.searches["soup"] = [1]
+    spoonacular_stub.recipes[1] = information_payload(1)
+
+    response = client.get(reverse("recipesns:autofill_recipe"), {"name": "soup"})
+
+    http_time, http_desc = timing(response, "http")
+    assert http_desc == "2 calls"
+    assert http_time > 0
+
+
+def test_async_requests_are_measured(recipe):
+    """
+    Tests that queries run on sync_to_async threads under the ASGI handler are still counted.
+    """
+    response = async_to_sync(AsyncClient().get)(reverse("recipesns:recipe_list"))
+
+    assert timing(response, "db")[1] == "1 queries"
+
+
+def test_server_timing_can_be_disabled(client, recipe, settings):
+    """
+    Tests that RECIPES_SERVER_TIMING turns the header off.
+    """
+    settings.RECIPES_SERVER_TIMING = False
+
+    response = client.get(reverse("recipesns:recipe_list"))
+
+    assert "Server-Timing" not in response.headers
+
+
+def test_no_stats_outside_requests(recipe):
+    """
+    Tests that queries outside a request aren't attributed to anything.
+    """
+    assert current_stats() is None
+    assert Recipe.objects.count() == 1
+
+
+# ----------------------------------------------------------------------
+# Sink Tests
+# ----------------------------------------------------------------------
+
+def test_log_sink(client, recipe, settings, caplog):
+    """
+    Tests that the log sink writes one line per request with the URL name.
+    """
+    settings.RECIPES_INSTRUMENTATION_SINKS = ["recipes.instrumentation.log_sink"]
+
+    with caplog.at_level(logging.INFO, logger="recipes.requests"):
+        client.get(reverse("recipesns:recipe_list"))
+
+    assert "view=recipesns:recipe_list status=200" in caplog.text
+    assert "sql_queries=1" in caplog.text
+
+
+def test_failing_sink_does_not_break_requests(client, recipe, settings):
+    """
+    Tests that an exception in a sink is logged, not raised.
+    """
+    settings.RECIPES_INSTRUMENTATION_SINKS = ["recipes.tests.test_instrumentation.broken_sink"]
+
+    assert client.get(reverse("recipesns:recipe_list")).status_code == 200
+
+
+def broken_sink(stats):
+    raise RuntimeError("sink down")
+
+
+def test_metrics_endpoint(client, recipe):
+    """
+    Tests that the metrics sink feeds the Prometheus endpoint.
+    """
+    client.get(reverse("recipesns:recipe_detail", args=[recipe.pk]))
+    User.objects.create_user(username="admin", password="password", is_staff=True)
+    client.login(username="admin", password="password")
+
+    response = client.get(reverse("recipesns:metrics"))
+
+    assert response["Content-Type"].startswith("text/plain")
+    assert 'recipes_request_duration_seconds_count{view="recipesns:recipe_detail"}' in response.content.decode()
+
+
+def test_metrics_endpoint_is_internal(client, db, settings):
+    """
+    Tests that the metrics endpoint is hidden from anonymous clients, local ones included (a reverse proxy makes every
+    client local), and answers the configured bearer token.
+    """
+    settings.RECIPES_METRICS_TOKEN = "s3cret"
+    url = reverse("recipesns:metrics")
+
+    assert client.get(url, REMOTE_ADDR="127.0.0.1").status_code == 404
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code == 404
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer s3cret").status_code == 200
+
+    settings.RECIPES_METRICS_TOKEN = ""
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer ").status_code == 404
+
+
+def test_request_stats_header_format():
+    """
+    Tests the Server-Timing rendering of a RequestStats.
+    """
+    stats = RequestStats()
+    stats.duration, stats.sql_count, stats.sql_time = 0.0125, 3, 0.004
+
+    assert stats.server_timing().startswith('total;dur=12.5, db;dur=4.0;desc="3 queries"')
@@ -0,0 +1,267 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from recipes import jobs, spoonacular
+from recipes.models import Job, Recipe
+
+from .test_spoonacular import information_payload
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def failing_handler(monkeypatch):
+    """
+    Registers a "flaky" job kind whose handler always raises.
+    """
+    def flaky():
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setitem(jobs.HANDLERS, "flaky", flaky)
+    return flaky
+
+
+@pytest.fixture
+def garlic_chicken(spoonacular_stub):
+    """
+    Registers a "garlic chicken" search with one matching recipe on the stub.
+    """
+    spoonacular_stub.searches["garlic chicken"] = [7]
+    spoonacular_stub.recipes[7] = information_payload(7)
+    return spoonacular_stub
+
+
+# ----------------------------------------------------------------------
+# Queue Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_enqueue_is_idempotent():
+    """
+    Tests that enqueueing a key that is already waiting adds nothing, and that a finished job can be queued again.
+    """
+    jobs.enqueue("prewarm_autofill", "soup", {"query": "soup"})
+    jobs.enqueue("prewarm_autofill", "soup", {"query": "soup"})
+    assert Job.objects.count() == 1
+
+    Job.objects.update(status=Job.DONE)
+    jobs.enqueue("prewarm_autofill", "soup", {"query": "soup"})
+
+    job = Job.objects.get()
+    assert job.status == Job.PENDING
+    assert job.attempts == 0
+
+
+@pytest.mark.django_db
+def test_a_job_is_claimed_once():
+    """
+    Tests that a claimed job is not handed to a second worker until its lease runs out.
+    """
+    jobs.enqueue("prewarm_autofill", "soup", {"query": "soup"})
+
+    first = jobs.claim("worker-1")
+    assert first.status == Job.RUNNING
+    assert first.attempts == 1
+    assert jobs.claim("worker-2") is None
+
+    Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+    again = jobs.claim("worker-2")
+    assert again.pk == first.pk
+    assert again.locked_by == "worker-2"
+    assert again.attempts == 2
+
+
+@pytest.mark.django_db
+def test_jobs_wait_for_run_at():
+    """
+    Tests that a job delayed into the future is not claimed yet.
+    """
+    jobs.enqueue("prewarm_autofill", "soup", {"query": "soup"}, delay=60)
+
+    assert jobs.claim("worker-1") is None
+
+
+@pytest.mark.django_db
+def test_failed_run_is_retried_with_backoff(failing_handler, settings):
+    """
+    Tests that a failing job goes back to the queue with a growing delay, and is marked failed after the last run.
+    """
+    settings.RECIPES_JOBS_MAX_ATTEMPTS = 2
+    jobs.enqueue("flaky", "once")
+    worker = jobs.Worker(name="worker-1")
+
+    assert worker.run(burst=True) == 1
+    job = Job.objects.get()
+    assert job.status == Job.PENDING
+    assert job.run_at > timezone.now() + timedelta(seconds=settings.RECIPES_JOBS_RETRY_DELAY * 0.4)
+    assert "upstream down" in job.last_error
+
+    Job.objects.update(run_at=timezone.now())
+    worker.run(burst=True)
+    job.refresh_from_db()
+    assert job.status == Job.FAILED
+    assert job.attempts == 2
+
+
+def test_retry_delay_doubles(settings):
+    """
+    Tests the exponential backoff, jitter included.
+    """
+    settings.RECIPES_JOBS_RETRY_DELAY = 10
+
+    assert 5 <= jobs.retry_delay(1) <= 15
+    assert 20 <= jobs.retry_delay(3) <= 60
+    assert jobs.retry_delay(30) == jobs.MAX_RETRY_DELAY
+
+
+# ----------------------------------------------------------------------
+# Rate Limit Tests
+# ----------------------------------------------------------------------
+
+def test_rate_limiter_counts_per_window():
+    """
+    Tests that acquisitions beyond the rate wait for the next window.
+    """
+    limiter = jobs.RateLimiter("test", rate=2, period=60)
+
+    assert limiter.acquire() == 0
+    assert limiter.acquire() == 0
+    assert 0 < limiter.acquire() <= 60
+
+
+@pytest.mark.django_db
+def test_worker_waits_out_the_rate_limit(garlic_chicken, monkeypatch):
+    """
+    Tests that a rate limited job only runs once the limiter lets it.
+    """
+    slept = []
+    worker = jobs.Worker(name="worker-1", sleep=slept.append)
+    waits = iter([12.5, 0])
+    monkeypatch.setattr(worker.limiter, "acquire", lambda: next(waits))
+    jobs.enqueue_prewarm(["garlic chicken"])
+
+    assert worker.run(burst=True) == 1
+    assert slept == [12.5]
+    assert Job.objects.get().status == Job.DONE
+
+
+# ----------------------------------------------------------------------
+# Handler Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_create_enqueues_enrichment_of_empty_fields(client, garlic_chicken):
+    """
+    Tests that a recipe saved with only a name and diet gets its description, ingredients, cost and time filled in
+    by a background job.
+    """
+    response = client.post(reverse("recipesns:recipe_create"), {
+        "name": "Garlic Chicken", "description": "", "cost": "", "time": "", "ingredients": "", "diet": "None",
+    })
+    assert response.status_code == 302
+    recipe = Recipe.objects.get()
+    assert recipe.cost == 0
+    assert Job.objects.get().key == f"enrich_recipe:{recipe.pk}"
+
+    jobs.Worker(name="worker-1").run(burst=True)
+
+    recipe.refresh_from_db()
+    assert recipe.description == "Garlicky & quick"
+    assert recipe.ingredients == "2 cloves garlic, 1 lb chicken"
+    assert (recipe.cost, recipe.time) == (3, 25)
+    assert recipe.ingredient_count == 2
+    assert Job.objects.get().status == Job.DONE
+
+
+@pytest.mark.django_db
+def test_enrichment_keeps_what_the_user_wrote(garlic_chicken):
+    """
+    Tests that enrichment only fills the empty fields.
+    """
+    recipe = Recipe.objects.create(name="Garlic Chicken", description="Mine", cost=9, time=0, ingredients="", diet="")
+
+    jobs.enrich_recipe(recipe.pk)
+
+    recipe.refresh_from_db()
+    assert (recipe.description, recipe.cost, recipe.time) == ("Mine", 9, 25)
+    assert recipe.ingredients == "2 cloves garlic, 1 lb chicken"
+
+
+@pytest.mark.django_db
+def test_complete_recipes_are_not_enqueued(client):
+    """
+    Tests that creating a recipe with every field given queues nothing.
+    """
+    client.post(reverse("recipesns:recipe_create"), {
+        "name": "Toast", "description": "Crunchy", "cost": 1, "time": 5, "ingredients": "bread", "diet": "None",
+    })
+
+    assert Recipe.objects.exists()
+    assert not Job.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("enrich, api_key", [(False, "test-key"), (True, None)])
+def test_empty_fields_are_required_without_enrichment(client, settings, enrich, api_key):
+    """
+    Tests that with enrichment turned off, or no Spoonacular key to run it with, a new recipe needs every field and
+    nothing is queued.
+    """
+    settings.RECIPES_ENRICH_ON_CREATE = enrich
+    settings.SPOONACULAR_API_KEY = api_key
+    response = client.post(reverse("recipesns:recipe_create"), {
+        "name": "Garlic Chicken", "description": "", "cost": "", "time": "", "ingredients": "", "diet": "None",
+    })
+
+    assert response.status_code == 200
+    assert set(response.context["form"].errors) == {"description", "ingredients", "cost", "time"}
+    assert not Recipe.objects.exists()
+    assert not Job.objects.exists()
+
+
+@pytest.mark.django_db
+def test_enrichment_failure_is_retried(garlic_chicken):
+    """
+    Tests that an upstream error fails the run instead of being swallowed like autofill does, so it is retried.
+    """
+    recipe = Recipe.objects.create(name="Garlic Chicken", description="", cost=0, time=0, ingredients="", diet="")
+    jobs.enqueue_enrichment(recipe)
+    garlic_chicken.failures = [500] * 10
+
+    jobs.Worker(name="worker-1").run(burst=True)
+
+    job = Job.objects.get()
+    assert job.status == Job.PENDING
+    assert job.last_error
+    recipe.refresh_from_db()
+    assert recipe.description == ""
+
+
+# ----------------------------------------------------------------------
+# Command Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_prewarm_fills_the_autofill_cache(garlic_chicken):
+    """
+    Tests that prewarm_autofill queues popular recipe names, run_workers answers them, and autofill then needs no
+    network call.
+    """
+    Recipe.objects.create(name="Garlic Chicken", description="d", cost=1, time=1, ingredients="i", diet="")
+
+    call_command("prewarm_autofill", "  Garlic   chicken ", popular=5)
+    assert list(Job.objects.values_list("key", flat=True)) == ["prewarm_autofill:garlic chicken"]
+    call_command("run_workers", processes=1, burst=True)
+
+    spoonacular.local_cache.clear()
+    calls = len(garlic_chicken.requests)
+    assert spoonacular.autofill("Garlic Chicken")["time"] == 25
+    assert len(garlic_chicken.requests) == calls
+
+    call_command("prewarm_autofill", "garlic chicken", popular=0)
+    assert Job.objects.get().status == Job.DONE
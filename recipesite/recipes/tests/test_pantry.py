@@ -0,0 +1,88 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from recipes.models import PantryItem, Recipe
+
+
+@pytest.fixture
+def user(db):
+    """
+    Creates the pantry owner.
+    """
+    return User.objects.create_user(username="cook", password="password")
+
+
+def make_recipe(name, ingredients, **kwargs):
+    """
+    Creates a recipe (public unless told otherwise); saving it parses its ingredients.
+    """
+    kwargs.setdefault("is_public", True)
+    recipe = Recipe.objects.create(name=name, description="desc", cost=5, time=10, ingredients=ingredients,
+                                   diet="None", **kwargs)
+    return recipe
+
+
+def test_sync_maintains_ingredient_count(user):
+    """
+    The precomputed ingredient count follows the parsed ingredient rows.
+    """
+    recipe = make_recipe("Omelette", "eggs, cheese, salt")
+    recipe.refresh_from_db()
+    assert recipe.ingredient_count == 3
+
+
+def test_recipes_ranked_by_pantry_coverage(user, django_assert_num_queries):
+    """
+    Recipes are ordered by the share of their ingredients in the pantry, in one
+    query; recipes sharing nothing with the pantry are left out.
+    """
+    omelette = make_recipe("Omelette", "eggs, cheese")
+    fried_rice = make_recipe("Fried Rice", "rice, eggs, onion, soy sauce")
+    make_recipe("Salad", "lettuce, tomato")
+    PantryItem.objects.replace_for(user, ["Eggs", "cheese", "rice"])
+
+    with django_assert_num_queries(1):
+        ranked = list(Recipe.objects.visible_to(user).ranked_by_pantry(user.pantry_items.values("ingredient")))
+
+    assert ranked == [omelette, fried_rice]
+    assert (ranked[0].matched, ranked[0].coverage) == (2, 1.0)
+    assert (ranked[1].matched, ranked[1].coverage) == (2, 0.5)
+
+
+def test_pantry_ranking_respects_visibility(user):
+    """
+    Other users' private recipes never show up in the matches.
+    """
+    other = User.objects.create_user(username="other", password="password")
+    make_recipe("Hidden Omelette", "eggs", user=other, is_public=False)
+    mine = make_recipe("My Omelette", "eggs", user=user, is_public=False)
+    PantryItem.objects.replace_for(user, ["eggs"])
+
+    ranked = Recipe.objects.visible_to(user).ranked_by_pantry(user.pantry_items.values("ingredient"))
+    assert list(ranked) == [mine]
+
+
+def test_pantry_view_requires_login(client, db):
+    """
+    Anonymous visitors are sent to the login page.
+    """
+    response = client.get(reverse("recipesns:pantry"))
+    assert response.status_code == 302
+    assert reverse("login") in response.url
+
+
+def test_pantry_view_saves_and_ranks(client, user):
+    """
+    Posting the pantry replaces its items; the page then lists the matches.
+    """
+    omelette = make_recipe("Omelette", "eggs, cheese")
+    client.force_login(user)
+    url = reverse("recipesns:pantry")
+
+    response = client.post(url, {"items": "2 eggs, Cheese, garlic"})
+    assert response.status_code == 302
+    assert sorted(user.pantry_items.values_list("ingredient__name", flat=True)) == ["cheese", "egg", "garlic"]
+
+    response = client.get(url)
+    assert list(response.context["matches"]) == [omelette]
+    assert response.context["form"].initial["items"] == "cheese, egg, garlic"
@@ -0,0 +1,172 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from recipes import facets, suggest
+from recipes.models import PantryItem, Recipe, RecipeIngredient
+from recipes.urls import urlpatterns
+
+# Query-count and payload-size budgets for every URL in recipes/urls.py. Each page is requested with enough recipes
+# (from several authors, with long texts) that an N+1 lookup or a template printing a whole TextField blows the
+# budget. Counts include the session and user lookups of logged-in requests.
+
+LONG_TEXT = "Slow-cooked and stirred often. " * 300
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def user(db):
+    """
+    Creates the logged-in test user.
+    """
+    return User.objects.create(username="testuser")
+
+
+@pytest.fixture
+def recipes(user):
+    """
+    Creates 30 public recipes spread over five authors plus five private ones of the test user, all with long
+    descriptions and ingredient lists.
+    """
+    authors = [User.objects.create(username=f"author{n}") for n in range(5)]
+    recipes = [
+        Recipe(
+            name=f"Rice Stew {n}",
+            description=LONG_TEXT,
+            ingredients="rice, garlic, onion, " + LONG_TEXT,
+            cost=n,
+            time=10 + n,
+            diet="Vegan",
+            user=authors[n % 5] if n < 30 else user,
+            is_public=n < 30,
+        )
+        for n in range(35)
+    ]
+    recipes = Recipe.objects.bulk_create(recipes)
+    RecipeIngredient.objects.sync(recipes)
+    facets.record_created(recipes)
+    return recipes
+
+
+@pytest.fixture(autouse=True)
+def internal_metrics(settings):
+    """
+    Lets the test client (127.0.0.1) read the metrics endpoint, and builds the suggestion index afresh.
+    """
+    settings.INTERNAL_IPS = ["127.0.0.1"]
+    suggest.index.reset()
+    yield
+    suggest.index.reset()
+
+
+@pytest.fixture
+def logged_in(client, user):
+    """
+    Logs the test user in and gives them a small pantry.
+    """
+    client.force_login(user)
+    PantryItem.objects.replace_for(user, ["rice", "garlic"])
+    return client
+
+
+# ----------------------------------------------------------------------
+# Budgets
+# ----------------------------------------------------------------------
+
+# (url name, args, GET params, queries anonymous, queries logged in, max response bytes)
+BUDGETS = [
+    ("recipe_list", [], {}, 1, 4, 12_000),
+    # The table page also reads the facet stats and the top authors' usernames
+    ("recipe_table", [], {}, 3, 6, 16_000),
+    # Page cursors hold only the boundary id, so long sort values stay out of the links
+    ("recipe_table", [], {"sort": "description", "dir": "desc"}, 3, 6, 16_000),
+    ("recipe_detail", ["first"], {}, 1, 3, 30_000),
+    ("recipe_search", [], {"q": "rice"}, 1, 3, 40_000),
+    ("recipe_export", [], {"format": "csv.gz"}, 1, 3, 10_000),
+    ("api_recipe_list", [], {}, 1, 4, 6_000),
+    ("api_recipe_list", [], {"fields": "name,cost"}, 1, 4, 2_000),
+    ("api_recipe_detail", ["first"], {}, 1, 3, 30_000),
+    ("api_recipe_search", [], {"q": "rice"}, 1, 3, 15_000),
+    ("api_recipe_stats", [], {}, 2, 4, 3_000),
+    ("recipe_create", [], {}, 0, 2, 10_000),
+    ("recipe_update", ["first"], {}, 1, 3, 30_000),
+    ("recipe_delete", ["first"], {}, 1, 3, 6_000),
+    ("signup", [], {}, 0, 2, 10_000),
+    ("autofill_recipe", [], {}, 0, 0, 100),
+    # Building the suggestion index reads the public names and ingredient rows once
+    ("suggest", [], {"q": "ri"}, 2, 2, 1_000),
+    # A few histograms per view and outbound API: grows with the routes, not with the traffic
+    ("metrics", [], {}, 0, 2, 200_000),
+]
+
+
+def resolve(name, args, recipes):
+    return reverse(f"recipesns:{name}", args=[recipes[0].pk if arg == "first" else arg for arg in args])
+
+
+def content_length(response):
+    return len(b"".join(response.streaming_content) if response.streaming else response.content)
+
+
+@pytest.mark.parametrize("name, args, params, anonymous, _, max_bytes", BUDGETS)
+def test_anonymous_budget(client, recipes, django_assert_num_queries, name, args, params, anonymous, _, max_bytes):
+    """
+    Tests that each page stays within its query and payload budget for anonymous visitors.
+    """
+    url = resolve(name, args, recipes)
+
+    with django_assert_num_queries(anonymous):
+        response = client.get(url, params)
+        size = content_length(response)
+
+    assert response.status_code == 200
+    assert size <= max_bytes
+
+
+@pytest.mark.parametrize("name, args, params, _, logged_in_queries, max_bytes", BUDGETS)
+def test_logged_in_budget(logged_in, recipes, django_assert_num_queries, name, args, params, _, logged_in_queries,
+                          max_bytes):
+    """
+    Tests that each page stays within its query and payload budget for a logged-in user with private recipes.
+    """
+    url = resolve(name, args, recipes)
+
+    with django_assert_num_queries(logged_in_queries):
+        response = logged_in.get(url, params)
+        size = content_length(response)
+
+    assert response.status_code == 200
+    assert size <= max_bytes
+
+
+def test_pantry_budget(logged_in, recipes, django_assert_num_queries):
+    """
+    Tests that the pantry page ranks its matches in a single query.
+    """
+    # session, user, initial pantry names, ranked matches
+    with django_assert_num_queries(4):
+        response = logged_in.get(reverse("recipesns:pantry"))
+
+    assert response.status_code == 200
+    assert len(response.content) <= 12_000
+
+
+def test_list_shows_every_author_without_extra_queries(client, recipes):
+    """
+    Tests that the list still renders each recipe's author after loading them with select_related.
+    """
+    response = client.get(reverse("recipesns:recipe_list"))
+
+    for n in range(5):
+        assert f"User is author{n}".encode() in response.content
+
+
+def test_every_url_has_a_budget():
+    """
+    Tests that no route in recipes/urls.py goes without a budget (the pantry's is test_pantry_budget).
+    """
+    budgeted = {name for name, *_ in BUDGETS} | {"pantry"}
+
+    assert {pattern.name for pattern in urlpatterns} - budgeted == set()
@@ -0,0 +1,175 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from recipes.models import Recipe, visibility_partitions
+from recipes.pagination import CursorPaginator
+from recipes.table import table_queryset
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason="Query plan assertions are written against SQLite's EXPLAIN QUERY PLAN"
+)
+
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a user owning one private and one public recipe.
+    """
+    user = User.objects.create_user(username="planner", password="password")
+    for is_public in (True, False):
+        Recipe.objects.create(name="Soup", description="Hot soup", cost=4, time=25, ingredients="Water, Salt",
+                              diet="Vegan, Gluten-Free", user=user, is_public=is_public)
+    return user
+
+
+def page_plans(user, sort, cursor_from_first_row=True):
+    """
+    Returns the EXPLAIN output of every partition query the paginator runs for a
+    page of the given ordering, optionally continuing after an existing row.
+    """
+    queryset = Recipe.objects.visible_to(user).order_by(sort, f"{'-' if sort.startswith('-') else ''}id")
+    paginator = CursorPaginator(queryset, 6, partitions=visibility_partitions(user))
+    values = None
+    if cursor_from_first_row:
+        values, _ = paginator.decode_cursor(paginator.encode_cursor(queryset.first()))
+    return [qs[:7].explain() for qs in paginator.page_querysets(values)]
+
+
+@pytest.mark.parametrize("sort", [
+    "created_at", "-created_at", "name", "-name", "cost", "-cost", "time", "-time", "is_public", "-is_public",
+])
+@pytest.mark.parametrize("authenticated", [True, False])
+def test_recipe_pages_never_scan_the_table(user, sort, authenticated):
+    """
+    Every partition of a list/table page must be answered by an index seek; a
+    plain "SCAN recipes_recipe" would mean reading the whole table.
+    """
+    viewer = user if authenticated else None
+    plans = page_plans(viewer, sort)
+
+    assert len(plans) == (2 if authenticated else 1)
+    for plan in plans:
+        assert "SEARCH recipes_recipe USING INDEX" in plan
+        assert "SCAN recipes_recipe" not in plan
+
+
+@pytest.mark.parametrize("sort", ["-created_at", "cost", "-name"])
+def test_public_partition_needs_no_sort_step(user, sort):
+    """
+    The public partition reads rows in index order, so SQLite can stop after the
+    page size instead of sorting every public recipe.
+    """
+    public_plan = page_plans(user, sort)[0]
+    assert "USE TEMP B-TREE" not in public_plan
+
+
+# ----------------------------------------------------------------------
+# Table Filter Plans
+# ----------------------------------------------------------------------
+
+TABLE_FILTERS = [
+    {"cost_min": "2", "cost_max": "9"},
+    {"time_min": "20"},
+    {"diet": "vegan"},
+    {"diet": ["vegan", "gluten-free"]},
+    {"owner": "planner"},
+    {"mine": "1"},
+    {"cost_max": "9", "time_max": "30", "diet": "vegan", "owner": "planner"},
+]
+
+
+def table_plans(user, params, after_first_row=True):
+    """
+    Returns the EXPLAIN output of every partition query of a page of a filtered
+    table: the second page, or the first with after_first_row=False.
+    """
+    queryset = table_queryset(user, params)
+    paginator = CursorPaginator(queryset, 20, partitions=visibility_partitions(user))
+    values = None
+    if after_first_row:
+        values, _ = paginator.decode_cursor(paginator.encode_cursor(queryset.first()))
+    return [qs[:21].explain() for qs in paginator.page_querysets(values)]
+
+
+def add_public_recipes(count, diet):
+    """
+    Adds public recipes of one diet, shifting the facet counts the diet filter plans with.
+    """
+    for n in range(count):
+        Recipe.objects.create(name=f"Dish {n}", description="d", cost=n, time=n, ingredients="Rice", diet=diet,
+                              is_public=True)
+
+
+@pytest.mark.parametrize("filters", TABLE_FILTERS)
+@pytest.mark.parametrize("sort", ["name", "cost", "time", "is_public"])
+def test_table_filters_never_scan_the_table(user, filters, sort):
+    """
+    Every filter and sort combination, on the first page as on later ones,
+    reads each partition from an index (the sort index, a range, a (user, sort
+    column) index or the diet tag lookup), never from a full scan of
+    recipes_recipe. Walking a whole index is only allowed in sort order, where
+    SQLite stops after the page instead of sorting every row.
+    """
+    for direction in ("asc", "desc"):
+        for after_first_row in (False, True):
+            for plan in table_plans(user, {**filters, "sort": sort, "dir": direction}, after_first_row):
+                assert "recipes_recipe USING" in plan
+                assert "SCAN recipes_recipe " not in plan.replace("SCAN recipes_recipe USING INDEX", "")
+                if "SCAN recipes_recipe USING INDEX" in plan:
+                    assert "USE TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("filters", [{"owner": "planner"}, {"mine": "1"}, {"owner": "planner", "diet": "vegan"}])
+@pytest.mark.parametrize("sort", ["name", "cost", "time", "is_public"])
+@pytest.mark.parametrize("after_first_row", [False, True])
+def test_author_filters_need_no_sort_step(user, filters, sort, after_first_row):
+    """
+    Owner and "mine only" seek the (user, sort column) index of each partition,
+    so one author's recipes come back in order without sorting them all.
+    """
+    add_public_recipes(30, "Vegan")
+
+    for direction in ("asc", "desc"):
+        for plan in table_plans(user, {**filters, "sort": sort, "dir": direction}, after_first_row):
+            assert "USE TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("field", ["cost", "time"])
+def test_range_on_sort_column_needs_no_sort_step(user, field):
+    """
+    A range on the sorted column seeks straight into the public index in order.
+    """
+    public_plan = table_plans(user, {f"{field}_min": "1", f"{field}_max": "50", "sort": field})[0]
+
+    assert f"USING INDEX recipe_public_{field}_idx" in public_plan
+    assert "USE TEMP B-TREE" not in public_plan
+
+
+@pytest.mark.parametrize("sort", ["cost", "name"])
+@pytest.mark.parametrize("after_first_row", [False, True])
+def test_common_diet_walks_the_sort_index(user, sort, after_first_row):
+    """
+    When most recipes match, the diet bitmask is tested on each row while
+    walking the sort index, so the public partition stays in index order.
+    """
+    add_public_recipes(30, "Vegan, Gluten-Free")
+
+    params = {"diet": ["vegan", "gluten-free"], "sort": sort}
+    public_plan = table_plans(user, params, after_first_row)[0]
+
+    assert f"USING INDEX recipe_public_{sort}_idx" in public_plan
+    assert "USE TEMP B-TREE" not in public_plan
+
+
+@pytest.mark.parametrize("sort", ["cost", "name"])
+@pytest.mark.parametrize("after_first_row", [False, True])
+def test_rare_diet_is_looked_up_by_tag(user, sort, after_first_row):
+    """
+    When few recipes match, walking the sort index would read most of it, so
+    the matches are found through the diet tag rows and only they are sorted.
+    """
+    add_public_recipes(30, "Keto")
+
+    for plan in table_plans(user, {"diet": "vegan", "sort": sort}, after_first_row):
+        assert "SEARCH U0 USING INDEX recipes_recipe_diet_tags_diettag_id" in plan
+        assert "SCAN recipes_recipe " not in plan
@@ -0,0 +1,204 @@
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connections
+from django.urls import reverse
+from recipes.caching import get_cache
+from recipes.models import Recipe
+from recipes.replicas import PIN_COOKIE
+from recipes.search import FTS_TABLE
+
+pytestmark = pytest.mark.django_db(databases=["default", "replica"])
+
+
+def copy_database(source, target):
+    """
+    Replaces the contents of the target SQLite connection with the primary's tables, rows, indexes and triggers.
+    Both connections are inside the test's transaction, which is rolled back afterwards. The FTS5 index is rebuilt
+    from the copied recipes instead of copying its shadow tables.
+    """
+    for (name,) in target.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name = ? DESC",
+        [FTS_TABLE],
+    ).fetchall():
+        # Dropping the FTS5 table (first) drops its shadow tables too
+        target.execute(f'DROP TABLE IF EXISTS "{name}"')
+
+    objects = source.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    # Every table exists before any rows arrive, as rows may reference a table created later
+    tables = [(name, sql) for kind, name, sql in objects if kind == "table" and not name.startswith(FTS_TABLE)]
+    for name, sql in tables:
+        target.execute(sql)
+    for name, sql in tables:
+        rows = source.execute(f'SELECT * FROM "{name}"').fetchall()
+        if rows:
+            target.executemany(f'INSERT INTO "{name}" VALUES ({", ".join("?" * len(rows[0]))})', rows)
+    [fts_sql] = [sql for kind, name, sql in objects if kind == "table" and name == FTS_TABLE]
+    target.execute(fts_sql)
+    target.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    for kind, name, sql in objects:
+        if kind in ("index", "trigger"):
+            target.execute(sql)
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture(scope="module", autouse=True)
+def replica_alias(tmp_path_factory):
+    """
+    Registers a 'replica' database alias backed by a second SQLite file, before the tests declare it in databases=.
+    """
+    path = tmp_path_factory.mktemp("replica") / "replica.sqlite3"
+    connections.settings["replica"] = connections.configure_settings({
+        "default": connections.settings["default"],
+        "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": str(path)},
+    })["replica"]
+    yield
+    connections["replica"].close()
+    del connections["replica"]
+    del connections.settings["replica"]
+
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user for assigning to recipes and logging in.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+@pytest.fixture
+def make_replica(db, settings):
+    """
+    Returns a function that snapshots the primary into the replica file and routes safe requests to it. Nothing
+    written to the primary afterwards reaches the replica, like a replica that lags behind.
+    """
+    def snapshot():
+        for alias in ("default", "replica"):
+            connections[alias].ensure_connection()
+        copy_database(connections["default"].connection, connections["replica"].connection)
+        settings.RECIPES_READ_REPLICAS = ["replica"]
+
+    return snapshot
+
+
+def create_recipe(user, name, **fields):
+    """
+    Creates a public recipe of the user on the primary.
+    """
+    return Recipe.objects.create(
+        name=name, description="Tasty", cost=5, time=20, ingredients="rice", diet="", user=user, is_public=True,
+        **fields,
+    )
+
+
+# ----------------------------------------------------------------------
+# Routing Tests
+# ----------------------------------------------------------------------
+
+def test_safe_requests_read_from_replica(client, user, make_replica):
+    """
+    Tests that list, table, detail and API reads are answered by the replica, which hasn't seen the newer recipe.
+    """
+    old = create_recipe(user, "Old Soup")
+    make_replica()
+    new = create_recipe(user, "New Stew")
+
+    assert b"Old Soup" in client.get(reverse("recipesns:recipe_list")).content
+    assert b"New Stew" not in client.get(reverse("recipesns:recipe_list")).content
+    assert b"New Stew" not in client.get(reverse("recipesns:recipe_table")).content
+    assert client.get(reverse("recipesns:recipe_detail", args=[old.pk])).status_code == 200
+    assert client.get(reverse("recipesns:recipe_detail", args=[new.pk])).status_code == 404
+    assert client.get(reverse("recipesns:api_recipe_detail", args=[new.pk])).status_code == 404
+
+
+def test_without_replicas_reads_use_primary(client, user, settings):
+    """
+    Tests that with no replicas configured every read goes to the primary and no pin cookie is set.
+    """
+    settings.RECIPES_READ_REPLICAS = []
+    create_recipe(user, "New Stew")
+    client.force_login(user)
+
+    response = client.post(reverse("recipesns:recipe_create"), {
+        "name": "Fresh Salad", "description": "Crisp", "cost": 3, "time": 10, "ingredients": "lettuce",
+        "diet": "", "is_public": True,
+    })
+
+    assert PIN_COOKIE not in response.cookies
+    assert b"New Stew" in client.get(reverse("recipesns:recipe_list")).content
+
+
+# ----------------------------------------------------------------------
+# Read-your-writes Tests
+# ----------------------------------------------------------------------
+
+def test_own_write_is_visible_after_redirect(client, user, make_replica):
+    """
+    Tests that a recipe created through the form is on the list the user is redirected to, although the replica
+    lags behind, and that other clients keep reading the replica.
+    """
+    client.force_login(user)
+    make_replica()
+
+    response = client.post(reverse("recipesns:recipe_create"), {
+        "name": "Fresh Salad", "description": "Crisp", "cost": 3, "time": 10, "ingredients": "lettuce",
+        "diet": "", "is_public": True,
+    }, follow=True)
+
+    assert PIN_COOKIE in response.client.cookies
+    assert b"Fresh Salad" in response.content
+    get_cache().clear()
+    assert b"Fresh Salad" not in client.__class__().get(reverse("recipesns:recipe_list")).content
+
+
+def test_pin_expires(client, user, make_replica, settings):
+    """
+    Tests that once the pin window is over the client reads from the replica again.
+    """
+    client.force_login(user)
+    make_replica()
+    settings.RECIPES_REPLICA_PIN_SECONDS = 0
+
+    client.post(reverse("recipesns:recipe_create"), {
+        "name": "Fresh Salad", "description": "Crisp", "cost": 3, "time": 10, "ingredients": "lettuce",
+        "diet": "", "is_public": True,
+    })
+
+    assert b"Fresh Salad" not in client.get(reverse("recipesns:recipe_list")).content
+
+
+def test_pages_read_from_lagging_replica_are_not_cached(client, user, make_replica):
+    """
+    Tests that a page read from the replica right after a change is neither cached nor sent with validators, so
+    neither the server nor the browser keeps the stale copy once the replica catches up.
+    """
+    make_replica()
+    create_recipe(user, "New Stew")
+
+    response = client.get(reverse("recipesns:recipe_list"))
+    make_replica()
+
+    assert "ETag" not in response.headers
+    assert "Last-Modified" not in response.headers
+    assert "no-store" in response.headers["Cache-Control"]
+    assert b"New Stew" in client.get(reverse("recipesns:recipe_list")).content
+
+
+def test_pages_read_after_lag_window_are_cached(client, user, make_replica, settings):
+    """
+    Tests that once the lag window after the last change is over, replica pages get validators and are cached again.
+    """
+    # No lag window at all (the -1 offsets the second added for Last-Modified rounding)
+    settings.RECIPES_REPLICA_PIN_SECONDS = -1
+    create_recipe(user, "New Stew")
+    make_replica()
+
+    first = client.get(reverse("recipesns:recipe_list"))
+    second = client.get(reverse("recipesns:recipe_list"), HTTP_IF_NONE_MATCH=first.headers["ETag"])
+
+    assert second.status_code == 304
@@ -0,0 +1,123 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+from recipes.models import Recipe
+from recipes.search import FTS_TABLE, ensure_fts_index, search_recipes
+
+sqlite_only = pytest.mark.skipif(connection.vendor != 'sqlite', reason="Checks the SQLite FTS5 index")
+
+
+@pytest.fixture
+def user(db):
+    """
+    Creates the searching user.
+    """
+    return User.objects.create_user(username="searcher", password="password")
+
+
+def make_recipe(name, description="A dish.", ingredients="Water", diet="None", **kwargs):
+    """
+    Creates a public recipe with only the fields a test cares about filled in.
+    """
+    kwargs.setdefault("is_public", True)
+    return Recipe.objects.create(name=name, description=description, cost=5, time=10,
+                                 ingredients=ingredients, diet=diet, **kwargs)
+
+
+def test_search_ranks_name_hits_first(user):
+    """
+    A term in the recipe name outranks the same term buried in a description.
+    """
+    in_description = make_recipe("Weeknight Stew", description="Better than any curry you have had.")
+    in_name = make_recipe("Green Curry")
+
+    assert list(search_recipes("curry", user)) == [in_name, in_description]
+
+
+def test_search_matches_ingredients_diet_and_prefixes(user):
+    """
+    Every search term must match somewhere; partial words match as prefixes.
+    """
+    tacos = make_recipe("Tacos", ingredients="Tortilla, Beans, Avocado", diet="Vegan")
+    make_recipe("Bean Soup", ingredients="Beans, Stock", diet="Vegetarian")
+
+    assert list(search_recipes("avoc vegan", user)) == [tacos]
+    assert len(search_recipes("bean", user)) == 2
+
+
+def test_search_respects_visibility(user):
+    """
+    Private recipes only show up for their owner.
+    """
+    other = User.objects.create_user(username="other", password="password")
+    mine = make_recipe("Secret Pesto", user=user, is_public=False)
+    make_recipe("Other Pesto", user=other, is_public=False)
+
+    assert list(search_recipes("pesto", user)) == [mine]
+    assert list(search_recipes("pesto", None)) == []
+
+
+def test_index_follows_updates_and_deletes(user):
+    """
+    The triggers keep the index in sync with edits and deletions.
+    """
+    recipe = make_recipe("Lemon Tart")
+    recipe.name = "Lime Tart"
+    recipe.save()
+
+    assert list(search_recipes("lime", user)) == [recipe]
+    assert list(search_recipes("lemon", user)) == []
+
+    recipe.delete()
+    assert list(search_recipes("tart", user)) == []
+
+
+def test_search_input_cannot_inject_query_syntax(user):
+    """
+    FTS operators and quotes in user input are treated as plain words.
+    """
+    make_recipe("Chicken Soup")
+    assert list(search_recipes('chicken" OR NEAR(* ', user)) == []
+    assert list(search_recipes("", user)) == []
+
+
+@sqlite_only
+def test_search_is_driven_by_the_fts_index(user):
+    """
+    The query plan starts from the FTS5 index instead of scanning recipes.
+    """
+    make_recipe("Chicken Soup")
+    plan = search_recipes("chicken", user).explain()
+
+    assert f"SCAN {FTS_TABLE} VIRTUAL TABLE INDEX" in plan
+    assert "SEARCH recipes_recipe USING INTEGER PRIMARY KEY" in plan
+    assert "SCAN recipes_recipe\n" not in plan + "\n"
+
+
+@sqlite_only
+def test_lost_triggers_are_restored_and_reindexed(user):
+    """
+    If a table rebuild dropped the triggers, ensure_fts_index recreates them and
+    re-indexes the rows written in the meantime.
+    """
+    with connection.cursor() as cursor:
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_{suffix}")
+    recipe = make_recipe("Miso Ramen")
+    assert list(search_recipes("ramen", user)) == []
+
+    ensure_fts_index(connection)
+    assert list(search_recipes("ramen", user)) == [recipe]
+
+
+def test_search_view(client, user):
+    """
+    The search page lists matching recipes and keeps the query in the form.
+    """
+    recipe = make_recipe("Banana Bread")
+    response = client.get(reverse("recipesns:recipe_search"), {"q": "banana"})
+
+    assert response.status_code == 200
+    assert list(response.context["recipes"]) == [recipe]
+    assert response.context["query"] == "banana"
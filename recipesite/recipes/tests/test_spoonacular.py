@@ -0,0 +1,249 @@
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from recipes import spoonacular
+from recipes.models import SpoonacularCacheEntry
+
+SEARCH = '/recipes/complexSearch'
+BULK = '/recipes/informationBulk'
+
+
+def information_payload(recipe_id, ingredients=("2 cloves garlic", "1 lb chicken")):
+    """
+    Builds a Spoonacular /information payload with the fields autofill reads.
+    """
+    return {
+        "id": recipe_id,
+        "title": f"Recipe {recipe_id}",
+        "summary": "<b>Garlicky</b> &amp; quick",
+        "extendedIngredients": [{"original": text, "name": text.split()[-1]} for text in ingredients],
+        "readyInMinutes": 25,
+        "pricePerServing": 349.0,
+        "instructions": "A long text autofill never uses.",
+    }
+
+
+@pytest.fixture
+def garlic_chicken(spoonacular_stub):
+    """
+    Registers a "garlic chicken" search whose first hit has no ingredients, so
+    autofill must fall through to the second candidate.
+    """
+    spoonacular_stub.searches["garlic chicken"] = [1, 2]
+    spoonacular_stub.recipes[1] = information_payload(1, ingredients=())
+    spoonacular_stub.recipes[2] = information_payload(2)
+    return spoonacular_stub
+
+
+@pytest.mark.django_db
+def test_autofill_view_returns_first_candidate_with_ingredients(client, garlic_chicken):
+    """
+    The view answers with the cleaned-up data of the first ranked result that
+    actually lists ingredients.
+    """
+    response = client.get(reverse("recipesns:autofill_recipe"), {"name": "Garlic Chicken"})
+
+    assert response.json() == {
+        "success": True,
+        "description": "Garlicky & quick",
+        "ingredients": "2 cloves garlic, 1 lb chicken",
+        "time": 25,
+        "cost": 3,
+    }
+    search_params = garlic_chicken.requests[0][1]
+    assert search_params["titleMatch"] == "chicken"
+
+
+@pytest.mark.django_db
+def test_repeated_lookups_are_served_from_the_local_cache(garlic_chicken, django_assert_num_queries):
+    """
+    A second identical lookup - even with different case and spacing - costs
+    neither an upstream call nor a database query.
+    """
+    first = spoonacular.autofill("garlic chicken")
+    upstream_calls = len(garlic_chicken.requests)
+
+    with django_assert_num_queries(0):
+        assert spoonacular.autofill("  GARLIC   chicken ") == first
+    assert len(garlic_chicken.requests) == upstream_calls
+
+
+@pytest.mark.django_db
+def test_shared_cache_survives_a_cold_process(garlic_chicken):
+    """
+    With the in-process LRU emptied (e.g. a fresh worker), the database level
+    still answers without going upstream.
+    """
+    first = spoonacular.autofill("garlic chicken")
+    upstream_calls = len(garlic_chicken.requests)
+    spoonacular.local_cache.clear()
+
+    assert spoonacular.autofill("garlic chicken") == first
+    assert len(garlic_chicken.requests) == upstream_calls
+    assert SpoonacularCacheEntry.objects.filter(key="information:2").exists()
+
+
+@pytest.mark.django_db
+def test_misses_are_negatively_cached(spoonacular_stub, settings):
+    """
+    A search with no results is cached with the shorter negative TTL and not
+    repeated upstream.
+    """
+    assert spoonacular.autofill("unheard of dish") is None
+    assert spoonacular.autofill("Unheard of dish") is None
+
+    assert spoonacular_stub.count(SEARCH) == 1
+    entry = SpoonacularCacheEntry.objects.get(key__startswith="search:unheard of dish")
+    assert entry.payload is None
+    assert entry.expires_at <= timezone.now() + timedelta(seconds=settings.SPOONACULAR_NEGATIVE_TTL)
+
+
+@pytest.mark.django_db
+def test_unknown_recipe_id_is_negatively_cached(spoonacular_stub):
+    """
+    A 404 from /information is remembered as a miss instead of raising.
+    """
+    assert spoonacular.information(999) is None
+    spoonacular.local_cache.clear()
+    assert spoonacular.information(999) is None
+    assert spoonacular_stub.count(BULK) == 1
+
+
+@pytest.mark.django_db
+def test_expired_entries_are_refetched(garlic_chicken):
+    """
+    Once an entry's TTL has passed, the next lookup goes upstream again.
+    """
+    spoonacular.autofill("garlic chicken")
+    SpoonacularCacheEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+    spoonacular.local_cache.clear()
+
+    spoonacular.autofill("garlic chicken")
+    assert garlic_chicken.count(SEARCH) == 2
+
+
+@pytest.mark.django_db
+def test_expired_entries_are_purged(garlic_chicken, monkeypatch):
+    """
+    Storing an entry deletes expired rows, at most once per purge interval.
+    """
+    monkeypatch.setattr(spoonacular, "_next_purge", 0.0)
+    past = timezone.now() - timedelta(seconds=1)
+    SpoonacularCacheEntry.objects.create(key="search:old|", payload=None, expires_at=past)
+
+    spoonacular.autofill("garlic chicken")
+    assert not SpoonacularCacheEntry.objects.filter(key="search:old|").exists()
+
+    SpoonacularCacheEntry.objects.create(key="search:older|", payload=None, expires_at=past)
+    spoonacular.cache_set("search:new|", spoonacular.MISS, 60)
+    assert SpoonacularCacheEntry.objects.filter(key="search:older|").exists()
+
+
+@pytest.mark.django_db
+def test_async_store_purges_expired_entries(monkeypatch):
+    """
+    The async cache write purges expired rows too.
+    """
+    monkeypatch.setattr(spoonacular, "_next_purge", 0.0)
+    SpoonacularCacheEntry.objects.create(
+        key="search:old|", payload=None, expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+    async_to_sync(spoonacular.acache_set)("search:new|", spoonacular.MISS, 60)
+
+    assert list(SpoonacularCacheEntry.objects.values_list("key", flat=True)) == ["search:new|"]
+
+
+@pytest.mark.django_db
+def test_cached_information_is_trimmed(garlic_chicken):
+    """
+    Only the fields autofill needs are stored in the shared cache.
+    """
+    spoonacular.autofill("garlic chicken")
+    payload = SpoonacularCacheEntry.objects.get(key="information:2").payload
+    assert "instructions" not in payload
+    assert payload["extendedIngredients"][0]["original"] == "2 cloves garlic"
+
+
+def test_local_cache_evicts_least_recently_used():
+    """
+    The in-process level is bounded and drops the least recently used key.
+    """
+    cache = spoonacular.LocalTTLCache(maxsize=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+@pytest.mark.django_db
+def test_network_errors_are_not_cached(settings):
+    """
+    An unreachable upstream makes autofill fail softly without caching anything.
+    """
+    settings.SPOONACULAR_BASE_URL = "http://127.0.0.1:9"
+    spoonacular.local_cache.clear()
+
+    assert spoonacular.autofill("garlic chicken") is None
+    assert not SpoonacularCacheEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_candidates_are_fetched_in_one_bulk_request(garlic_chicken):
+    """
+    All ranked candidates are fetched with a single informationBulk round trip
+    instead of one /information call each.
+    """
+    spoonacular.autofill("garlic chicken")
+
+    assert garlic_chicken.count(BULK) == 1
+    assert garlic_chicken.requests[-1][1]["ids"] == "1,2"
+
+
+@pytest.mark.django_db
+def test_cached_top_candidate_skips_the_other_candidates(garlic_chicken):
+    """
+    When the first ranked candidate is already cached with ingredients, the
+    remaining candidates are never requested.
+    """
+    garlic_chicken.searches["garlic chicken"] = [2, 3]
+    spoonacular.information(2)
+    bulk_calls = garlic_chicken.count(BULK)
+
+    assert spoonacular.autofill("garlic chicken")["time"] == 25
+    assert garlic_chicken.count(BULK) == bulk_calls
+
+
+@pytest.mark.django_db
+def test_slow_upstream_times_out(garlic_chicken, settings):
+    """
+    Every call carries a timeout, so a hanging upstream fails the lookup instead
+    of holding the worker.
+    """
+    settings.SPOONACULAR_TIMEOUT = (0.5, 0.2)
+    garlic_chicken.delay = 1
+
+    assert spoonacular.autofill("garlic chicken") is None
+
+
+@pytest.mark.django_db
+def test_autofill_stays_within_its_time_budget(garlic_chicken, settings):
+    """
+    Retries and sequential calls of one autofill share SPOONACULAR_AUTOFILL_BUDGET,
+    so a slow upstream fails the lookup once the budget is spent.
+    """
+    settings.SPOONACULAR_TIMEOUT = (2, 2)
+    settings.SPOONACULAR_AUTOFILL_BUDGET = 0.3
+    garlic_chicken.delay = 1
+
+    start = time.monotonic()
+    assert spoonacular.autofill("garlic chicken") is None
+    assert time.monotonic() - start < 0.9
@@ -0,0 +1,235 @@
+import random
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from recipes import suggest
+from recipes.caching import bump_versions
+from recipes.models import Recipe
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """
+    Starts every test with an index that is built from this test's recipes.
+    """
+    suggest.index.reset()
+    yield
+    suggest.index.reset()
+
+
+@pytest.fixture
+def user(db):
+    """
+    Creates a test user for assigning to recipes.
+    """
+    return User.objects.create_user(username="testuser", password="password")
+
+
+def create_recipe(user, name, ingredients="rice", is_public=True):
+    """
+    Creates a recipe; saving it parses its ingredient rows.
+    """
+    recipe = Recipe.objects.create(
+        name=name, description="Tasty", cost=5, time=20, ingredients=ingredients, diet="", user=user,
+        is_public=is_public,
+    )
+    return recipe
+
+
+def texts(client, query, **params):
+    """
+    Returns the suggested texts for a query.
+    """
+    response = client.get(reverse("recipesns:suggest"), {"q": query, **params})
+    assert response.status_code == 200
+    return [suggestion["text"] for suggestion in response.json()["suggestions"]]
+
+
+# ----------------------------------------------------------------------
+# Suggestion Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_suggests_names_and_ingredients_by_prefix(client, user):
+    """
+    Tests that recipe names and ingredients matching the typed prefix, at the start or at a word, are suggested,
+    with those starting with it first.
+    """
+    create_recipe(user, "Garlic Chicken", ingredients="2 cloves garlic, 1 lb chicken")
+    create_recipe(user, "Chickpea Curry", ingredients="chickpeas, rice")
+
+    response = client.get(reverse("recipesns:suggest"), {"q": "  CHICK"})
+
+    assert response.json()["suggestions"] == [
+        {"text": "chicken", "kind": "ingredient"},
+        {"text": "chickpea", "kind": "ingredient"},
+        {"text": "Chickpea Curry", "kind": "recipe"},
+        {"text": "Garlic Chicken", "kind": "recipe"},
+    ]
+    assert texts(client, "curr") == ["Chickpea Curry"]
+
+
+@pytest.mark.django_db
+def test_more_common_terms_come_first(client, user):
+    """
+    Tests that among equal matches the term used by more recipes wins, and that the limit is applied.
+    """
+    create_recipe(user, "Rice Bowl", ingredients="rice")
+    create_recipe(user, "Fried Rice", ingredients="rice")
+    create_recipe(user, "Rice Pudding", ingredients="rice, milk")
+
+    assert texts(client, "ri", limit=2) == ["rice", "Rice Bowl"]
+    assert texts(client, "ri", limit=100) == ["rice", "Rice Bowl", "Rice Pudding", "Fried Rice"]
+
+
+@pytest.mark.django_db
+def test_private_recipes_and_short_queries_suggest_nothing(client, user):
+    """
+    Tests that private recipe names never leak, and that single characters are not looked up.
+    """
+    create_recipe(user, "Secret Sauce", ingredients="saffron", is_public=False)
+
+    assert texts(client, "sec") == []
+    assert texts(client, "saf") == []
+    create_recipe(user, "Salad", ingredients="lettuce")
+    assert texts(client, "s") == []
+
+
+@pytest.mark.django_db
+def test_index_follows_saves_and_deletes(client, user):
+    """
+    Tests that creating, renaming, hiding and deleting recipes update the built index without a rebuild.
+    """
+    soup = create_recipe(user, "Tomato Soup", ingredients="tomato")
+    assert texts(client, "tom") == ["tomato", "Tomato Soup"]
+
+    create_recipe(user, "Tomato Salad", ingredients="tomato")
+    soup.name = "Onion Soup"
+    soup.ingredients = "onion"
+    soup.save()
+    assert texts(client, "tom") == ["tomato", "Tomato Salad"]
+    assert texts(client, "oni") == ["onion", "Onion Soup"]
+
+    soup.is_public = False
+    soup.save()
+    assert texts(client, "oni") == []
+
+    Recipe.objects.filter(name="Tomato Salad").delete()
+    assert texts(client, "tom") == []
+
+
+@pytest.mark.django_db
+def test_changes_from_other_processes_trigger_rebuild(client, user, settings):
+    """
+    Tests that a recipe added behind the index's back shows up once the public version moved on and the refresh
+    interval passed.
+    """
+    settings.RECIPES_SUGGEST_REFRESH = 0
+    assert texts(client, "ba") == []
+    Recipe.objects.bulk_create([
+        Recipe(name="Banana Bread", description="d", cost=1, time=1, ingredients="banana", diet="", is_public=True),
+    ])
+    assert texts(client, "ba") == []
+
+    bump_versions(["public"])
+    assert texts(client, "ba") == ["Banana Bread"]
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """
+    Counts full rebuilds of the index.
+    """
+    calls = []
+    rebuild = suggest.index.rebuild
+    monkeypatch.setattr(suggest.index, "rebuild", lambda: calls.append(1) or rebuild())
+    return calls
+
+
+@pytest.mark.django_db
+def test_own_changes_need_no_catching_up(client, user, settings, rebuilds):
+    """
+    Tests that a process applying its own save adopts the version the save produced, so it neither reloads nor
+    replays anything for it.
+    """
+    settings.RECIPES_SUGGEST_REFRESH = 0
+    assert texts(client, "ol") == []
+    create_recipe(user, "Olive Bread", ingredients="flour")
+
+    assert texts(client, "ol") == ["Olive Bread"]
+    assert len(rebuilds) == 1
+    assert suggest.index.position == suggest.log_position()
+
+
+@pytest.mark.django_db
+def test_changes_from_other_processes_are_replayed(client, user, settings, rebuilds, monkeypatch):
+    """
+    Tests that saves and deletes made by another process reach the index through the change log, without a
+    rebuild, and that a bulk write does rebuild it.
+    """
+    settings.RECIPES_SUGGEST_REFRESH = 0
+    soup = create_recipe(user, "Pumpkin Soup", ingredients="pumpkin")
+    assert texts(client, "pu") == ["pumpkin", "Pumpkin Soup"]
+
+    # Another process: its own index has not been built, so the writes only reach the log
+    with monkeypatch.context() as other:
+        other.setattr(suggest, "index", suggest.SuggestionIndex())
+        create_recipe(user, "Pumpkin Pie", ingredients="pumpkin, sugar")
+        soup.delete()
+    assert texts(client, "pu") == ["pumpkin", "Pumpkin Pie"]
+    assert len(rebuilds) == 1
+
+    Recipe.objects.bulk_create([
+        Recipe(name="Pulled Pork", description="d", cost=1, time=1, ingredients="pork", diet="", is_public=True),
+    ])
+    suggest.record_bulk_change()
+    bump_versions(["public"])
+    assert texts(client, "pu") == ["Pulled Pork", "pumpkin", "Pumpkin Pie"]
+    assert len(rebuilds) == 2
+
+
+@pytest.mark.django_db
+def test_ranked_prefixes_follow_changes(user, settings, monkeypatch):
+    """
+    Tests that prefixes answered from their kept ranking give the same answers as ranking every match, through
+    random creates, renames and deletes.
+    """
+    settings.RECIPES_SUGGEST_LIMIT = 2
+    monkeypatch.setattr(suggest, "HOT_KEYS", 3)
+    rng = random.Random(7)
+    words = ["chili", "chips", "chard", "cheese", "chicken", "cherry", "chowder", "chai"]
+
+    def random_recipe():
+        return " ".join(rng.sample(words, 2)), ", ".join(rng.sample(words, 2))
+
+    recipes = [create_recipe(user, *random_recipe()) for _ in range(10)]
+    suggest.index.rebuild()
+    assert "ch" in suggest.index.top
+
+    for _ in range(40):
+        recipe = rng.choice(recipes)
+        if rng.random() < 0.3:
+            recipe.delete()
+            recipes.remove(recipe)
+            recipes.append(create_recipe(user, *random_recipe()))
+        else:
+            recipe.name, recipe.ingredients = random_recipe()
+            recipe.save()
+        for prefix in ("ch", "chi", "che", "cha"):
+            for limit in (1, 2):
+                index = suggest.index
+                assert index.suggest(prefix, limit) == index.present(index.best(prefix, index.matches(prefix), limit))
+
+
+def test_bad_limit_is_rejected(client):
+    """
+    Tests that a non-numeric limit is a bad request.
+    """
+    response = client.get(reverse("recipesns:suggest"), {"q": "rice", "limit": "many"})
+
+    assert response.status_code == 400
@@ -0,0 +1,108 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes.models import Recipe
+
+LONG_TEXT = "A very long description that goes on and on about how good this dish is. " * 20
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def recipe(db):
+    """
+    Creates a public recipe with long description and ingredients texts.
+    """
+    return Recipe.objects.create(
+        name="Long Stew",
+        description=LONG_TEXT,
+        cost=5,
+        time=60,
+        ingredients="2 cups rice, 1 onion, 3 cloves garlic, 1 lb beef, 2 carrots, salt, pepper, olive oil",
+        diet="None",
+    )
+
+
+# ----------------------------------------------------------------------
+# Preview Column Tests
+# ----------------------------------------------------------------------
+
+def test_save_stores_previews(recipe):
+    """
+    Tests that saving a recipe stores 60-character previews with an ellipsis.
+    """
+    recipe.refresh_from_db()
+
+    assert len(recipe.description_preview) == 60
+    assert recipe.description_preview.endswith("…")
+    assert LONG_TEXT.startswith(recipe.description_preview[:-1])
+    assert recipe.ingredients_preview.startswith("2 cups rice, 1 onion")
+
+
+def test_short_text_is_kept_whole(db):
+    """
+    Tests that texts within the limit are stored unchanged.
+    """
+    recipe = Recipe.objects.create(name="Toast", description="Crunchy", cost=1, time=5, ingredients="bread", diet="")
+
+    assert recipe.description_preview == "Crunchy"
+    assert recipe.ingredients_preview == "bread"
+
+
+def test_update_fields_include_previews(recipe):
+    """
+    Tests that save(update_fields=[...]) of a text column also writes its preview.
+    """
+    recipe.description = "Now short"
+    recipe.save(update_fields=["description"])
+
+    assert Recipe.objects.get(pk=recipe.pk).description_preview == "Now short"
+
+
+def test_bulk_create_fills_previews(db):
+    """
+    Tests that bulk_create, which skips save(), still fills the previews.
+    """
+    Recipe.objects.bulk_create([
+        Recipe(name="Bulk", description=LONG_TEXT, cost=1, time=1, ingredients="rice", diet="")
+    ])
+
+    assert Recipe.objects.get(name="Bulk").description_preview.endswith("…")
+
+
+def test_backfill_command_repairs_previews_and_counts(recipe):
+    """
+    Tests that backfill_recipe_summaries recomputes previews and ingredient counts changed behind the model's back.
+    """
+    Recipe.objects.filter(pk=recipe.pk).update(description_preview="", ingredients_preview="", ingredient_count=0)
+
+    call_command("backfill_recipe_summaries", "--batch-size", "1")
+
+    recipe.refresh_from_db()
+    assert recipe.description_preview.endswith("…")
+    assert recipe.ingredients_preview.startswith("2 cups rice")
+    assert recipe.ingredient_count == 8
+
+
+# ----------------------------------------------------------------------
+# Listing Tests
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("url_name", ["recipe_list", "recipe_table"])
+def test_listings_read_only_previews(client, recipe, url_name):
+    """
+    Tests that the list and table pages never SELECT the full description or ingredients columns.
+    """
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse(f"recipesns:{url_name}"))
+
+    # The table page also reads the precomputed facet stats
+    [sql] = [query["sql"] for query in context.captured_queries if 'FROM "recipes_recipe"' in query["sql"]]
+    assert '"description_preview"' in sql
+    assert '"recipes_recipe"."description"' not in sql
+    assert '"recipes_recipe"."ingredients"' not in sql
+    assert recipe.description_preview.encode() in response.content
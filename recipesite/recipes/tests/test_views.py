@@ -1,6 +1,10 @@
+import csv
+
 import pytest
+from django.template import Context, Template
 from django.urls import reverse
 from recipes.models import Recipe
+from recipes.pagination import CursorPaginator
 from django.contrib.auth.models import User
 
 # ----------------------------------------------------------------------
@@ -154,6 +158,122 @@ def test_recipe_list_pagination(client, user):
     assert len(response.context["recipes"]) == 6  # paginate_by = 6
 
 
+def test_recipe_list_cursor_pagination(client, user):
+    """
+    Follows the next/previous cursors of the list view and checks that the pages
+    neither overlap nor skip recipes, newest first.
+    """
+    Recipe.objects.bulk_create([
+        Recipe(
+            name=f"Recipe {i}",
+            description="Sample description",
+            cost=5,
+            time=20,
+            ingredients="Sample ingredients",
+            diet="None",
+            user=user,
+            is_public=True
+        ) for i in range(10)
+    ])
+    expected = list(Recipe.objects.order_by("-created_at", "-id"))
+
+    url = reverse("recipesns:recipe_list")
+    first = client.get(url)
+    page_obj = first.context["page_obj"]
+    assert list(first.context["recipes"]) == expected[:6]
+    assert page_obj.has_next() and not page_obj.has_previous()
+
+    second = client.get(url, {"cursor": page_obj.next_cursor})
+    assert list(second.context["recipes"]) == expected[6:]
+    assert not second.context["page_obj"].has_next()
+
+    back = client.get(url, {"cursor": second.context["page_obj"].previous_cursor})
+    assert list(back.context["recipes"]) == expected[:6]
+
+
+def test_recipe_list_cursor_merges_private_recipes(client, user):
+    """
+    For a logged-in owner, public and private recipes are paginated as two index
+    seeks and merged back into one newest-first listing.
+    """
+    other = User.objects.create_user(username="stranger", password="password")
+    Recipe.objects.bulk_create([
+        Recipe(name=f"Recipe {i}", description="desc", cost=5, time=20, ingredients="...", diet="None",
+               user=user if i % 3 else other, is_public=i % 2 == 0)
+        for i in range(14)
+    ])
+    expected = list(Recipe.objects.visible_to(user).order_by("-created_at", "-id"))
+    client.force_login(user)
+
+    url = reverse("recipesns:recipe_list")
+    seen, cursor = [], None
+    while True:
+        response = client.get(url, {"cursor": cursor} if cursor else {})
+        seen += list(response.context["recipes"])
+        cursor = response.context["page_obj"].next_cursor
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert all(recipe.is_public or recipe.user == user for recipe in seen)
+
+
+@pytest.mark.django_db
+def test_recipe_list_invalid_cursor(client):
+    """
+    A malformed cursor is answered with 404 like an invalid page number.
+    """
+    response = client.get(reverse("recipesns:recipe_list"), {"cursor": "not-a-cursor"})
+    assert response.status_code == 404
+
+
+def test_table_cursor_stays_short_for_long_sort_values(client, user):
+    """
+    Tests that a page link sorted by a long text holds only the boundary id, and that it still continues the listing.
+    """
+    Recipe.objects.bulk_create([
+        Recipe(name=f"Recipe {i}", description=f"{i:02d} " + "Slow-cooked. " * 500, cost=5, time=20,
+               ingredients="...", diet="None", user=user, is_public=True)
+        for i in range(25)
+    ])
+    expected = list(Recipe.objects.order_by("description", "id"))
+
+    url = reverse("recipesns:recipe_table")
+    first = client.get(url, {"sort": "description"})
+    cursor = first.context["page_obj"].next_cursor
+    assert len(cursor) < 40
+
+    second = client.get(url, {"sort": "description", "cursor": cursor})
+    assert list(second.context["recipes"]) == expected[20:]
+
+
+def test_cursor_of_a_gone_or_hidden_row_starts_over(client, user):
+    """
+    Tests that a cursor whose boundary row was deleted, or that names a recipe the viewer can't see, gives the first
+    page instead of continuing from a position the viewer can't know.
+    """
+    other = User.objects.create_user(username="stranger", password="password")
+    recipes = Recipe.objects.bulk_create([
+        Recipe(name=f"Recipe {i}", description="desc", cost=5, time=20, ingredients="...", diet="None",
+               user=user, is_public=True)
+        for i in range(10)
+    ])
+    secret = Recipe.objects.create(name="Secret", description="desc", cost=5, time=20, ingredients="...",
+                                   diet="None", user=other, is_public=False)
+    url = reverse("recipesns:recipe_list")
+    first = client.get(url)
+    first_page, cursor = list(first.context["recipes"]), first.context["page_obj"].next_cursor
+
+    Recipe.objects.filter(pk=first_page[-1].pk).delete()
+    response = client.get(url, {"cursor": cursor})
+    assert list(response.context["recipes"])[0] == first_page[0]
+    assert not response.context["page_obj"].has_previous()
+
+    paginator = CursorPaginator(Recipe.objects.visible_to(user).order_by("-created_at", "-id"), 6)
+    assert paginator.decode_cursor(paginator.encode_cursor(secret)) == (None, False)
+    assert paginator.decode_cursor(paginator.encode_cursor(recipes[0], backwards=True))[1] is True
+
+
 # ----------------------------------------------------------------------
 # UpdateView Tests
 # ----------------------------------------------------------------------
@@ -264,3 +384,128 @@ def test_recipe_table_view_custom_sort(client, user):
     # Confirm context includes sort state
     assert response.context["current_sort"] == "name"
     assert response.context["current_dir"] == "desc"
+
+
+def test_recipe_table_view_cursor_keeps_sort(client, user):
+    """
+    Tests that the table paginates on (sort column, id) and that the next-page link
+    keeps the current sort parameters.
+    """
+    Recipe.objects.bulk_create([
+        Recipe(name=f"Recipe {i}", description="desc", cost=i % 3, time=10,
+               ingredients="...", diet="None", user=user, is_public=True)
+        for i in range(25)
+    ])
+    expected = list(Recipe.objects.order_by("-cost", "-id"))
+
+    url = reverse("recipesns:recipe_table")
+    first = client.get(url, {"sort": "cost", "dir": "desc"})
+    assert list(first.context["recipes"]) == expected[:20]
+    assert "sort=cost" in first.context["next_page_query"]
+    assert "dir=desc" in first.context["next_page_query"]
+
+    second = client.get(url + "?" + first.context["next_page_query"])
+    assert list(second.context["recipes"]) == expected[20:]
+
+
+# ----------------------------------------------------------------------
+# RecipeTableView Filter Tests
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def table_recipes(user):
+    """
+    Creates public recipes of two owners with varied cost, time and diet, plus a private one of the test user.
+    """
+    other = User.objects.create_user(username="otheruser", password="password")
+    rows = [
+        ("Cheap Salad", 3, 10, "Vegan, Gluten-Free", user, True),
+        ("Lentil Soup", 8, 40, "Vegan", user, True),
+        ("Steak Dinner", 30, 35, "Keto", other, True),
+        ("Fish Tacos", 12, 25, "Gluten-Free", other, True),
+        ("Secret Stew", 9, 60, "Vegan", user, False),
+    ]
+    return [
+        Recipe.objects.create(name=name, description="desc", cost=cost, time=time, ingredients="...", diet=diet,
+                              user=owner, is_public=is_public)
+        for name, cost, time, diet, owner, is_public in rows
+    ]
+
+
+def table_names(client, params):
+    response = client.get(reverse("recipesns:recipe_table"), params)
+    assert response.status_code == 200
+    return [recipe.name for recipe in response.context["recipes"]]
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"cost_min": "5", "cost_max": "20"}, ["Lentil Soup", "Fish Tacos"]),
+    ({"time_max": "30"}, ["Cheap Salad", "Fish Tacos"]),
+    ({"diet": "vegan"}, ["Cheap Salad", "Lentil Soup"]),
+    ({"diet": ["vegan", "gluten-free"]}, ["Cheap Salad"]),
+    ({"owner": "otheruser"}, ["Fish Tacos", "Steak Dinner"]),
+    ({"owner": "nobody"}, []),
+    ({"cost_min": "oops", "diet": "keto"}, ["Steak Dinner"]),
+])
+def test_recipe_table_filters(client, table_recipes, params, expected):
+    """
+    Tests each filter on its own and combined, sorted by cost.
+    """
+    assert table_names(client, params) == expected
+
+
+def test_recipe_table_mine_only(client, table_recipes):
+    """
+    Tests that "mine only" shows the logged-in user's public and private recipes, and nothing when logged out.
+    """
+    assert table_names(client, {"mine": "1"}) == []
+
+    client.login(username="testuser", password="password")
+    assert table_names(client, {"mine": "1"}) == ["Cheap Salad", "Lentil Soup", "Secret Stew"]
+    assert table_names(client, {"mine": "1", "diet": "vegan", "time_min": "30"}) == ["Lentil Soup", "Secret Stew"]
+
+
+def test_sort_links_keep_filters(client, table_recipes):
+    """
+    Tests that the column links keep the active filters.
+    """
+    response = client.get(reverse("recipesns:recipe_table"), {"diet": "vegan", "cost_max": "10", "sort": "cost"})
+    content = response.content.decode()
+
+    assert 'href="?diet=vegan&amp;cost_max=10&amp;sort=name&amp;dir=asc"' in content
+    assert 'href="?diet=vegan&amp;cost_max=10&amp;sort=cost&amp;dir=desc"' in content
+
+
+def test_filtering_the_default_table_keeps_its_sort(client, table_recipes):
+    """
+    Tests that the filter form and its Clear link carry the default sort (cost ascending) when no sort was chosen.
+    """
+    response = client.get(reverse("recipesns:recipe_table"), {"diet": "vegan"})
+    content = response.content.decode()
+
+    assert (response.context["current_sort"], response.context["current_dir"]) == ("cost", "asc")
+    assert '<input type="hidden" name="sort" value="cost">' in content
+    assert 'href="?sort=cost&amp;dir=asc" class="btn btn-sm btn-link">Clear' in content
+    assert table_names(client, {"diet": "vegan", "sort": "cost", "dir": "asc"}) == ["Cheap Salad", "Lentil Soup"]
+
+
+def test_sort_link_starts_from_first_page(rf):
+    """
+    Tests that a column link drops the page cursor, since the new order starts over.
+    """
+    request = rf.get("/recipes/table/", {"owner": "ann", "cursor": "abc"})
+    template = Template('{% load sortable %}{% sortable_column "time" "Time" %}')
+
+    html = template.render(Context({"request": request}))
+
+    assert html == '<a href="?owner=ann&amp;sort=time&amp;dir=asc">Time </a>'
+
+
+def test_filtered_export_matches_table(client, table_recipes):
+    """
+    Tests that the export of a filtered table has exactly the table's rows.
+    """
+    response = client.get(reverse("recipesns:recipe_export"), {"format": "csv", "diet": "gluten-free"})
+    rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+
+    assert [row["name"] for row in rows] == ["Cheap Salad", "Fish Tacos"]
@@ -1,16 +1,36 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from . import views
+from . import api, async_views, views
 
 app_name = 'recipesns'
 
+# ASGI profile (see recipesite/asgi.py): the list, detail and autofill routes are served by their async versions
+if settings.RECIPES_ASYNC_VIEWS:
+    recipe_list = async_views.recipe_list
+    recipe_detail = async_views.recipe_detail
+    autofill_recipe = async_views.autofill_recipe
+else:
+    recipe_list = views.RecipeListView.as_view()
+    recipe_detail = views.RecipeDetailView.as_view()
+    autofill_recipe = views.autofill_recipe
+
 urlpatterns = [
-    path('', views.RecipeListView.as_view(), name='recipe_list'),
-    path('<int:pk>/', views.RecipeDetailView.as_view(), name='recipe_detail'),
+    path('', recipe_list, name='recipe_list'),
+    path('<int:pk>/', recipe_detail, name='recipe_detail'),
     path('create/', views.RecipeCreateView.as_view(), name='recipe_create'),
     path('<int:pk>/update/', views.RecipeUpdateView.as_view(), name='recipe_update'),
     path('<int:pk>/delete/', views.RecipeDeleteView.as_view(), name='recipe_delete'),
     path('table/', views.RecipeTableView.as_view(), name='recipe_table'),
+    path('table/export/', views.export_recipes, name='recipe_export'),
+    path('search/', views.RecipeSearchView.as_view(), name='recipe_search'),
+    path('pantry/', views.PantryView.as_view(), name='pantry'),
+    path('api/recipes/', api.recipe_list, name='api_recipe_list'),
+    path('api/recipes/search/', api.recipe_search, name='api_recipe_search'),
+    path('api/recipes/stats/', api.recipe_stats, name='api_recipe_stats'),
+    path('api/recipes/<int:pk>/', api.recipe_detail, name='api_recipe_detail'),
+    path('metrics/', views.metrics, name='metrics'),
     path("signup/", views.SignUpView.as_view(), name='signup'),
-    path('autofill-recipe/', views.autofill_recipe, name='autofill_recipe'),
+    path('autofill-recipe/', autofill_recipe, name='autofill_recipe'),
+    path('suggest/', views.suggest_names, name='suggest'),
 ]
@@ -1,34 +1,52 @@
-from django.shortcuts import render
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+import hmac
 
-from .forms import RecipeForm
-from .models import Recipe
+from django.shortcuts import render
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
+
+from .caching import VersionedPageCacheMixin
+from .diets import DIET_TAGS
+from .export import CONTENT_TYPES, export_stream, parse_format
+from .facets import facet_stats
+from .forms import PantryForm, RecipeForm
+from .ingredients import parse_ingredients
+from .models import PantryItem, Recipe, visibility_partitions
+from .pagination import CursorPaginationMixin
+from .search import search_recipes
+from .table import PAGE_SIZE, table_filters, table_ordering, table_queryset
 from django.urls import reverse_lazy
 from django.contrib.auth.forms import UserCreationForm
-from django.http import JsonResponse
-import re
-from html import unescape
-import requests
 from django.conf import settings
-from django.db import models
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.http import Http404
 
+from . import autofill_index, jobs, spoonacular, suggest
+from .metrics import registry
+
 # Create your views here.
 
-class RecipeListView(ListView):
+# Order the queryset by the most recent first, loading only what the cards show (and the author in the same query)
+def recipe_list_queryset(user):
+    return (
+        Recipe.objects.visible_to(user)
+        .select_related('user')
+        .only('name', 'time', 'created_at', 'description_preview', 'ingredients_preview', 'user__username')
+        .order_by('-created_at', '-id')
+    )
+
+
+class RecipeListView(VersionedPageCacheMixin, CursorPaginationMixin, ListView):
+    cache_name = 'list'
     model = Recipe
     template_name = 'recipes/recipe_list.html'
     context_object_name = 'recipes'
     paginate_by = 6
 
-    # Order the queryset by the most recent first
     def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return Recipe.objects.filter(
-                models.Q(is_public=True) | models.Q(user=self.request.user)
-            ).order_by('-created_at')
-        else:
-            return Recipe.objects.filter(is_public=True).order_by('-created_at')
+        return recipe_list_queryset(self.request.user)
+
+    def get_cursor_partitions(self):
+        return visibility_partitions(self.request.user)
 
 
 class RecipeDetailView(DetailView):
@@ -36,6 +54,9 @@ class RecipeDetailView(DetailView):
     template_name = 'recipes/recipe_detail.html'
     context_object_name = 'specific_recipe'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('user')
+
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
         if not obj.is_public and obj.user != self.request.user:
@@ -53,7 +74,11 @@ class RecipeCreateView(CreateView):
             form.instance.user = self.request.user
         else:
             form.instance.user = None  # Explicitly set None, or just omit this line
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        # Whatever was left empty is looked up from the name in the background
+        if jobs.enrichment_enabled() and jobs.needs_enrichment(self.object):
+            jobs.enqueue_enrichment(self.object)
+        return response
 
 
 class RecipeUpdateView(UpdateView):
@@ -67,37 +92,80 @@ class RecipeDeleteView(DeleteView):
     template_name = 'recipes/recipe_delete.html'
     success_url = reverse_lazy('recipesns:recipe_list')
 
-class RecipeTableView(ListView):
+class RecipeTableView(VersionedPageCacheMixin, CursorPaginationMixin, ListView):
+    cache_name = 'table'
     model = Recipe
     template_name = 'recipes/recipe_table.html'
     context_object_name = 'recipes'
+    paginate_by = PAGE_SIZE
 
     # Defines what the data will be used as the main object in the template
     def get_queryset(self):
-        sort_by = self.request.GET.get('sort', 'cost')
-        direction = self.request.GET.get('dir', 'asc')
-        valid_fields = ['name', 'description', 'cost', 'time', 'is_public']
+        queryset = table_queryset(self.request.user, self.request.GET)
+        # The sort column is needed too, for the page cursors
+        ordering = [name.lstrip('-') for name in queryset.query.order_by]
+        return queryset.only('name', 'description_preview', 'cost', 'time', 'is_public', *ordering)
 
-        if sort_by not in valid_fields:
-            sort_by = 'cost'
+    def get_cursor_partitions(self):
+        return visibility_partitions(self.request.user)
 
-        order = sort_by if direction == 'asc' else f"-{sort_by}"
+    # Override to make get_context_data to include sort state in template context
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # The sort table_queryset applied, defaults and unknown values resolved
+        sort = table_ordering(self.request.GET)[0]
+        context['current_sort'] = sort.lstrip('-')
+        context['current_dir'] = 'desc' if sort.startswith('-') else 'asc'
+        params = self.request.GET.copy()
+        params.pop('cursor', None)
+        context['export_query'] = params.urlencode()
+        context['stats'] = facet_stats()
+        # The filter form: the active filters, with the diet tags as the choices
+        context['filters'] = table_filters(self.request.GET)
+        context['diet_choices'] = [{'value': name, 'label': label} for name, label, _ in DIET_TAGS]
+        return context
 
-        base_qs = Recipe.objects.all()
-        if self.request.user.is_authenticated:
-            base_qs = base_qs.filter(
-                models.Q(is_public=True) | models.Q(user=self.request.user)
-            )
-        else:
-            base_qs = base_qs.filter(is_public=True)
 
-        return base_qs.order_by(order)
+class RecipeSearchView(ListView):
+    model = Recipe
+    template_name = 'recipes/recipe_search.html'
+    context_object_name = 'recipes'
 
-    # Override to make get_context_data to include sort state in template context
+    # Ranked full-text matches the user is allowed to see
+    def get_queryset(self):
+        recipes = search_recipes(self.request.GET.get('q', ''), self.request.user)
+        return recipes.only('name', 'description_preview', 'diet', 'time', 'cost')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+class PantryView(LoginRequiredMixin, FormView):
+    template_name = 'recipes/pantry.html'
+    form_class = PantryForm
+    success_url = reverse_lazy('recipesns:pantry')
+    matches_limit = 20
+
+    def get_initial(self):
+        names = self.request.user.pantry_items.values_list('ingredient__name', flat=True).order_by('ingredient__name')
+        return {'items': ', '.join(names)}
+
+    def form_valid(self, form):
+        names = [item.name for item in parse_ingredients(form.cleaned_data['items'])]
+        PantryItem.objects.replace_for(self.request.user, names)
+        return super().form_valid(form)
+
+    # Visible recipes ranked by how much of their ingredient list the pantry covers
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['current_sort'] = self.request.GET.get('sort', 'name')
-        context['current_dir'] = self.request.GET.get('dir', 'asc')
+        pantry = self.request.user.pantry_items.values('ingredient')
+        context['matches'] = (
+            Recipe.objects.visible_to(self.request.user)
+            .only('name', 'ingredient_count')
+            .ranked_by_pantry(pantry)[:self.matches_limit]
+        )
         return context
 
 
@@ -106,80 +174,55 @@ class SignUpView(CreateView):
     template_name = 'registration/signup.html'
     success_url = reverse_lazy('login')
 
-# Basic list of common ingredients (expand as needed)
-COMMON_INGREDIENTS = [
-    'chicken', 'beef', 'pork', 'tofu', 'salmon', 'shrimp',
-    'rice', 'beans', 'cheese', 'potato', 'egg', 'tomato',
-    'lettuce', 'onion', 'garlic', 'carrot', 'broccoli',
-    'spinach', 'mushroom', 'pepper', 'bacon', 'turkey',
-    'chocolate', 'strawberry', 'banana', 'apple'
-]
-
-def extract_known_ingredient(query):
-    query_lower = query.lower()
-    for ingredient in COMMON_INGREDIENTS:
-        if ingredient in query_lower:
-            return ingredient
-    return None
-
-def clean_html(text):
-    text = unescape(text)
-    return re.sub('<[^<]+?>', '', text)  # Remove HTML tags
-
 def autofill_recipe(request):
     name = request.GET.get('name', '').strip()
     if not name:
         return JsonResponse({'success': False})
 
-    api_key = settings.SPOONACULAR_API_KEY
-    ingredient = extract_known_ingredient(name)
+    suggestion = autofill_index.lookup(name) or spoonacular.autofill(name)
+    if suggestion is None:
+        return JsonResponse({'success': False})
+
+    return JsonResponse({'success': True, **suggestion})
 
-    search_params = {
-        'apiKey': api_key,
-        'query': name,
-        'number': 3,
-        'instructionsRequired': True,
-    }
-    if ingredient:
-        search_params['titleMatch'] = ingredient
 
+def suggest_names(request):
+    # Typeahead for the name field: public recipe names and ingredients matching what was typed so far
     try:
-        # Step 1: Search for recipes
-        search_response = requests.get('https://api.spoonacular.com/recipes/complexSearch', params=search_params)
-        search_response.raise_for_status()
-        search_data = search_response.json()
-
-        if not search_data['results']:
-            return JsonResponse({'success': False})
-
-        # Step 2: Try up to 3 recipes for a good match
-        for result in search_data['results']:
-            recipe_id = result['id']
-            info_url = f'https://api.spoonacular.com/recipes/{recipe_id}/information'
-            info_params = { 'apiKey': api_key, 'includeNutrition': False }
-
-            info_response = requests.get(info_url, params=info_params)
-            info_response.raise_for_status()
-            info_data = info_response.json()
-
-            description = clean_html(info_data.get('summary', ''))
-            ingredients = ', '.join(
-                [i['original'] for i in info_data.get('extendedIngredients', [])]
-            )
-            time = info_data.get('readyInMinutes', 0)
-            cost = round(info_data.get('pricePerServing', 0) / 100)
-
-            if ingredients:
-                return JsonResponse({
-                    'success': True,
-                    'description': description,
-                    'ingredients': ingredients,
-                    'time': time,
-                    'cost': cost
-                })
+        limit = min(int(request.GET.get('limit', settings.RECIPES_SUGGEST_LIMIT)), settings.RECIPES_SUGGEST_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest('limit must be a number.')
+    return JsonResponse({'suggestions': suggest.suggest(request.GET.get('q', ''), max(limit, 1))})
 
-        return JsonResponse({'success': False})
 
-    except Exception as e:
-        print('Spoonacular error:', e)
-        return JsonResponse({'success': False})
\ No newline at end of file
+def export_recipes(request):
+    # Streams the recipe table (same visibility, sort and filters) as CSV or JSON Lines, optionally gzipped
+    name = request.GET.get('format', 'csv')
+    try:
+        base, compressed = parse_format(name)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    queryset = table_queryset(request.user, request.GET)
+    response = StreamingHttpResponse(
+        export_stream(queryset, name),
+        content_type='application/gzip' if compressed else f'{CONTENT_TYPES[base]}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="recipes.{name}"'
+    return response
+
+
+def metrics_allowed(request):
+    # Staff, a scraper with the bearer token, or an address explicitly listed in INTERNAL_IPS
+    token = settings.RECIPES_METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        return True
+    return request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+
+
+def metrics(request):
+    # Prometheus scrape endpoint for this process's metrics (request timings, outbound API calls)
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
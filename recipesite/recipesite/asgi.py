@@ -5,6 +5,26 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Deployment profile
+------------------
+Run with the async views switched on, so the list, detail and autofill routes
+are served by recipes/async_views.py:
+
+    RECIPES_ASYNC_VIEWS=1 uvicorn recipesite.asgi:application \
+        --workers 2 --limit-concurrency 1000 --timeout-keep-alive 5
+
+- One worker per CPU core is enough. A worker keeps hundreds of autofill
+  requests waiting on Spoonacular without holding a thread. That is capped by
+  SPOONACULAR_ASYNC_MAX_CONNECTIONS (200 by default). Beyond that, requests
+  queue for a connection, not for a thread.
+- The remaining views are sync and run in Django's thread pool. Async ORM
+  calls share one thread per worker.
+- Set DB_CONN_MAX_AGE=0. Persistent connections aren't reused across requests
+  under ASGI; with PostgreSQL the native pool (DB_POOL=1, the default) reuses
+  them instead.
+- The page cache version counters must be shared by all workers. Set
+  CACHE_BACKEND / CACHE_LOCATION to Redis or Memcached.
 """
 
 import os
@@ -0,0 +1,89 @@
+import os
+
+# Database profiles for settings.DATABASES, chosen with DB_ENGINE (sqlite, the default, or postgresql) and tuned with
+# the environment variables read below.
+
+# Applied on every new SQLite connection. WAL lets readers carry on while one writer commits, and synchronous=NORMAL
+# only fsyncs at checkpoints, which is still durable against application crashes in WAL mode. mmap serves reads
+# straight from the page cache.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_database(name, tuned=True, env=os.environ):
+    database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    if not tuned:
+        return database
+    pragmas = {
+        **SQLITE_PRAGMAS,
+        'synchronous': env.get('SQLITE_SYNCHRONOUS', SQLITE_PRAGMAS['synchronous']),
+        'mmap_size': int(env.get('SQLITE_MMAP_SIZE', SQLITE_PRAGMAS['mmap_size'])),
+    }
+    busy_timeout = float(env.get('SQLITE_BUSY_TIMEOUT', 20))
+    return {
+        **database,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+            # Seconds a writer waits for the lock (SQLite's busy_timeout) instead of failing with "database is locked"
+            'timeout': busy_timeout,
+            # Take the write lock when the transaction starts. A deferred transaction that reads first and then writes
+            # can't wait for the lock and fails at once whenever another writer holds it.
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Keep connections (and their PRAGMAs) across requests, checked before reuse
+        'CONN_MAX_AGE': int(env.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
+def postgresql_database(env=os.environ):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('POSTGRES_DB', 'recipesite'),
+        'USER': env.get('POSTGRES_USER', 'recipesite'),
+        'PASSWORD': env.get('POSTGRES_PASSWORD', ''),
+        'HOST': env.get('POSTGRES_HOST', 'localhost'),
+        'PORT': env.get('POSTGRES_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if env.get('DB_POOL', '1') == '1':
+        # Django 5.1+ native psycopg pool, one per worker process. The pool owns the connections, so Django must not
+        # keep them itself: CONN_MAX_AGE stays 0.
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(env.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(env.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(env.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(env.get('DB_CONN_MAX_AGE', 60))
+    return database
+
+
+def database_from_env(default_sqlite_name, env=os.environ):
+    engine = env.get('DB_ENGINE', 'sqlite')
+    if engine == 'postgresql':
+        return postgresql_database(env)
+    if engine == 'sqlite':
+        return sqlite_database(
+            env.get('SQLITE_PATH', default_sqlite_name), tuned=env.get('SQLITE_TUNING', '1') == '1', env=env
+        )
+    raise ValueError(f"Unknown DB_ENGINE {engine!r}, expected 'sqlite' or 'postgresql'.")
+
+
+def replicas_from_env(env=os.environ):
+    # Read replicas by alias, from DB_REPLICAS: comma-separated SQLite files, or PostgreSQL hosts (with the primary's
+    # credentials) when DB_ENGINE=postgresql. Tests run against the primary's test database instead.
+    replicas = {}
+    for n, location in enumerate(filter(None, env.get('DB_REPLICAS', '').split(',')), start=1):
+        if env.get('DB_ENGINE', 'sqlite') == 'postgresql':
+            database = {**postgresql_database(env), 'HOST': location.strip()}
+        else:
+            database = sqlite_database(location.strip(), tuned=env.get('SQLITE_TUNING', '1') == '1', env=env)
+        replicas[f'replica{n}'] = {**database, 'TEST': {'MIRROR': 'default'}}
+    return replicas
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from .databases import database_from_env, replicas_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +45,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'recipes.instrumentation.InstrumentationMiddleware',
+    'recipes.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,13 +78,20 @@ WSGI_APPLICATION = 'recipesite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Profile chosen by DB_ENGINE: SQLite in WAL mode (the default) or pooled PostgreSQL, see recipesite/databases.py.
+# SQLITE_TUNING=0 gives the untuned SQLite profile, e.g. as the baseline for the benchmark_writes load test.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_from_env(BASE_DIR / 'db.sqlite3'),
 }
 
+# Read replicas (DB_REPLICAS, see recipes/replicas.py): safe requests read from one of them, everything else uses
+# 'default'. After a write, the client's reads stay on the primary for RECIPES_REPLICA_PIN_SECONDS, which must exceed
+# the replication lag.
+DATABASES.update(replicas_from_env())
+DATABASE_ROUTERS = ['recipes.replicas.ReplicaRouter']
+RECIPES_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+RECIPES_REPLICA_PIN_SECONDS = int(os.getenv('RECIPES_REPLICA_PIN_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,4 +138,76 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = 'recipesns:recipe_list'
 LOGOUT_REDIRECT_URL = 'recipesns:recipe_list'
 
-SPOONACULAR_API_KEY = os.getenv('SPOONACULAR_API_KEY')
\ No newline at end of file
+SPOONACULAR_API_KEY = os.getenv('SPOONACULAR_API_KEY')
+
+SPOONACULAR_BASE_URL = os.getenv('SPOONACULAR_BASE_URL', 'https://api.spoonacular.com')
+
+# (connect, read) timeouts in seconds for every Spoonacular call, so a slow upstream can't hold a worker indefinitely
+SPOONACULAR_TIMEOUT = (3.05, 5)
+
+# Connection pool size per worker, retries on 429/5xx, and the circuit breaker: consecutive failures before it opens and
+# seconds before a trial call is let through again
+SPOONACULAR_POOL_SIZE = 10
+SPOONACULAR_RETRIES = 2
+# Longest Retry-After (seconds) a retry waits out; a 429/503 asking for more is returned at once instead
+SPOONACULAR_MAX_RETRY_AFTER = SPOONACULAR_TIMEOUT[1]
+# Seconds all the Spoonacular calls of one autofill request may take together, retries and waits included; keep it
+# well under the server's request timeout (gunicorn: 30 s). Background jobs have no budget.
+SPOONACULAR_AUTOFILL_BUDGET = float(os.getenv('SPOONACULAR_AUTOFILL_BUDGET', 10))
+# Connections the async client (async views, see asgi.py) may keep open per process
+SPOONACULAR_ASYNC_MAX_CONNECTIONS = int(os.getenv('SPOONACULAR_ASYNC_MAX_CONNECTIONS', 200))
+SPOONACULAR_BREAKER_THRESHOLD = 5
+SPOONACULAR_BREAKER_RESET_TIMEOUT = 30
+
+# Autofill cache (recipes/spoonacular.py): entries kept per worker process, and TTLs in seconds for search results,
+# per-recipe information payloads and cached misses
+SPOONACULAR_LOCAL_CACHE_SIZE = 512
+SPOONACULAR_SEARCH_TTL = int(os.getenv('SPOONACULAR_SEARCH_TTL', 6 * 60 * 60))
+SPOONACULAR_INFORMATION_TTL = int(os.getenv('SPOONACULAR_INFORMATION_TTL', 7 * 24 * 60 * 60))
+SPOONACULAR_NEGATIVE_TTL = int(os.getenv('SPOONACULAR_NEGATIVE_TTL', 15 * 60))
+
+# Local autofill index (recipes/autofill_index.py), built by `manage.py rebuild_autofill_index`. Autofill answers from
+# it when a dish scores at least RECIPES_AUTOFILL_INDEX_MIN_SCORE (trigram similarity plus boosts), else asks
+# Spoonacular.
+RECIPES_AUTOFILL_INDEX_PATH = os.getenv('RECIPES_AUTOFILL_INDEX_PATH', BASE_DIR / 'autofill.idx')
+RECIPES_AUTOFILL_INDEX_MIN_SCORE = float(os.getenv('RECIPES_AUTOFILL_INDEX_MIN_SCORE', 0.6))
+
+# Page cache for the list and table views (recipes/caching.py). Its version counters must be shared by every worker,
+# so outside development point CACHE_BACKEND/CACHE_LOCATION at a shared store such as Redis or Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+RECIPES_CACHE_ALIAS = 'default'
+
+# Per-request instrumentation (recipes/instrumentation.py): where the timings of each request go, and whether they are
+# also sent to the browser as a Server-Timing header. The metrics sink is read at /recipes/metrics/, which answers
+# staff users and scrapers sending "Authorization: Bearer <RECIPES_METRICS_TOKEN>". INTERNAL_IPS is empty by default:
+# behind a local reverse proxy every client arrives from 127.0.0.1, so only list addresses the app sees unproxied.
+RECIPES_INSTRUMENTATION_SINKS = os.getenv(
+    'RECIPES_INSTRUMENTATION_SINKS', 'recipes.instrumentation.metrics_sink'
+).split(',')
+RECIPES_SERVER_TIMING = os.getenv('RECIPES_SERVER_TIMING', '1') == '1'
+RECIPES_METRICS_TOKEN = os.getenv('RECIPES_METRICS_TOKEN', '')
+INTERNAL_IPS = [ip for ip in os.getenv('INTERNAL_IPS', '').split(',') if ip]
+
+# ASGI profile: serve the list, detail and autofill routes with the async views (see recipesite/asgi.py)
+RECIPES_ASYNC_VIEWS = os.getenv('RECIPES_ASYNC_VIEWS', '') == '1'
+RECIPES_PAGE_CACHE_TIMEOUT = int(os.getenv('RECIPES_PAGE_CACHE_TIMEOUT', 5 * 60))
+
+# Name typeahead (recipes/suggest.py): the most suggestions per request, and how often (seconds) a process checks
+# whether other processes changed public recipes and replays their changes into its in-memory index
+RECIPES_SUGGEST_LIMIT = 8
+RECIPES_SUGGEST_REFRESH = int(os.getenv('RECIPES_SUGGEST_REFRESH', 60))
+
+# Background jobs (recipes/jobs.py, run by `manage.py run_workers`): Spoonacular-backed jobs per minute across all
+# workers, runs before a job is marked failed, base retry delay in seconds (doubled per failure), and how long a
+# worker may hold a job before another may take it over. RECIPES_ENRICH_ON_CREATE (with a SPOONACULAR_API_KEY set) lets
+# new recipes leave the description, ingredients, cost or time empty and queues a lookup to fill them in.
+RECIPES_JOBS_RATE_LIMIT = int(os.getenv('RECIPES_JOBS_RATE_LIMIT', 30))
+RECIPES_JOBS_MAX_ATTEMPTS = 5
+RECIPES_JOBS_RETRY_DELAY = 30
+RECIPES_JOBS_LEASE = 5 * 60
+RECIPES_ENRICH_ON_CREATE = os.getenv('RECIPES_ENRICH_ON_CREATE', '1') == '1'